@@ -0,0 +1,292 @@
+"""Sign-in, registration, the account and profile pages, resume processing
+and the logged-in dashboard."""
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, session, flash, jsonify
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from werkzeug.utils import secure_filename
+from database import read_only
+from passwords import PasswordHasherBusy
+from storage import StoredFile, UploadError, save_upload
+from resumes import extract_text, looks_infected
+from extensions import db, password_hasher, recommendation_cache, skill_vocabulary, task_queue, upload_processor
+from models import JobApplication, SavedJob, User, UserProfile, enqueue_task
+from jobs import get_recommended_jobs, next_page_url, paginate_jobs
+
+bp = Blueprint('accounts', __name__)
+
+def authenticate(email, password):
+    """The id and name of the user with these credentials, or None.
+
+    No transaction is open while the hash is checked: a POST's transaction
+    holds SQLite's write lock from its first query, and every other writer
+    would wait for the hash. A hash made with an older PASSWORD_HASH_METHOD
+    is replaced with a current one.
+    """
+    row = db.session.execute(db.select(User.id, User.name, User.password_hash).filter_by(email=email)).first()
+    db.session.commit()
+    if row is None or not password or not password_hasher.verify(row.password_hash, password):
+        return None
+    if password_hasher.needs_rehash(row.password_hash):
+        try:
+            new_hash = password_hasher.hash(password)
+        except PasswordHasherBusy:
+            # The login itself succeeded; upgrade on a later one
+            return row
+        # Matching the old hash skips the update if the password changed meanwhile
+        db.session.execute(db.update(User).where(User.id == row.id, User.password_hash == row.password_hash)
+                           .values(password_hash=new_hash))
+        db.session.commit()
+    return row
+
+@bp.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(error):
+    # Shed the request rather than queue more hashes than the pool gets through
+    message = 'Too many sign-ins right now, please try again in a moment'
+    if request.path.startswith('/api/'):
+        return jsonify({'success': False, 'message': message}), 503, {'Retry-After': '1'}
+    flash(message, 'error')
+    template = 'register.html' if request.endpoint == 'accounts.register' else 'login.html'
+    return render_template(template), 503, {'Retry-After': '1'}
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        email = request.form.get('email')
+        password = request.form.get('pass')
+
+        user = authenticate(email, password)
+
+        if user:
+            session['user_id'] = user.id
+            session['user_name'] = user.name
+            flash('Login successful!', 'success')
+            return redirect(url_for('jobs.home'))
+        else:
+            flash('Invalid email or password', 'error')
+
+    return render_template('login.html')
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        name = request.form.get('name')
+        email = request.form.get('email')
+        password = request.form.get('pass')
+        confirm_password = request.form.get('c_pass')
+
+        # Validation
+        if password != confirm_password:
+            flash('Passwords do not match', 'error')
+            return redirect(url_for('accounts.register'))
+
+        # Checked before hashing, so a taken email never uses a hashing slot
+        if User.query.filter_by(email=email).first():
+            flash('Email already registered', 'error')
+            return redirect(url_for('accounts.register'))
+        # End the check's write transaction; the lock is not held while hashing
+        db.session.rollback()
+        password_hash = password_hasher.hash(password)
+
+        # Create new user, unless a concurrent registration took the email
+        user_id = db.session.execute(sqlite_insert(User).values(
+            name=name, email=email, password_hash=password_hash
+        ).on_conflict_do_nothing(index_elements=['email']).returning(User.id)).scalar()
+        if user_id is None:
+            db.session.rollback()
+            flash('Email already registered', 'error')
+            return redirect(url_for('accounts.register'))
+        db.session.commit()
+
+        flash('Registration successful! Please login.', 'success')
+        return redirect(url_for('accounts.login'))
+
+    return render_template('register.html')
+
+@bp.route('/logout')
+def logout():
+    session.clear()
+    flash('Logged out successfully', 'info')
+    return redirect(url_for('jobs.home'))
+
+@bp.route('/account')
+@read_only
+def account():
+    if 'user_id' not in session:
+        flash('Please login to access your account', 'error')
+        return redirect(url_for('accounts.login'))
+
+    user_id = session['user_id']
+    user = User.query.get(user_id)
+    if not user:
+        session.clear()
+        flash('User not found. Please login again.', 'error')
+        return redirect(url_for('accounts.login'))
+
+    profile = UserProfile.query.filter_by(user_id=user.id).first()
+    applications = JobApplication.query.options(db.joinedload(JobApplication.job)).filter_by(
+        applicant_id=user.id).order_by(JobApplication.applied_at.desc()).all()
+    saved_jobs = SavedJob.query.options(db.joinedload(SavedJob.job)).filter_by(
+        user_id=user.id).order_by(SavedJob.saved_at.desc()).all()
+    return render_template('account.html', user=user, profile=profile, applications=applications, saved_jobs=saved_jobs)
+
+@bp.route('/profile', methods=['GET', 'POST'])
+def profile():
+    if 'user_id' not in session:
+        flash('Please login to access your profile', 'error')
+        return redirect(url_for('accounts.login'))
+
+    user = User.query.get(session['user_id'])
+    profile = UserProfile.query.filter_by(user_id=user.id).first()
+
+    if request.method == 'POST':
+        # Refuse oversized uploads before the body is read
+        if (request.content_length or 0) > current_app.config['RESUME_MAX_SIZE'] + 64 * 1024:
+            flash(f"Resume must be smaller than {current_app.config['RESUME_MAX_SIZE'] // (1024 * 1024)} MB", 'error')
+            return redirect(url_for('accounts.profile'))
+
+        # Create or update profile
+        if not profile:
+            profile = UserProfile(user_id=user.id)
+            db.session.add(profile)
+
+        # Update profile fields
+        skills_changed = profile.skills != request.form.get('skills')
+        profile.phone = request.form.get('phone')
+        profile.bio = request.form.get('bio')
+        profile.skills = request.form.get('skills')
+        profile.experience_years = int(request.form.get('experience_years', 0))
+        profile.linkedin_url = request.form.get('linkedin_url')
+        profile.portfolio_url = request.form.get('portfolio_url')
+        profile.location = request.form.get('location')
+        profile.current_position = request.form.get('current_position')
+        profile.education = request.form.get('education')
+
+        # Handle resume upload; scanning and text extraction run after the response
+        stored = None
+        resume_file = request.files.get('resume')
+        if resume_file and resume_file.filename:
+            try:
+                stored = save_upload(upload_processor.storage, resume_file.stream, current_app.config['RESUME_MAX_SIZE'], 'resumes',
+                                     RESUME_KINDS, current_app.config['UPLOAD_CHUNK_SIZE'])
+            except UploadError as e:
+                flash(f'Resume not saved: {e}', 'error')
+            else:
+                profile.resume_filename = secure_filename(resume_file.filename) or f'resume.{stored.kind}'
+                profile.resume_key = stored.key
+                profile.resume_size = stored.size
+                profile.resume_status = 'pending'
+                profile.resume_text = None
+
+        if stored:
+            db.session.flush()
+            enqueue_task('process_resume', profile_id=profile.id, stored=stored._asdict())
+        db.session.commit()
+        if skills_changed:
+            recommendation_cache.invalidate_user(user.id)
+        flash('Profile updated successfully!', 'success')
+        return redirect(url_for('accounts.profile'))
+
+    return render_template('profile.html', user=user, profile=profile)
+
+RESUME_KINDS = ('pdf', 'doc', 'docx')
+
+@upload_processor.hook
+def scan_resume(storage, stored, profile_id):
+    """Stand-in virus scan; an infected file is removed from every profile using it."""
+    with storage.open(stored.key) as f:
+        if not looks_infected(f.read()):
+            return True
+    UserProfile.query.filter_by(resume_key=stored.key).update(
+        {'resume_key': None, 'resume_status': 'rejected', 'resume_text': None})
+    db.session.commit()
+    storage.delete(stored.key)
+    return False
+
+@upload_processor.hook
+def extract_resume_text(storage, stored, profile_id):
+    # The same file may already have been processed for another profile
+    text = db.session.query(UserProfile.resume_text).filter(
+        UserProfile.resume_key == stored.key, UserProfile.resume_status == 'processed').limit(1).scalar()
+    # Don't hold a read transaction open while extracting
+    db.session.commit()
+    if text is None:
+        with storage.open(stored.key) as f:
+            text = extract_text(f.read(), stored.kind)
+    # Matching on resume_key skips profiles whose resume was replaced meanwhile
+    updated = UserProfile.query.filter_by(id=profile_id, resume_key=stored.key).update(
+        {'resume_text': text, 'resume_status': 'processed'})
+    db.session.commit()
+    return bool(updated)
+
+@upload_processor.hook
+def index_resume_skills(storage, stored, profile_id):
+    user_id = db.session.query(UserProfile.user_id).filter_by(id=profile_id).scalar()
+    changed = skill_vocabulary.sync_profile(db.session.connection(), user_id)
+    db.session.commit()
+    if changed:
+        recommendation_cache.invalidate_user(user_id)
+
+@upload_processor.errorhandler
+def resume_processing_failed(stored, error, profile_id):
+    db.session.rollback()
+    UserProfile.query.filter_by(id=profile_id, resume_key=stored.key).update({'resume_status': 'failed'})
+    db.session.commit()
+
+# API endpoints for AJAX requests
+@bp.route('/api/login', methods=['POST'])
+def api_login():
+    data = request.get_json()
+    email = data.get('email')
+    password = data.get('pass')
+
+    user = authenticate(email, password)
+
+    if user:
+        session['user_id'] = user.id
+        session['user_name'] = user.name
+        return jsonify({'success': True, 'message': 'Login successful'})
+    else:
+        return jsonify({'success': False, 'message': 'Invalid credentials'})
+
+@bp.route('/api/register', methods=['POST'])
+def api_register():
+    data = request.get_json()
+    name = data.get('name')
+    email = data.get('email')
+    password = data.get('pass')
+    confirm_password = data.get('c_pass')
+
+    if password != confirm_password:
+        return jsonify({'success': False, 'message': 'Passwords do not match'})
+
+    password_hash = password_hasher.hash(password)
+
+    if User.query.filter_by(email=email).first():
+        return jsonify({'success': False, 'message': 'Email already registered'})
+
+    user = User(name=name, email=email, password_hash=password_hash)
+    db.session.add(user)
+    db.session.commit()
+
+    return jsonify({'success': True, 'message': 'Registration successful'})
+
+@bp.route('/dashboard', methods=['GET', 'POST'])
+@read_only
+def dashboard():
+    if 'user_id' not in session:
+        return render_template('register.html')
+
+    user_id = session['user_id']
+    recommended_jobs = get_recommended_jobs(user_id)
+
+    if request.method == 'POST':
+        # Query jobs based on search
+        page = paginate_jobs(request.form)
+        return render_template('home.html', jobs=page.items, recommended_jobs=recommended_jobs,
+                               next_url=next_page_url(request.form, page))
+
+    return render_template('home.html', recommended_jobs=recommended_jobs)
+
+# Background tasks; each may run more than once, see tasks.py
+@task_queue.task()
+def process_resume(profile_id, stored):
+    upload_processor.run(StoredFile(**stored), profile_id=profile_id)
@@ -0,0 +1,410 @@
+"""ASGI entry point; run `uvicorn asgi:app` from the website/ directory, or
+gunicorn with ASGI=1 (see gunicorn.conf.py).
+
+GET and HEAD requests for the read-heavy pages (the job list, job pages,
+the inbox and threads, company profiles and the dashboard) are served by
+the async views below instead of their Flask counterparts. They query
+through an AsyncSession on a read-only aiosqlite engine, so a request
+waiting on the database costs a coroutine, not a thread. At most
+ASYNC_DB_POOL_SIZE of them hold a connection at once; the rest wait on
+the loop. Templates are rendered on ASGI_RENDER_THREADS threads so Jinja
+does not stall the loop.
+
+Each async view runs inside a Flask request context, so the session,
+flashes, url_for, http_cache() and the after_request hooks work as in
+sync mode, and the views build their queries with the same helpers as
+the sync ones. A view that finds it has to write (a thread with messages
+to mark as read) raises Fallback before sending anything, and the request
+is served again by the WSGI app.
+
+Everything else runs the WSGI app on ASGI_WSGI_THREADS threads, as in
+sync mode: writes, uploads, exports, the message stream and long poll,
+and requests profiled with X-Profile.
+
+Needs SQLAlchemy's asyncio extra (greenlet) and aiosqlite, listed in
+requirement-asgi.txt. Sync serving does not import this module.
+"""
+import asyncio
+import contextvars
+import functools
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from flask import abort, current_app, flash, redirect, render_template, request, session, url_for
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from werkzeug.exceptions import HTTPException
+
+from app import create_app
+from database import configure_engine, read_only
+from extensions import db, job_views, page_cache, request_metrics
+from httpcache import http_cache, lookup_page
+from jobs import listing_query, next_page_url, recommended_job_ids
+from models import Company, CompanyReview, Conversation, Job, JobApplication, Message, SavedJob, User
+from pagination import InvalidCursor, keyset_query, page_from_rows
+
+ASYNC_METHODS = frozenset({'GET', 'HEAD'})
+
+# endpoint -> async view
+views = {}
+
+
+def async_view(endpoint):
+    """Serve GET and HEAD requests for `endpoint` with the decorated coroutine."""
+    def decorator(view):
+        views[endpoint] = view
+        return view
+    return decorator
+
+
+class Fallback(Exception):
+    """Raised by an async view to have the WSGI app serve the request instead."""
+
+
+def async_database_url(uri):
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:'):
+        raise RuntimeError('ASGI mode needs a SQLite database file')
+    return url.set(drivername='sqlite+aiosqlite')
+
+
+def build_environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope."""
+    script_name = scope.get('root_path', '').encode('utf8').decode('latin1')
+    path_info = scope['path'].encode('utf8').decode('latin1')
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope['query_string'].decode('ascii'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{name}'
+        value = value.decode('latin1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def response_start(status, headers):
+    return {'type': 'http.response.start', 'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers]}
+
+
+class AsyncApp:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        config = flask_app.config
+        self.engine = create_async_engine(async_database_url(config['SQLALCHEMY_DATABASE_URI']),
+                                          pool_size=config['ASYNC_DB_POOL_SIZE'], max_overflow=0)
+        # The async views only read; writes go through the WSGI app
+        configure_engine(self.engine.sync_engine, config, read_only=True)
+        if config['METRICS_ENABLED']:
+            request_metrics.watch_engine(self.engine.sync_engine)
+        self.slots = asyncio.Semaphore(config['ASYNC_DB_POOL_SIZE'])
+        self.renderers = ThreadPoolExecutor(config['ASGI_RENDER_THREADS'], thread_name_prefix='render')
+        self.threads = ThreadPoolExecutor(config['ASGI_WSGI_THREADS'], thread_name_prefix='wsgi')
+        # close=False leaves the parent's connections alone
+        os.register_at_fork(after_in_child=lambda: self.engine.sync_engine.dispose(close=False))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+        if scope['method'] in ASYNC_METHODS:
+            environ = build_environ(scope, io.BytesIO())
+            view = self.find_view(environ)
+            if view is not None and await self.run_async(view, environ, send):
+                return
+        await self.run_wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                self.renderers.shutdown(wait=False)
+                self.threads.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def find_view(self, environ):
+        # cProfile only sees its own thread, so profiled requests run on one
+        if 'HTTP_X_PROFILE' in environ:
+            return None
+        try:
+            endpoint, _ = self.flask_app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            # Not found, redirects and the like are answered by the WSGI app
+            return None
+        return views.get(endpoint)
+
+    # Async views
+
+    async def run_async(self, view, environ, send):
+        """Serve a request with an async view; returns False if it fell back to the WSGI app.
+
+        Mirrors Flask.full_dispatch_request with the view awaited. The
+        after_request hooks and session save are cheap enough for the loop.
+        """
+        app = self.flask_app
+        with app.request_context(environ):
+            try:
+                try:
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        rv = await view(self, **request.view_args)
+                except Fallback:
+                    return False
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                response = app.finalize_request(rv)
+            except Exception as e:
+                response = app.handle_exception(e)
+            body, status, headers = response.get_wsgi_response(environ)
+            body = b''.join(body)
+        await send(response_start(status, headers))
+        await send({'type': 'http.response.body', 'body': body})
+        return True
+
+    @asynccontextmanager
+    async def database(self):
+        """An AsyncSession on the aiosqlite engine, once a connection is free."""
+        async with self.slots, AsyncSession(self.engine) as db_session:
+            yield db_session
+
+    async def in_thread(self, func, *args):
+        """Run func(*args) on a render thread, in this request's context."""
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self.renderers, context.run, func, *args)
+
+    async def render(self, template, **context):
+        return await self.in_thread(functools.partial(render_template, template, **context))
+
+    # Everything else on threads
+
+    async def run_wsgi(self, scope, receive, send):
+        body = io.BytesIO()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        body.seek(0)
+        environ = build_environ(scope, body)
+        loop = asyncio.get_running_loop()
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started.append((status, headers))
+
+        result = await loop.run_in_executor(self.threads, self.flask_app, environ, start_response)
+        disconnected = asyncio.Event()
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            chunks = iter(result)
+            # Streams (the SSE feed) block between chunks, so each chunk is fetched on a thread
+            chunk = await loop.run_in_executor(self.threads, next, chunks, None)
+            await send(response_start(*started[-1]))
+            while chunk is not None and not disconnected.is_set():
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await loop.run_in_executor(self.threads, next, chunks, None)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            watcher.cancel()
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(self.threads, result.close)
+
+
+async def keyset_page(db_session, query, order, per_page):
+    """pagination.keyset_page() on an AsyncSession, from the `cursor` query argument."""
+    try:
+        query = keyset_query(query, order, cursor=request.args.get('cursor'), per_page=per_page)
+    except InvalidCursor:
+        abort(400)
+    return page_from_rows((await db_session.execute(query)).all(), per_page)
+
+
+async def saved_job_ids(db_session, jobs):
+    if 'user_id' not in session or not jobs:
+        return set()
+    return set(await db_session.scalars(db.select(SavedJob.job_id).where(
+        SavedJob.user_id == session['user_id'], SavedJob.job_id.in_([job.id for job in jobs]))))
+
+
+def login_required():
+    flash('Please login to access messages', 'error')
+    return redirect(url_for('accounts.login'))
+
+
+@async_view('jobs.jobs')
+async def jobs(server):
+    if 'user_id' in session:
+        return await render_jobs(server)
+    # Anonymous pages come from the page cache, as with httpcache.cached_page
+    key, cached = await server.in_thread(lookup_page)
+    if cached is not None:
+        return cached
+    body = await render_jobs(server)
+    if key is not None:
+        await server.in_thread(page_cache.set, key, body)
+    return body
+
+
+async def render_jobs(server):
+    query, per_page = listing_query(request.args, db.select(Job))
+    async with server.database() as db_session:
+        page = page_from_rows((await db_session.execute(query)).all(), per_page)
+        saved = await saved_job_ids(db_session, page.items)
+    return await server.render('jobs.html', jobs=page.items, saved_job_ids=saved,
+                               next_url=next_page_url(request.args, page))
+
+
+@async_view('jobs.job_details')
+async def job_details(server, job_id):
+    user_id = session.get('user_id')
+    async with server.database() as db_session:
+        job = await db_session.get(Job, job_id)
+        if job is None:
+            abort(404)
+        has_applied = user_id is not None and (await db_session.execute(db.select(JobApplication.id).filter_by(
+            job_id=job_id, applicant_id=user_id).limit(1))).first() is not None
+    # Counted in memory and written by the flush thread, see jobs.job_details
+    job_views.add(job_id)
+    not_modified = http_cache(('job', job.id, job.updated_at, has_applied), job.updated_at)
+    if not_modified:
+        return not_modified
+    return await server.render('job_details.html', job=job, has_applied=has_applied)
+
+
+@async_view('messaging.messages')
+async def messages(server):
+    if 'user_id' not in session:
+        return login_required()
+    user_id = session['user_id']
+    mine = db.or_(Conversation.user1_id == user_id, Conversation.user2_id == user_id)
+    unread = db.case((Conversation.user1_id == user_id, Conversation.user1_unread), else_=Conversation.user2_unread)
+    async with server.database() as db_session:
+        page = await keyset_page(db_session, db.select(Conversation).options(
+            db.joinedload(Conversation.user1), db.joinedload(Conversation.user2)
+        ).where(mine), [(Conversation.last_message_at, True), (Conversation.id, True)],
+            current_app.config['CONVERSATIONS_PAGE_SIZE'])
+        unread_count = await db_session.scalar(db.select(db.func.coalesce(db.func.sum(unread), 0)).where(mine))
+    next_url = url_for('messaging.messages', cursor=page.next_cursor) if page.has_more else None
+    return await server.render('messages.html', conversations=page.items, next_url=next_url,
+                               unread_count=unread_count)
+
+
+@async_view('messaging.conversation')
+async def conversation(server, other_user_id):
+    if 'user_id' not in session:
+        return login_required()
+    user_id = session['user_id']
+    user1_id, user2_id = sorted((user_id, other_user_id))
+    async with server.database() as db_session:
+        other_user = await db_session.get(User, other_user_id)
+        if other_user is None:
+            abort(404)
+        conversation = (await db_session.scalars(db.select(Conversation).filter_by(
+            user1_id=user1_id, user2_id=user2_id))).first()
+        if conversation is None or conversation.unread_for(user_id):
+            # Creating the thread or marking it read needs the write lock
+            raise Fallback
+        page = await keyset_page(db_session, db.select(Message).filter_by(conversation_id=conversation.id),
+                                 [(Message.sent_at, True), (Message.id, True)],
+                                 current_app.config['MESSAGES_PAGE_SIZE'])
+    older_url = url_for('messaging.api_conversation_messages', other_user_id=other_user_id,
+                        cursor=page.next_cursor) if page.has_more else None
+    return await server.render('conversation.html', conversation=conversation, messages=list(reversed(page.items)),
+                               other_user=other_user, older_url=older_url)
+
+
+@async_view('companies.company_profile')
+async def company_profile(server, company_id):
+    async with server.database() as db_session:
+        company = await db_session.get(Company, company_id)
+        if company is None:
+            abort(404)
+        job_count, last_job_update = (await db_session.execute(db.select(
+            db.func.count(Job.id), db.func.max(Job.updated_at)
+        ).where(Job.company_id == company_id))).one()
+        not_modified = http_cache(
+            ('company', company.id, company.updated_at, company.review_count, job_count, last_job_update),
+            last_modified=max(value for value in (company.updated_at, last_job_update) if value is not None),
+        )
+        if not_modified:
+            return not_modified
+        page = await keyset_page(db_session, db.select(CompanyReview).options(
+            db.joinedload(CompanyReview.user)
+        ).filter_by(company_id=company_id), [(CompanyReview.created_at, True), (CompanyReview.id, True)],
+            current_app.config['REVIEWS_PAGE_SIZE'])
+        jobs = (await db_session.scalars(db.select(Job).filter_by(company_id=company_id, is_active=True).order_by(
+            Job.created_at.desc(), Job.id.desc()).limit(10))).all()
+    next_url = url_for('companies.company_profile', company_id=company_id,
+                       cursor=page.next_cursor) if page.has_more else None
+    return await server.render('company.html', company=company, reviews=page.items, next_url=next_url,
+                               avg_rating=company.avg_rating, jobs=jobs, job_count=job_count)
+
+
+@async_view('accounts.dashboard')
+async def dashboard(server):
+    if 'user_id' not in session:
+        return await server.render('register.html')
+    # Scoring is numpy work and may refresh the skill index, so it runs on a
+    # thread with the sync session, as in sync mode; usually it is a cache hit
+    job_ids = await server.in_thread(recommendations, session['user_id'])
+    async with server.database() as db_session:
+        jobs_by_id = {job.id: job for job in await db_session.scalars(db.select(Job).where(Job.id.in_(job_ids)))}
+    return await server.render('home.html', recommended_jobs=[jobs_by_id[job_id] for job_id in job_ids
+                                                              if job_id in jobs_by_id])
+
+
+@read_only
+def recommendations(user_id):
+    try:
+        return recommended_job_ids(user_id)
+    finally:
+        # Return the connection from this thread, not from the loop's teardown
+        db.session.remove()
+
+
+def create_asgi_app(config=None):
+    return AsyncApp(create_app(config))
+
+
+def __getattr__(name):
+    # Built on first use, like app.app
+    if name == 'app':
+        global app
+        app = create_asgi_app()
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,256 @@
+"""Sync (gthread) and ASGI serving side by side at high connection counts.
+
+Starts one gunicorn worker per mode from gunicorn.conf.py:
+
+    sync    the gthread worker, --threads request threads
+    asgi    ASGI=1: the uvicorn worker running asgi.py, the async views
+            querying through aiosqlite and everything else on --threads threads
+
+and for each --connections count keeps that many keep-alive connections
+busy for --seconds, each logged in as its own user and cycling through
+the jobs list, a job, the inbox, a conversation, a company page and the
+dashboard. Reports requests per second, p50/p99 latency, errors, and the
+worker's RSS and PSS idle and at its peak under load, from which the
+memory each extra connection costs.
+
+The client runs in this process on the same machine, so on a small box it
+competes with the worker for CPU; compare the modes, not absolute numbers.
+Needs requirement-asgi.txt and gunicorn installed, and Linux for
+/proc/<pid>/smaps_rollup.
+
+Usage (from the website/ directory):
+
+    python benchmarks/asgi_bench.py [--jobs 2000] [--seconds 10] [--threads 8]
+        [--connections 50 200 1000] [--out asgi_results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+WEBSITE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, WEBSITE)
+
+PAGES = ('/jobs', '/jobs?title={title}', '/job/{job_id}', '/messages', '/conversation/{other_id}',
+         '/company/{company_id}', '/dashboard')
+# Searched words from datagen.TITLES
+TITLES = ('developer', 'engineer', 'data')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def memory(pid):
+    """RSS and PSS of a process in MiB."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {'rss_mib': round(fields['Rss'] / 1024, 1), 'pss_mib': round(fields['Pss'] / 1024, 1)}
+
+
+def session_cookies(path):
+    """(session cookie, conversation partner) for every user with a conversation."""
+    import app as m
+    serializer = m.app.session_interface.get_signing_serializer(m.app)
+    connection = sqlite3.connect(path)
+    try:
+        pairs = connection.execute('SELECT user1_id, user2_id FROM conversation').fetchall()
+    finally:
+        connection.close()
+    return [(f"session={serializer.dumps({'user_id': user_id, 'user_name': f'User {user_id}'})}", other_id)
+            for user_id, other_id in pairs]
+
+
+class Server:
+    """One gunicorn master with a single worker."""
+
+    def __init__(self, mode, env, threads):
+        self.port = free_port()
+        env = dict(env, WEB_CONCURRENCY='1', WEB_THREADS=str(threads), ASGI_WSGI_THREADS=str(threads),
+                   BIND=f'127.0.0.1:{self.port}', ASGI='1' if mode == 'asgi' else '0')
+        self.process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], cwd=WEBSITE,
+                                        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{self.port}/about', timeout=5):
+                    break
+            except OSError:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f'{mode} server did not start:\n{self.process.stderr.read().decode()}')
+                time.sleep(0.2)
+        with open(f'/proc/{self.process.pid}/task/{self.process.pid}/children') as f:
+            self.worker_pid = int(f.read().split()[0])
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait(30)
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+async def client(port, cookie, other_id, jobs, companies, deadline, results, rng):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        if writer is None:
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            except OSError:
+                results.append((None, 0.0))
+                await asyncio.sleep(0.1)
+                continue
+        path = rng.choice(PAGES).format(title=rng.choice(TITLES), job_id=rng.randint(1, jobs), other_id=other_id,
+                                        company_id=rng.randint(1, companies))
+        started = time.perf_counter()
+        try:
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nCookie: {cookie}\r\n\r\n'.encode())
+            status, keep_alive = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError):
+            status, keep_alive = None, False
+        results.append((status, time.perf_counter() - started))
+        if not keep_alive:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+def load(server, connections, seconds, cookies, jobs, companies):
+    """Run `connections` clients for `seconds`; returns (results, elapsed, peak memory)."""
+    results = []
+    peak = {'rss_mib': 0, 'pss_mib': 0}
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.2):
+            current = memory(server.worker_pid)
+            for key in peak:
+                peak[key] = max(peak[key], current[key])
+
+    async def run():
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*[
+            client(server.port, *cookies[i % len(cookies)], jobs, companies, deadline, results, random.Random(i))
+            for i in range(connections)
+        ])
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    started = time.perf_counter()
+    try:
+        asyncio.run(run())
+    finally:
+        done.set()
+        sampler.join()
+    return results, time.perf_counter() - started, peak
+
+
+def summarize(results, elapsed):
+    latencies = sorted(seconds for status, seconds in results if status == 200)
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1) if latencies else None
+
+    return {
+        'requests_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': percentile(0.5),
+        'p99_ms': percentile(0.99),
+        'errors': sum(status != 200 for status, _ in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--threads', type=int, default=8, help='WEB_THREADS and ASGI_WSGI_THREADS.')
+    parser.add_argument('--connections', type=int, nargs='+', default=[50, 200, 1000])
+    parser.add_argument('--out', help='Write the results here as JSON.')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'asgi.db')
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + path, TASK_WORKERS='0', UPLOAD_STORAGE_URL='memory',
+               JINJA_CACHE_DIR=os.path.join(directory, 'jinja'))
+    print(f'Generating {args.jobs} jobs into {path}')
+    subprocess.run([sys.executable, os.path.join(WEBSITE, 'benchmarks', 'datagen.py'), path, str(args.jobs)],
+                   cwd=WEBSITE, env=env, check=True, capture_output=True)
+    os.environ.update(env)
+    from benchmarks.datagen import scale
+    cookies = session_cookies(path)
+    companies = scale(args.jobs)['company']
+
+    print(f'1 worker, {args.threads} threads, {args.seconds:.0f}s per run, {os.cpu_count()} CPUs')
+    print(f"{'mode':5} {'conns':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>9} {'errors':>7} "
+          f"{'RSS MiB':>8} {'PSS MiB':>8} {'KiB/conn':>9}")
+    results = {}
+    try:
+        for mode in ('sync', 'asgi'):
+            server = Server(mode, env, args.threads)
+            try:
+                # One short run warms up templates and the connection pools before measuring idle memory
+                load(server, 10, 1, cookies, args.jobs, companies)
+                idle = memory(server.worker_pid)
+                print(f"{mode:5} {'idle':>6} {'':>8} {'':>8} {'':>9} {'':>7} {idle['rss_mib']:8.1f} "
+                      f"{idle['pss_mib']:8.1f}")
+                results[mode] = {'idle': idle}
+                for connections in args.connections:
+                    run, elapsed, peak = load(server, connections, args.seconds, cookies, args.jobs, companies)
+                    summary = dict(summarize(run, elapsed), **{f'peak_{key}': value for key, value in peak.items()})
+                    summary['kib_per_connection'] = round((peak['rss_mib'] - idle['rss_mib']) * 1024 / connections, 1)
+                    results[mode][str(connections)] = summary
+                    print(f"{mode:5} {connections:6} {summary['requests_per_s']:8.1f} {summary['p50_ms'] or 0:8.1f} "
+                          f"{summary['p99_ms'] or 0:9.1f} {summary['errors']:7} {peak['rss_mib']:8.1f} "
+                          f"{peak['pss_mib']:8.1f} {summary['kib_per_connection']:9.1f}")
+            finally:
+                server.stop()
+    finally:
+        shutil.rmtree(directory)
+
+    if args.out:
+        report = {'meta': {'jobs': args.jobs, 'seconds': args.seconds, 'threads': args.threads,
+                           'cpus': os.cpu_count(), 'python': platform.python_version()},
+                  'results': results}
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Wrote {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""Seeded synthetic data for benchmarks and load tests.
+
+Fills every table the pages read from at a scale given in jobs; the other
+tables are sized from it with the ratios below. The same seed and scale
+always produce the same rows, so runs against two versions of the app
+compare like with like. Rows are inserted in bulk, then the derived data
+(search index, job counters, inbox counters, company ratings, skills) is
+rebuilt with the same helpers the migrations use.
+
+Usage (from the website/ directory):
+
+    python benchmarks/datagen.py DATABASE_PATH [jobs] [seed]
+
+Defaults to 10000 jobs and seed 42. Every generated user has the password
+PASSWORD; user 1 is the employer posting the first company's jobs.
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = 'bench-password'
+BATCH = 10000
+
+# Rows per job, or per user / company / conversation
+USERS_PER_JOB = 0.2
+COMPANIES_PER_JOB = 0.01
+APPLICATIONS_PER_JOB = 2
+SAVES_PER_JOB = 1
+CONVERSATIONS_PER_USER = 1
+MESSAGES_PER_CONVERSATION = 8
+REVIEWS_PER_COMPANY = 5
+
+SKILLS = ('python java javascript typescript golang rust sql postgresql mysql docker kubernetes react angular '
+          'vue django flask fastapi spring aws azure gcp spark kafka linux terraform pandas airflow excel '
+          'tableau figma seo salesforce').split()
+TITLES = ('Backend Developer', 'Data Engineer', 'Frontend Developer', 'DevOps Engineer', 'Data Scientist',
+          'Product Manager', 'QA Engineer', 'Mobile Developer', 'Sales Executive', 'UX Designer')
+LOCATIONS = ('Pune', 'Delhi', 'Bangalore', 'Mumbai', 'Hyderabad', 'Chennai', 'Remote')
+TYPES = ('full-time', 'part-time', 'contract', 'internship')
+WORDS = [f'word{i}' for i in range(3000)]
+STATUSES = ('pending', 'pending', 'reviewed', 'accepted', 'rejected')
+
+
+def scale(jobs):
+    """Row counts for each table at a given number of jobs."""
+    users = max(100, int(jobs * USERS_PER_JOB))
+    companies = max(10, int(jobs * COMPANIES_PER_JOB))
+    conversations = users * CONVERSATIONS_PER_USER
+    return {
+        'user': users,
+        'user_profile': users,
+        'company': companies,
+        'job': jobs,
+        'job_application': jobs * APPLICATIONS_PER_JOB,
+        'saved_job': jobs * SAVES_PER_JOB,
+        'conversation': conversations,
+        'message': conversations * MESSAGES_PER_CONVERSATION,
+        'company_review': companies * REVIEWS_PER_COMPANY,
+    }
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _insert(m, model, rows):
+    """Insert an iterable of row dicts in batches; returns the row count."""
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH:
+            m.db.session.execute(m.db.insert(model), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        m.db.session.execute(m.db.insert(model), batch)
+        count += len(batch)
+    m.db.session.commit()
+    return count
+
+
+def _pairs(rng, count, first_range, second_range):
+    """`count` distinct (a, b) pairs, with a and b drawn from 1..first_range / 1..second_range."""
+    count = min(count, first_range * second_range)
+    seen = set()
+    while len(seen) < count:
+        seen.add((rng.randint(1, first_range), rng.randint(1, second_range)))
+    return sorted(seen)
+
+
+def generate(m, jobs=10000, seed=42, now=None, log=print):
+    """Populate an empty, migrated database; returns {table: (rows, seconds)}."""
+    rng = random.Random(seed)
+    counts = scale(jobs)
+    now = now or datetime(2025, 1, 1)
+    password_hash = m.password_hasher.hash(PASSWORD)
+    timings = {}
+
+    def ago(max_days):
+        return now - timedelta(seconds=rng.randrange(max_days * 86400))
+
+    def step(table, model, rows):
+        started = time.perf_counter()
+        inserted = _insert(m, model, rows)
+        timings[table] = (inserted, round(time.perf_counter() - started, 3))
+        log(f'  {table}: {inserted} rows in {timings[table][1]:.1f}s')
+
+    users, companies = counts['user'], counts['company']
+    with m.app.app_context():
+        step('user', m.User, ({'name': f'User {i}', 'email': f'user{i}@example.com', 'password_hash': password_hash,
+                               'created_at': ago(365)} for i in range(1, users + 1)))
+        step('user_profile', m.UserProfile, ({
+            'user_id': i,
+            'skills': ', '.join(rng.sample(SKILLS, rng.randint(2, 6))),
+            'experience_years': rng.randint(0, 15),
+            'location': rng.choice(LOCATIONS),
+            'bio': _text(rng, 30),
+        } for i in range(1, users + 1)))
+        step('company', m.Company, ({
+            'name': f'Company {i}', 'description': _text(rng, 40), 'location': rng.choice(LOCATIONS),
+            'created_by': 1 if i == 1 else rng.randint(1, users), 'created_at': ago(365),
+        } for i in range(1, companies + 1)))
+
+        def job_rows():
+            for i in range(1, jobs + 1):
+                company_id = 1 if i <= jobs // 100 else rng.randint(1, companies)
+                low = rng.randrange(3, 20)
+                created = ago(90)
+                job = {
+                    'title': f'{rng.choice(TITLES)} {i}',
+                    'company': f'Company {company_id}',
+                    'company_id': company_id,
+                    'location': rng.choice(LOCATIONS),
+                    'type': rng.choice(TYPES),
+                    'description': f'{_text(rng, 40)} {" ".join(rng.sample(SKILLS, 3))} {_text(rng, 20)}',
+                    'requirements': ' '.join(rng.sample(SKILLS, 3)),
+                    'posted_by': 1 if company_id == 1 else rng.randint(1, users),
+                    'is_active': rng.random() > 0.05,
+                    'created_at': created,
+                    'updated_at': created,
+                }
+                salary = f'{low}-{low + rng.randrange(2, 15)} LPA'
+                job['salary'] = salary
+                job['salary_min'], job['salary_max'], job['salary_currency'], job['salary_period'] = \
+                    m.parse_salary(salary)
+                yield job
+        step('job', m.Job, job_rows())
+
+        step('job_application', m.JobApplication, ({
+            'job_id': job_id, 'applicant_id': user_id, 'status': rng.choice(STATUSES),
+            'cover_letter': _text(rng, 25), 'applied_at': ago(60),
+        } for job_id, user_id in _pairs(rng, counts['job_application'], jobs, users)))
+        step('saved_job', m.SavedJob, ({'user_id': user_id, 'job_id': job_id, 'saved_at': ago(60)}
+                                       for user_id, job_id in _pairs(rng, counts['saved_job'], users, jobs)))
+
+        pairs = [pair for pair in _pairs(rng, counts['conversation'] * 2, users, users) if pair[0] < pair[1]]
+        pairs = pairs[:counts['conversation']]
+        started = {}
+        step('conversation', m.Conversation, ({
+            'user1_id': user1_id, 'user2_id': user2_id, 'created_at': started.setdefault(i, ago(30)),
+            'last_message_at': started[i],
+        } for i, (user1_id, user2_id) in enumerate(pairs, 1)))
+
+        def message_rows():
+            for conversation_id, (user1_id, user2_id) in enumerate(pairs, 1):
+                sent = started[conversation_id]
+                for n in range(MESSAGES_PER_CONVERSATION):
+                    sender, receiver = (user1_id, user2_id) if rng.random() < 0.5 else (user2_id, user1_id)
+                    sent += timedelta(minutes=rng.randint(1, 600))
+                    yield {'conversation_id': conversation_id, 'sender_id': sender, 'receiver_id': receiver,
+                           'subject': '', 'content': _text(rng, 15), 'sent_at': sent,
+                           'is_read': n < MESSAGES_PER_CONVERSATION - 2 or rng.random() < 0.5}
+                started[conversation_id] = sent
+        step('message', m.Message, message_rows())
+        m.db.session.execute(m.db.update(m.Conversation), [
+            {'id': conversation_id, 'last_message_at': sent} for conversation_id, sent in started.items()
+        ])
+        m.db.session.commit()
+
+        step('company_review', m.CompanyReview, ({
+            'company_id': company_id, 'user_id': user_id, 'rating': rng.choice((1, 2, 3, 3, 4, 4, 4, 5, 5)),
+            'review_text': _text(rng, 30), 'created_at': ago(365),
+        } for company_id, user_id in _pairs(rng, counts['company_review'], companies, users)))
+
+        derived = time.perf_counter()
+        m.job_search.rebuild()
+        m.rebuild_job_stats(m.db.engine)
+        m.rebuild_conversation_counters(m.db.engine)
+        m.rebuild_company_ratings(m.db.engine)
+        m.rebuild_skills(m.db.engine, m.skill_vocabulary)
+        timings['derived'] = (None, round(time.perf_counter() - derived, 3))
+        log(f'  search index, counters and skills rebuilt in {timings["derived"][1]:.1f}s')
+    return timings
+
+
+def main(path, jobs=10000, seed=42):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(path)
+    os.environ.setdefault('TASK_WORKERS', '0')
+    import app as m
+    with m.app.app_context():
+        m.upgrade_database(log=lambda message: None)
+    print(f'Generating {jobs} jobs with seed {seed} into {path}')
+    generate(m, jobs, seed)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1], *[int(arg) for arg in sys.argv[2:4]])
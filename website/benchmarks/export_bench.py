@@ -0,0 +1,114 @@
+"""Peak memory and rows/sec of the streaming application export.
+
+Each measurement runs in a fresh child process so its peak RSS (VmHWM on
+Linux) belongs to that export alone. The streamed export is compared with
+building the same rows with .all() first.
+
+Usage (from the website/ directory):
+
+    python benchmarks/export_bench.py [applications]
+
+Defaults to 200000 applications spread over 2000 jobs of one employer.
+The streamed export still grows by SQLite's page cache and memory map
+(SQLITE_CACHE_SIZE and SQLITE_MMAP_SIZE); run with SQLITE_MMAP_SIZE=0
+SQLITE_CACHE_SIZE=-2000 to see Python's share alone, which stays flat.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+JOBS = 2000
+
+
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def populate(path, applications):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + path
+    import app as m
+    with m.app.app_context():
+        m.upgrade_database(log=lambda message: None)
+        applicants = max(1, applications // JOBS)
+        m.db.session.execute(m.db.insert(m.User), [
+            {'name': f'user {i}', 'email': f'user{i}@example.com', 'password_hash': 'x'} for i in range(applicants + 1)
+        ])
+        m.db.session.execute(m.db.insert(m.UserProfile), [
+            {'user_id': i, 'phone': '555-0100', 'location': 'Pune', 'skills': 'python, sql, docker',
+             'experience_years': i % 15} for i in range(2, applicants + 2)
+        ])
+        m.db.session.execute(m.db.insert(m.Job), [
+            {'title': f'Job {i}', 'company': 'Acme', 'location': 'Pune', 'salary': '50000', 'type': 'full-time',
+             'description': 'python sql', 'posted_by': 1} for i in range(JOBS)
+        ])
+        rows = []
+        for i in range(applications):
+            rows.append({'job_id': i % JOBS + 1, 'applicant_id': i // JOBS + 2, 'status': 'pending',
+                         'cover_letter': 'I would like to apply. ' * 20})
+            if len(rows) == 10000:
+                m.db.session.execute(m.db.insert(m.JobApplication), rows)
+                rows = []
+        if rows:
+            m.db.session.execute(m.db.insert(m.JobApplication), rows)
+        m.db.session.commit()
+
+
+def measure(path, mode):
+    """Run in the child process: export everything once and print rows, seconds and peak RSS."""
+    os.environ['DATABASE_URL'] = 'sqlite:///' + path
+    import app as m
+    client = m.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    if mode == 'stream':
+        response = client.get('/employer-dashboard/export/applications.csv', buffered=False)
+        rows = sum(chunk.count(b'\n') for chunk in response.response) - 1
+        response.close()
+    else:
+        with m.app.app_context():
+            # The usual ORM approach: load every row, then build the file
+            query = m.db.session.query(m.JobApplication, m.Job, m.User, m.UserProfile).join(
+                m.Job, m.Job.id == m.JobApplication.job_id).join(
+                m.User, m.User.id == m.JobApplication.applicant_id).outerjoin(
+                m.UserProfile, m.UserProfile.user_id == m.JobApplication.applicant_id).filter(m.Job.posted_by == 1)
+            results = query.order_by(m.JobApplication.id).all()
+            body = '\n'.join(f'{a.id},{job.title},{user.email},{a.status},{a.applied_at},{a.cover_letter}'
+                             for a, job, user, profile in results)
+            rows = body.count('\n') + 1
+    seconds = time.perf_counter() - started
+    print(rows, seconds, peak_rss_mb() - baseline, peak_rss_mb())
+
+
+def main(applications=200000):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    started = time.perf_counter()
+    populate(path, applications)
+    print(f'populated {applications} applications in {time.perf_counter() - started:.1f}s')
+
+    print(f"\n{'export':22} {'rows':>9} {'rows/sec':>10} {'peak RSS MB':>12} {'growth MB':>10}")
+    for mode, label in (('all', '.all() then write'), ('stream', 'streamed CSV')):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', path, mode],
+                                capture_output=True, text=True, check=True).stdout.split()
+        rows, seconds, growth, peak = int(output[0]), float(output[1]), float(output[2]), float(output[3])
+        print(f'{label:22} {rows:9} {rows / seconds:10.0f} {peak:12.1f} {growth:10.1f}')
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--measure']:
+        measure(sys.argv[2], sys.argv[3])
+    else:
+        main(*(int(arg) for arg in sys.argv[1:2]))
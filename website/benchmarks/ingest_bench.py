@@ -0,0 +1,81 @@
+"""Bulk ingestion throughput in rows/sec, against one post_job() form per job.
+
+Usage (from the website/ directory):
+
+    python benchmarks/ingest_bench.py [rows]
+
+Defaults to 50000 rows; 1% of them are duplicates and 1% are invalid.
+The form baseline posts 500 jobs.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = [f'word{i}' for i in range(2000)]
+SKILLS = 'python java sql docker kubernetes react django flask aws spark kafka linux'.split()
+
+
+def feed(count, rng, prefix):
+    records = []
+    for i in range(count):
+        records.append({
+            'title': f'{prefix} engineer {i}',
+            'company': f'Company {rng.randrange(2000)}',
+            'location': rng.choice(['Pune', 'Delhi', 'Bangalore', 'Remote']),
+            'salary': f'{rng.randrange(3, 20)}-{rng.randrange(20, 40)} LPA',
+            'type': 'full-time',
+            'description': ' '.join(rng.choice(WORDS) for _ in range(80)),
+            'requirements': ' '.join(rng.sample(SKILLS, 3)),
+        })
+    for i in range(0, count, 100):
+        records[i] = dict(records[i - 1]) if i else records[i]
+        if i + 1 < count:
+            records[i + 1] = {'title': 'missing the other fields'}
+    return records
+
+
+def main(rows=50000, form_rows=500):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    import app as m
+    with m.app.app_context():
+        m.upgrade_database(log=lambda message: None)
+        user = m.User(name='bench', email='bench@example.com', password_hash='x')
+        m.db.session.add(user)
+        m.db.session.commit()
+        user_id = user.id
+
+    rng = random.Random(42)
+    client = m.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+
+    started = time.perf_counter()
+    for record in feed(form_rows, rng, 'form'):
+        client.post('/post-job', data=dict(record, company_option='new', new_company_name=record.get('company')))
+    form_rate = form_rows / (time.perf_counter() - started)
+
+    with m.app.app_context():
+        summary = m.ingest_jobs(enumerate(feed(rows, rng, 'cli'), 1), user_id)
+    cli_rate = summary['rows_per_sec']
+    print(f"ingest_jobs(): {summary['inserted']} inserted, {summary['duplicates']} duplicates, "
+          f"{summary['error_count']} errors")
+
+    body = '\n'.join(json.dumps(record) for record in feed(rows, rng, 'ndjson'))
+    started = time.perf_counter()
+    response = client.post('/api/jobs/bulk', data=body, content_type='application/x-ndjson')
+    endpoint_rate = rows / (time.perf_counter() - started)
+    print(f"/api/jobs/bulk: {response.get_json()['inserted']} inserted")
+
+    print(f"\n{'path':28} {'rows/sec':>10}")
+    print(f"{'post_job() form, 1 per req':28} {form_rate:10.0f}")
+    print(f"{'flask ingest-jobs':28} {cli_rate:10.0f}")
+    print(f"{'/api/jobs/bulk (NDJSON)':28} {endpoint_rate:10.0f}")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
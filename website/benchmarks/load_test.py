@@ -0,0 +1,287 @@
+"""Scripted user scenarios against the test client and a real WSGI server.
+
+Builds (or reuses) a datagen.py database, then replays each scenario as
+logged-in generated users, first in-process through Flask's test client
+and then over HTTP against werkzeug's threaded server with several
+concurrent clients. Latency percentiles, throughput, server errors and
+SQL statements per request are written to a JSON file with sorted keys,
+so two runs can be compared with `--compare` or a plain diff.
+
+Usage (from the website/ directory):
+
+    python benchmarks/load_test.py [--jobs 10000] [--seed 42] [--requests 200]
+        [--concurrency 8] [--db PATH] [--out results.json] [--compare previous.json]
+
+Background task workers are disabled (TASK_WORKERS=0) so that SQL counts
+only include the requests themselves.
+"""
+import argparse
+import contextlib
+import http.cookiejar
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datagen
+
+SEARCH_WORDS = ('developer', 'engineer', 'data', 'python', 'manager', 'designer')
+
+
+# Each scenario picks one request as (method, path, form data) for a user
+def search(ctx, rng, user_id):
+    params = {'title': rng.choice(SEARCH_WORDS)}
+    if rng.random() < 0.5:
+        params['location'] = rng.choice(datagen.LOCATIONS)
+    return 'GET', '/jobs?' + urllib.parse.urlencode(params), None
+
+
+def job_detail(ctx, rng, user_id):
+    return 'GET', f'/job/{rng.randint(1, ctx["jobs"])}', None
+
+
+def dashboard(ctx, rng, user_id):
+    return 'GET', '/dashboard', None
+
+
+def inbox(ctx, rng, user_id):
+    return 'GET', '/messages', None
+
+
+def thread(ctx, rng, user_id):
+    partners = ctx['partners'].get(user_id) or [1]
+    return 'GET', f'/conversation/{rng.choice(partners)}', None
+
+
+def apply(ctx, rng, user_id):
+    return 'POST', f'/apply/{rng.randint(1, ctx["jobs"])}', {'cover_letter': 'Load test application'}
+
+
+def save_toggle(ctx, rng, user_id):
+    return 'POST', f'/api/save-job/{rng.randint(1, ctx["jobs"])}', {}
+
+
+SCENARIOS = {
+    'search': search,
+    'job_detail': job_detail,
+    'dashboard': dashboard,
+    'inbox': inbox,
+    'thread': thread,
+    'apply': apply,
+    'save_toggle': save_toggle,
+}
+
+
+def percentile(samples, p):
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def summarize(samples, errors, elapsed, statements):
+    samples = sorted(samples)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'p50_ms': round(percentile(samples, 0.5) * 1000, 2),
+        'p95_ms': round(percentile(samples, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(samples, 0.99) * 1000, 2),
+        'mean_ms': round(statistics.mean(samples) * 1000, 2),
+        'throughput_rps': round(len(samples) / elapsed, 1),
+        'sql_per_request': round(statements / len(samples), 2),
+    }
+
+
+class TestClientUser:
+    def __init__(self, m, user_id):
+        self.client = m.app.test_client()
+        with self.client.session_transaction() as session:
+            session['user_id'] = user_id
+            session['user_name'] = f'User {user_id}'
+
+    def request(self, method, path, data):
+        response = self.client.open(path, method=method, data=data)
+        response.close()
+        return response.status_code
+
+
+class HTTPUser:
+    def __init__(self, base_url, user_id):
+        self.base_url = base_url
+        # Redirects are not followed, so each sample is one request
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+                                                  NoRedirect)
+        status = self.request('POST', '/login', {'email': f'user{user_id}@example.com',
+                                                 'pass': datagen.PASSWORD})
+        if status != 302:
+            raise RuntimeError(f'Login failed for user {user_id}: {status}')
+
+    def request(self, method, path, data):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        try:
+            with self.opener.open(urllib.request.Request(self.base_url + path, data=body, method=method)) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def run_scenario(users, scenario, ctx, total, seed):
+    """Send `total` requests split over `users`, one thread per user; returns (samples, errors, seconds)."""
+    samples, errors = [], [0]
+    lock = threading.Lock()
+
+    def worker(index, user_id, user):
+        rng = random.Random(f'{seed}-{scenario.__name__}-{index}')
+        own = []
+        for _ in range(total // len(users)):
+            method, path, data = scenario(ctx, rng, user_id)
+            started = time.perf_counter()
+            status = user.request(method, path, data)
+            own.append(time.perf_counter() - started)
+            if status >= 500:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            samples.extend(own)
+
+    threads = [threading.Thread(target=worker, args=(index, user_id, user))
+               for index, (user_id, user) in enumerate(users)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, errors[0], time.perf_counter() - started
+
+
+def run_all(m, make_user, user_ids, ctx, total, seed, log):
+    from instrumentation import count_queries
+    users = [(user_id, make_user(user_id)) for user_id in user_ids]
+    with m.app.app_context():
+        engines = list(m.db.engines.values())
+    results = {}
+    for name, scenario in SCENARIOS.items():
+        with contextlib.ExitStack() as stack:
+            counters = [stack.enter_context(count_queries(engine)) for engine in engines]
+            samples, errors, elapsed = run_scenario(users, scenario, ctx, total, seed)
+        results[name] = summarize(samples, errors, elapsed, sum(counter.count for counter in counters))
+        log(f"  {name:12} p50 {results[name]['p50_ms']:8.2f} ms  p95 {results[name]['p95_ms']:8.2f} ms  "
+            f"p99 {results[name]['p99_ms']:8.2f} ms  {results[name]['throughput_rps']:8.1f} req/s  "
+            f"{results[name]['sql_per_request']:6.2f} SQL/req")
+    return results
+
+
+def compare(previous, current):
+    """Print p50/p95 and SQL count changes between two result files."""
+    for key in ('jobs', 'seed', 'requests_per_scenario', 'concurrency'):
+        if previous['meta'].get(key) != current['meta'][key]:
+            print(f"Warning: {key} differs ({previous['meta'].get(key)} vs {current['meta'][key]})")
+    print(f"{'':26} {'p50 ms':>16} {'p95 ms':>16} {'SQL/req':>14}")
+    for transport, scenarios in current['results'].items():
+        for name, now in scenarios.items():
+            before = previous.get('results', {}).get(transport, {}).get(name)
+            if before is None:
+                continue
+            cells = []
+            for key in ('p50_ms', 'p95_ms', 'sql_per_request'):
+                change = (now[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+                cells.append(f'{now[key]:8.2f} {change:+6.1f}%')
+            print(f'{transport + " " + name:26} ' + ' '.join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario and transport.')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent users against the server.')
+    parser.add_argument('--db', help='Database file; generated if it does not exist.')
+    parser.add_argument('--out', default='load_test_results.json')
+    parser.add_argument('--compare', help='Earlier results file to compare against.')
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), 'load_test.db')
+    generate = not os.path.exists(path)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(path)
+    os.environ['TASK_WORKERS'] = '0'
+    import app as m
+    # Request logging would dominate the server's own time
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    generation = None
+    if generate:
+        with m.app.app_context():
+            m.upgrade_database(log=lambda message: None)
+        print(f'Generating {args.jobs} jobs with seed {args.seed} into {path}')
+        generation = datagen.generate(m, args.jobs, args.seed)
+
+    with m.app.app_context():
+        jobs = m.db.session.query(m.db.func.max(m.Job.id)).scalar()
+        users = m.db.session.query(m.db.func.count(m.User.id)).scalar()
+        partners = {}
+        for user1_id, user2_id in m.db.session.query(m.Conversation.user1_id, m.Conversation.user2_id):
+            partners.setdefault(user1_id, []).append(user2_id)
+            partners.setdefault(user2_id, []).append(user1_id)
+    ctx = {'jobs': jobs, 'partners': partners}
+    rng = random.Random(args.seed)
+    user_ids = rng.sample(range(2, users + 1), args.concurrency)
+
+    results = {}
+    print('Flask test client, 1 user')
+    results['test_client'] = run_all(m, lambda user_id: TestClientUser(m, user_id), user_ids[:1], ctx,
+                                     args.requests, args.seed, print)
+
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, m.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    print(f'werkzeug threaded server, {args.concurrency} users')
+    try:
+        results['wsgi_server'] = run_all(m, lambda user_id: HTTPUser(base_url, user_id), user_ids, ctx,
+                                         args.requests, args.seed, print)
+    finally:
+        server.shutdown()
+
+    report = {
+        'meta': {
+            'jobs': jobs,
+            'users': users,
+            'seed': args.seed,
+            'requests_per_scenario': args.requests,
+            'concurrency': args.concurrency,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'generation': generation,
+        'results': results,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f'Wrote {args.out}')
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Login throughput and the latency of everything else during a login storm.
+
+Serves the app from a server with a fixed number of request threads, like
+one gunicorn worker with --threads, and for each configuration runs
+--logins clients posting to /api/login in a loop next to --browsers
+clients fetching /api/jobs pages:
+
+    inline      PASSWORD_HASH_WORKERS=0: every login hashes on its request thread
+    pool        hashes on --hash-workers threads, at most --max-pending waiting,
+                the rest answered with a 503
+
+Reports successful logins per second, shed logins (retried after 100 ms),
+and p50/p99 latency of the /api/jobs requests, which is what a login
+storm should not hurt.
+
+Usage (from the website/ directory):
+
+    python benchmarks/login_storm.py [--seconds 10] [--threads 8] [--logins 16] [--browsers 4]
+        [--hash-workers 2] [--max-pending 4] [--method scrypt:32768:8:1]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+JOBS = 500
+PASSWORD = 'storm-password'
+
+
+class PooledServer(BaseWSGIServer):
+    """Handles requests on a fixed pool of threads; the rest wait in the accept queue."""
+
+    request_queue_size = 128
+
+    def __init__(self, app, threads):
+        super().__init__('127.0.0.1', 0, app)
+        self.executor = ThreadPoolExecutor(threads)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.handle_in_thread, request, client_address)
+
+    def handle_in_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def setup(path, method):
+    os.environ.update(DATABASE_URL='sqlite:///' + path, TASK_WORKERS='0', UPLOAD_STORAGE_URL='memory',
+                      PASSWORD_HASH_METHOD=method)
+    import app as m
+    with m.app.app_context():
+        m.upgrade_database(log=lambda message: None)
+        m.db.session.execute(m.db.insert(m.User), [
+            {'name': 'Stormer', 'email': 'storm@example.com', 'password_hash': m.password_hasher.hash(PASSWORD)}
+        ])
+        m.db.session.execute(m.db.insert(m.Job), [
+            {'title': f'Job {i}', 'company': 'Acme', 'location': 'Pune', 'salary': '50000', 'type': 'full-time',
+             'description': 'python sql', 'requirements': 'docker', 'posted_by': 1} for i in range(JOBS)
+        ])
+        m.db.session.commit()
+    return m
+
+
+def request(base_url, path, body=None):
+    """(status, seconds) of one request."""
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base_url + path, data=data, method='POST' if data else 'GET',
+                                 headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    return status, time.perf_counter() - started
+
+
+def storm(base_url, seconds, logins, browsers):
+    deadline = time.perf_counter() + seconds
+    results = {'login': [], 'browse': []}
+
+    def login_client():
+        while time.perf_counter() < deadline:
+            status, seconds = request(base_url, '/api/login', {'email': 'storm@example.com', 'pass': PASSWORD})
+            results['login'].append((status, seconds))
+            if status == 503:
+                # An impatient client: retries well before the Retry-After second
+                time.sleep(0.1)
+
+    def browse_client(seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            results['browse'].append(request(base_url, f'/api/jobs?per_page=20&title=job+{rng.randrange(JOBS)}'))
+
+    threads = [threading.Thread(target=login_client) for _ in range(logins)]
+    threads += [threading.Thread(target=browse_client, args=(i,)) for i in range(browsers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def summarize(results, elapsed):
+    logins = results['login']
+    latencies = sorted(seconds for status, seconds in results['browse'])
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1)
+
+    return {
+        'logins_per_s': round(sum(status == 200 for status, _ in logins) / elapsed, 1),
+        'logins_shed': sum(status == 503 for status, _ in logins),
+        'login_errors': sum(status not in (200, 503) for status, _ in logins),
+        'browse_requests': len(latencies),
+        'browse_errors': sum(status != 200 for status, _ in results['browse']),
+        'browse_p50_ms': percentile(0.5),
+        'browse_p99_ms': percentile(0.99),
+        'browse_mean_ms': round(statistics.mean(latencies) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--threads', type=int, default=8, help='Request threads of the server.')
+    parser.add_argument('--logins', type=int, default=16, help='Clients logging in continuously.')
+    parser.add_argument('--browsers', type=int, default=4, help='Clients fetching job pages continuously.')
+    parser.add_argument('--hash-workers', type=int, default=2)
+    parser.add_argument('--max-pending', type=int, default=4)
+    parser.add_argument('--method', default='scrypt:32768:8:1', help='PASSWORD_HASH_METHOD.')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    m = setup(os.path.join(directory, 'storm.db'), args.method)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = PooledServer(m.app, args.threads)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    print(f'{args.method}, {args.threads} server threads, {args.logins} login and {args.browsers} browse clients, '
+          f'{args.seconds:.0f}s each, {os.cpu_count()} CPUs')
+    print(f"{'mode':8} {'logins/s':>9} {'shed':>6} {'browse/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    try:
+        for mode, workers in (('baseline', None), ('inline', 0), ('pool', args.hash_workers)):
+            if workers is None:
+                # No logins: what /api/jobs costs on an idle server
+                results, elapsed = storm(base_url, args.seconds / 2, 0, args.browsers)
+            else:
+                m.password_hasher.configure(args.method, workers, args.max_pending, timeout=30)
+                results, elapsed = storm(base_url, args.seconds, args.logins, args.browsers)
+            summary = summarize(results, elapsed)
+            print(f"{mode:8} {summary['logins_per_s']:9.1f} {summary['logins_shed']:6} "
+                  f"{summary['browse_requests'] / elapsed:9.1f} {summary['browse_p50_ms']:8.1f} "
+                  f"{summary['browse_p99_ms']:8.1f}")
+            if summary['login_errors'] or summary['browse_errors']:
+                print(f"  errors: {summary['login_errors']} logins, {summary['browse_errors']} pages")
+    finally:
+        server.shutdown()
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Render time of the keyset-paginated job listing, shallow vs deep pages.
+
+Usage (from the website/ directory):
+
+    python benchmarks/pagination_bench.py [jobs] [deep_page]
+
+Defaults to 500000 jobs and page 500.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def populate(m, count, rng):
+    with m.app.app_context():
+        user = m.User(name='bench', email='bench@example.com', password_hash='x')
+        m.db.session.add(user)
+        m.db.session.commit()
+        rows = []
+        for i in range(count):
+            rows.append({
+                'title': f'Job {i}',
+                'company': f'Company {i % 500}',
+                'location': rng.choice(('Hyderabad', 'Delhi', 'Mumbai', 'Pune')),
+                'salary': '50000-70000',
+                'type': 'full-time',
+                'description': 'Lorem ipsum dolor sit amet ' * 10,
+                # Many jobs share a timestamp, so the id tie-break matters
+                'created_at': datetime(2025, 1, 1) + timedelta(seconds=i // 100),
+                'posted_by': user.id,
+                'is_active': True,
+            })
+            if len(rows) == 10000:
+                m.db.session.execute(m.db.insert(m.Job), rows)
+                rows = []
+        if rows:
+            m.db.session.execute(m.db.insert(m.Job), rows)
+        m.db.session.commit()
+        m.job_search.rebuild()
+
+
+def measure(client, url, repeat=50):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main(count=500000, deep_page=500):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + path
+    import app as m
+    with m.app.app_context():
+        m.upgrade_database(log=lambda message: None)
+
+    start = time.perf_counter()
+    populate(m, count, random.Random(42))
+    print(f'{count} jobs loaded in {time.perf_counter() - start:.1f}s')
+
+    client = m.app.test_client()
+    url = '/api/jobs'
+    for _ in range(deep_page - 1):
+        url = client.get(url).get_json()['next_url']
+    deep_url = url.replace('/api/jobs', '/jobs', 1)
+
+    print(f"{'page':>6} {'p50 ms':>8} {'p99 ms':>8} {'peak KiB':>9}")
+    for label, target in (('1', '/jobs'), (str(deep_page), deep_url)):
+        p50, p99 = measure(client, target)
+        tracemalloc.start()
+        client.get(target)
+        peak = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+        print(f'{label:>6} {p50:8.2f} {p99:8.2f} {peak:9.0f}')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,112 @@
+"""Dashboard recommendation latency: legacy full scan vs the skill index.
+
+Usage (from the website/ directory):
+
+    python benchmarks/recommend_bench.py [jobs]
+
+Defaults to 100000 jobs.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SKILLS = ('python java golang rust sql docker kubernetes react django flask aws '
+          'azure spark kafka linux terraform pandas airflow excel sales marketing').split()
+FILLER = [f'word{i}' for i in range(5000)]
+
+
+def legacy_recommended_jobs(m, user_id, limit=5):
+    """The pre-index implementation, kept here for comparison."""
+    profile = m.UserProfile.query.filter_by(user_id=user_id).first()
+    user_skills = [skill.strip().lower() for skill in profile.skills.split(',')]
+    applied_job_ids = [a.job_id for a in m.JobApplication.query.filter_by(applicant_id=user_id).all()]
+    scored_jobs = []
+    for job in m.Job.query.all():
+        if job.id in applied_job_ids:
+            continue
+        score = 0
+        job_text = (job.description + ' ' + (job.requirements or '')).lower()
+        for skill in user_skills:
+            if skill in job_text:
+                score += 1
+        if score > 0:
+            scored_jobs.append((job, score))
+    scored_jobs.sort(key=lambda x: (-x[1], x[0].created_at), reverse=True)
+    return [job for job, score in scored_jobs[:limit]]
+
+
+def populate(m, count, rng):
+    with m.app.app_context():
+        user = m.User(name='bench', email='bench@example.com', password_hash='x')
+        m.db.session.add(user)
+        m.db.session.commit()
+        m.db.session.add(m.UserProfile(user_id=user.id, skills='python, docker, kafka, machine learning'))
+        rows = []
+        for i in range(count):
+            rows.append({
+                'title': f'Job {i}',
+                'company': f'Company {i % 500}',
+                'location': 'Pune',
+                'salary': '50000-70000',
+                'type': 'full-time',
+                'description': ' '.join(rng.choice(FILLER) for _ in range(60)),
+                'requirements': ' '.join(rng.sample(SKILLS, 3)),
+                'posted_by': user.id,
+                'is_active': True,
+            })
+            if len(rows) == 10000:
+                m.db.session.execute(m.db.insert(m.Job), rows)
+                rows = []
+        if rows:
+            m.db.session.execute(m.db.insert(m.Job), rows)
+        m.db.session.add_all(m.JobApplication(job_id=rng.randint(1, count), applicant_id=user.id) for _ in range(50))
+        m.db.session.commit()
+        return user.id
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main(count=100000):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    import app as m
+    with m.app.app_context():
+        m.upgrade_database(log=lambda message: None)
+
+    user_id = populate(m, count, random.Random(42))
+    client = m.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+
+    with m.app.app_context():
+        # Bulk inserts skip the mapper events that match job skills
+        start = time.perf_counter()
+        m.rebuild_skills(m.db.engine, m.skill_vocabulary)
+        print(f'{count} jobs, skill extraction {(time.perf_counter() - start) * 1000:.0f} ms')
+        start = time.perf_counter()
+        m.refresh_recommender()
+        print(f'{count} jobs, initial index build {(time.perf_counter() - start) * 1000:.0f} ms')
+        legacy = timed(lambda: legacy_recommended_jobs(m, user_id), 3)
+        indexed = timed(lambda: m.get_recommended_jobs(user_id), 50)
+    dashboard = timed(lambda: client.get('/dashboard'), 50)
+
+    print(f"{'':28} {'p50 ms':>9} {'p99 ms':>9}")
+    print(f"{'legacy get_recommended_jobs':28} {legacy[0]:9.1f} {legacy[1]:9.1f}")
+    print(f"{'indexed get_recommended_jobs':28} {indexed[0]:9.2f} {indexed[1]:9.2f}")
+    print(f"{'GET /dashboard':28} {dashboard[0]:9.2f} {dashboard[1]:9.2f}")
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
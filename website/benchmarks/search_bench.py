@@ -0,0 +1,97 @@
+"""Compare FTS5 search against the ILIKE fallback.
+
+Usage (from the website/ directory):
+
+    python benchmarks/search_bench.py 10000 100000 1000000
+
+Each scale is loaded into a throwaway SQLite database.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SKILLS = ('python java golang rust sql docker kubernetes react django flask aws '
+          'azure spark kafka linux terraform pandas airflow excel sales marketing').split()
+FILLER = [f'word{i}' for i in range(5000)]
+TITLES = ('Backend Developer', 'Data Engineer', 'Frontend Developer', 'DevOps Engineer',
+          'Product Manager', 'QA Analyst', 'Data Scientist', 'Sales Executive')
+CITIES = ('Hyderabad', 'Delhi', 'Mumbai', 'Pune', 'Bangalore', 'Bhubneswar')
+QUERIES = (
+    {'title': 'data'},
+    {'title': 'developer', 'location': 'pune'},
+    {'skills': ['kafka']},
+    {'skills': ['python', 'docker']},
+)
+
+
+def populate(m, count, rng):
+    with m.app.app_context():
+        user = m.User(name='bench', email='bench@example.com', password_hash='x')
+        m.db.session.add(user)
+        m.db.session.commit()
+        rows = []
+        for i in range(count):
+            rows.append({
+                'title': f'{rng.choice(TITLES)} {i}',
+                'company': f'Company {i % 500}',
+                'location': rng.choice(CITIES),
+                'salary': '50000-70000',
+                'type': 'full-time',
+                'description': ' '.join(rng.choice(FILLER) for _ in range(60)),
+                'requirements': ' '.join(rng.sample(SKILLS, 3)),
+                'posted_by': user.id,
+                'is_active': True,
+            })
+            if len(rows) == 10000:
+                m.db.session.execute(m.db.insert(m.Job), rows)
+                rows = []
+        if rows:
+            m.db.session.execute(m.db.insert(m.Job), rows)
+        m.db.session.commit()
+        m.job_search.rebuild()
+
+
+def run(m, use_fts, repeat=5):
+    timings = {}
+    with m.app.app_context():
+        m.job_search.available = use_fts
+        for params in QUERIES:
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                query, score = m.search_jobs(m.Job.query, **params)
+                m.keyset_page(query, m.job_order(score), per_page=50)
+                samples.append(time.perf_counter() - start)
+            timings[str(params)] = statistics.median(samples) * 1000
+        m.job_search.available = True
+    return timings
+
+
+def main(scales):
+    for count in scales:
+        path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+        os.environ['DATABASE_URL'] = 'sqlite:///' + path
+        sys.modules.pop('app', None)
+        import app as m
+        with m.app.app_context():
+            m.upgrade_database(log=lambda message: None)
+
+        start = time.perf_counter()
+        populate(m, count, random.Random(42))
+        print(f'\n{count} jobs loaded in {time.perf_counter() - start:.1f}s')
+        fts = run(m, True)
+        ilike = run(m, False)
+        print(f"{'query':48} {'ilike ms':>10} {'fts ms':>10} {'speedup':>8}")
+        for key in fts:
+            print(f'{key:48} {ilike[key]:10.2f} {fts[key]:10.2f} {ilike[key] / fts[key]:7.1f}x')
+        with m.app.app_context():
+            m.db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000])
@@ -0,0 +1,141 @@
+"""Write/read throughput and lock errors: default SQLite settings vs database.py.
+
+N writer threads run the transaction shape of apply_job() (insert the
+application unless it exists, bump the job's counters) while M reader
+threads fetch listing pages, all against one file for a fixed duration.
+
+Usage (from the website/ directory):
+
+    python benchmarks/sqlite_concurrency.py [writers] [readers] [seconds]
+
+Defaults to 8 writers, 8 readers and 5 seconds per configuration.
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+JOBS = 2000
+
+
+def setup(path):
+    """Build the seed database once with the app's schema."""
+    os.environ['DATABASE_URL'] = 'sqlite:///' + path
+    import app as m
+    with m.app.app_context():
+        m.upgrade_database(log=lambda message: None)
+        m.db.session.execute(m.db.insert(m.User), [
+            {'name': f'user {i}', 'email': f'user{i}@example.com', 'password_hash': 'x'} for i in range(1000)
+        ])
+        m.db.session.execute(m.db.insert(m.Job), [
+            {'title': f'Job {i}', 'company': 'Acme', 'location': 'Pune', 'salary': '50000', 'type': 'full-time',
+             'description': 'python sql', 'posted_by': 1} for i in range(JOBS)
+        ])
+        m.db.session.commit()
+        m.db.engine.dispose()
+    return m
+
+
+def write(conn, rng):
+    job_id, applicant_id = rng.randrange(1, JOBS + 1), rng.randrange(1, 1001)
+    inserted = conn.execute(text(
+        "INSERT INTO job_application (job_id, applicant_id, status, applied_at) "
+        "VALUES (:job, :user, 'pending', CURRENT_TIMESTAMP) "
+        'ON CONFLICT (job_id, applicant_id) DO NOTHING RETURNING id'
+    ), {'job': job_id, 'user': applicant_id}).first()
+    if inserted is not None:
+        conn.execute(text(
+            'INSERT INTO job_stats (job_id, applications_count, pending_count, reviewed_count, accepted_count, '
+            'rejected_count, saves_count, views_count) VALUES (:job, 1, 1, 0, 0, 0, 0, 0) '
+            'ON CONFLICT (job_id) DO UPDATE SET applications_count = applications_count + 1, '
+            'pending_count = pending_count + 1'
+        ), {'job': job_id})
+
+
+def read(conn, rng):
+    conn.execute(text(
+        'SELECT j.*, s.applications_count FROM job j LEFT JOIN job_stats s ON s.job_id = j.id '
+        'ORDER BY j.created_at DESC, j.id DESC LIMIT 20 OFFSET :offset'
+    ), {'offset': rng.randrange(0, JOBS - 20)}).fetchall()
+
+
+def worker(engine, task, context, deadline, results, seed):
+    rng = random.Random(seed)
+    done = errors = 0
+    # The tuned engine picks BEGIN IMMEDIATE from the request method, as in the app
+    with context(), engine.connect() as conn:
+        while time.perf_counter() < deadline:
+            try:
+                with conn.begin():
+                    task(conn, rng)
+                done += 1
+            except OperationalError:
+                errors += 1
+    results.append((task.__name__, done, errors))
+
+
+def run(engine, writers, readers, seconds, write_context):
+    results = []
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=worker, args=(engine, write, write_context, deadline, results, i))
+               for i in range(writers)]
+    threads += [threading.Thread(target=worker, args=(engine, read, nullcontext, deadline, results, 1000 + i))
+                for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    totals = {}
+    for name, done, errors in results:
+        ops, errs = totals.get(name, (0, 0))
+        totals[name] = (ops + done, errs + errors)
+    return totals
+
+
+def main():
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    directory = tempfile.mkdtemp()
+    m = setup(os.path.join(directory, 'seed.db'))
+    from database import configure_engine
+    configurations = []
+
+    # Before: rollback journal, no busy timeout, pysqlite's implicit deferred transactions
+    shutil.copy(os.path.join(directory, 'seed.db'), os.path.join(directory, 'before.db'))
+    engine = create_engine('sqlite:///' + os.path.join(directory, 'before.db'),
+                           connect_args={'timeout': 0}, pool_size=writers + readers)
+    with engine.begin() as conn:
+        conn.exec_driver_sql('PRAGMA journal_mode = DELETE')
+    configurations.append(('defaults', engine, nullcontext))
+
+    # After: database.py pragmas; once with deferred writes to show what
+    # BEGIN IMMEDIATE adds, then with writers inside a POST request context
+    for name, context in (('deferred', nullcontext), ('tuned', lambda: m.app.test_request_context(method='POST'))):
+        path = os.path.join(directory, f'{name}.db')
+        shutil.copy(os.path.join(directory, 'seed.db'), path)
+        engine = create_engine('sqlite:///' + path, pool_size=writers + readers)
+        configure_engine(engine, m.app.config)
+        configurations.append((name, engine, context))
+
+    print(f'{writers} writers, {readers} readers, {seconds:.0f}s each')
+    print(f"{'config':10} {'writes/s':>10} {'write errs':>11} {'reads/s':>10} {'read errs':>10}")
+    for name, engine, write_context in configurations:
+        totals = run(engine, writers, readers, seconds, write_context)
+        writes, write_errors = totals.get('write', (0, 0))
+        reads, read_errors = totals.get('read', (0, 0))
+        print(f'{name:10} {writes / seconds:10.0f} {write_errors:11} {reads / seconds:10.0f} {read_errors:10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Idle SSE connections per worker and message delivery latency.
+
+Starts the app on a threaded WSGI server, opens `connections` idle
+/api/messages/stream connections spread over `users` receivers, then sends
+messages through the JSON send endpoint and measures how long each copy
+takes to reach every connection of its receiver.
+
+The server here runs a thread per connection, so MESSAGE_MAX_SUBSCRIBERS
+is raised to `connections`. Under gunicorn's gthread workers each stream
+holds one of WEB_THREADS, and the default limit keeps most of them free
+for ordinary requests.
+
+Usage (from the website/ directory):
+
+    python benchmarks/sse_load.py [connections] [users] [messages]
+
+Defaults to 2000 connections, 50 users and 100 messages.
+"""
+import http.client
+import json
+import logging
+import os
+import random
+import resource
+import selectors
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def rss_mb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def session_cookie(m, user_id):
+    serializer = m.app.session_interface.get_signing_serializer(m.app)
+    return f"{m.app.config.get('SESSION_COOKIE_NAME', 'session')}={serializer.dumps({'user_id': user_id})}"
+
+
+def open_streams(port, cookies, batch=100):
+    """Open one stream per cookie, `batch` at a time so the listen backlog never overflows."""
+    selector = selectors.DefaultSelector()
+    streams = []
+    for start in range(0, len(cookies), batch):
+        pending = set()
+        for cookie in cookies[start:start + batch]:
+            sock = socket.create_connection(('127.0.0.1', port))
+            sock.sendall((
+                'GET /api/messages/stream HTTP/1.1\r\nHost: localhost\r\n'
+                f'Accept: text/event-stream\r\nCookie: {cookie}\r\n\r\n'
+            ).encode())
+            sock.setblocking(False)
+            stream = {'sock': sock, 'buffer': b'', 'received': {}}
+            streams.append(stream)
+            selector.register(sock, selectors.EVENT_READ, stream)
+            pending.add(id(stream))
+        # Wait for the 'retry:' preamble so every stream is subscribed
+        while pending:
+            for key, _ in selector.select(timeout=10):
+                stream = key.data
+                stream['buffer'] += stream['sock'].recv(65536)
+                if b'retry:' in stream['buffer']:
+                    pending.discard(id(stream))
+    return selector, streams
+
+
+def read_events(selector, until, expected=None):
+    """Record message arrival times until `until`, or until `expected` copies arrive."""
+    seen = 0
+    while (expected is None or seen < expected) and time.perf_counter() < until:
+        for key, _ in selector.select(timeout=0.5):
+            stream = key.data
+            stream['buffer'] += stream['sock'].recv(65536)
+            now = time.perf_counter()
+            *events, stream['buffer'] = stream['buffer'].split(b'\n\n')
+            for raw in events:
+                for line in raw.split(b'\n'):
+                    if line.startswith(b'data: '):
+                        event = json.loads(line[len(b'data: '):])
+                        if event['type'] == 'message':
+                            stream['received'][event['message']['id']] = now
+                            seen += 1
+    return seen
+
+
+def main():
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    messages = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    threading.stack_size(256 * 1024)
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['MESSAGE_MAX_SUBSCRIBERS'] = str(connections)
+    import app as m
+    with m.app.app_context():
+        m.upgrade_database(log=lambda message: None)
+    from werkzeug.serving import make_server
+
+    with m.app.app_context():
+        sender = m.User(name='sender', email='sender@example.com', password_hash='x')
+        receivers = [m.User(name=f'user {i}', email=f'user{i}@example.com', password_hash='x') for i in range(users)]
+        m.db.session.add_all([sender] + receivers)
+        m.db.session.commit()
+        sender_id = sender.id
+        receiver_ids = [user.id for user in receivers]
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, m.app, threaded=True)
+    server.socket.listen(1024)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+
+    baseline_rss = rss_mb()
+    started = time.perf_counter()
+    owners = [receiver_ids[i % users] for i in range(connections)]
+    selector, streams = open_streams(port, [session_cookie(m, owner) for owner in owners])
+    print(f'{connections} streams open in {time.perf_counter() - started:.1f}s, '
+          f'{threading.active_count()} threads, RSS +{rss_mb() - baseline_rss:.0f} MB, '
+          f'broker {m.app.extensions["message_broker"].stats()}')
+
+    rng = random.Random(42)
+    sender_cookie = session_cookie(m, sender_id)
+    client = http.client.HTTPConnection('127.0.0.1', port)
+    sent = {}
+    streams_per_user = {receiver_id: owners.count(receiver_id) for receiver_id in receiver_ids}
+    expected = delivered = 0
+    for _ in range(messages):
+        receiver_id = rng.choice(receiver_ids)
+        started = time.perf_counter()
+        client.request('POST', f'/conversation/{receiver_id}', body='content=ping',
+                       headers={'Cookie': sender_cookie, 'Accept': 'application/json',
+                                'Content-Type': 'application/x-www-form-urlencoded'})
+        response = client.getresponse()
+        message = json.loads(response.read())['message']
+        sent[message['id']] = started
+        expected += streams_per_user[receiver_id]
+        delivered += read_events(selector, time.perf_counter() + 0.05)
+
+    delivered += read_events(selector, time.perf_counter() + 10, expected - delivered)
+    latencies = sorted(
+        (arrived - sent[message_id]) * 1000
+        for stream in streams for message_id, arrived in stream['received'].items()
+    )
+    print(f'{delivered} of {expected} deliveries')
+    if latencies:
+        print(f'send-to-receive latency  p50 {statistics.median(latencies):.1f} ms  '
+              f'p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f} ms  max {latencies[-1]:.1f} ms')
+
+    for stream in streams:
+        stream['sock'].close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
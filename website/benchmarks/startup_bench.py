@@ -0,0 +1,190 @@
+"""Worker cold-start time and per-worker memory, with and without preloading.
+
+Cold start runs a fresh interpreter per sample and times `import app`,
+create_app() and the first request, once with an empty Jinja bytecode
+cache and once with a filled one.
+
+Memory forks --workers processes the way a pre-forking server does and
+has each serve --requests requests as a logged-in user before all of them
+measure themselves at the same moment:
+
+    no-preload      workers import and build the app after the fork
+    preload         the master builds the app, workers inherit it
+    preload+warm    the master also runs app.warm_up() before forking
+
+RSS counts shared pages in full in every worker; PSS splits them between
+the processes sharing them and USS is memory only that worker holds, so
+PSS and USS show what preloading saves. Needs Linux for /proc/self/smaps_rollup.
+
+Usage (from the website/ directory):
+
+    python benchmarks/startup_bench.py [--jobs 2000] [--samples 5] [--workers 4]
+        [--requests 50] [--out startup_results.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+WEBSITE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, WEBSITE)
+
+COLD_START = '''
+import json, sys, time
+started = time.perf_counter()
+import app as m
+imported = time.perf_counter()
+application = m.create_app()
+created = time.perf_counter()
+response = application.test_client().get(sys.argv[1])
+assert response.status_code == 200, response.status_code
+done = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'create_app_ms': (created - imported) * 1000,
+                  'first_request_ms': (done - created) * 1000}))
+'''
+
+PAGES = ('/about', '/jobs', '/dashboard', '/messages', '/job/{job_id}', '/jobs?title=python')
+
+
+def cold_start(path, samples, env, cache_dir=None):
+    """Median timings of `samples` fresh interpreters; an empty cache_dir is recreated for every sample."""
+    results = []
+    for _ in range(samples):
+        sample_env = dict(env)
+        if cache_dir is None:
+            sample_env['JINJA_CACHE_DIR'] = tempfile.mkdtemp()
+        else:
+            sample_env['JINJA_CACHE_DIR'] = cache_dir
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', COLD_START, path], cwd=WEBSITE, env=sample_env,
+                                check=True, capture_output=True, text=True).stdout
+        timings = json.loads(output)
+        timings['process_ms'] = (time.perf_counter() - started) * 1000
+        results.append(timings)
+        if cache_dir is None:
+            shutil.rmtree(sample_env['JINJA_CACHE_DIR'])
+    return {key: round(statistics.median(result[key] for result in results), 1) for key in results[0]}
+
+
+def memory():
+    """This process's RSS, PSS and USS in MiB."""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss_mib': round(fields['Rss'] / 1024, 1),
+        'pss_mib': round(fields['Pss'] / 1024, 1),
+        'uss_mib': round((fields['Private_Clean'] + fields['Private_Dirty']) / 1024, 1),
+    }
+
+
+def serve(application, requests, user_id, jobs):
+    client = application.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['user_name'] = f'User {user_id}'
+    for i in range(requests):
+        response = client.get(PAGES[i % len(PAGES)].format(job_id=i % jobs + 1))
+        assert response.status_code == 200, response.status_code
+        response.close()
+
+
+def worker(application, requests, user_id, jobs, barrier, results):
+    started = time.perf_counter()
+    if application is None:
+        import app as m
+        application = m.create_app()
+    ready = time.perf_counter() - started
+    serve(application, requests, user_id, jobs)
+    # Measure only once every worker is up, so PSS splits shared pages between all of them
+    barrier.wait()
+    results.put(dict(memory(), ready_ms=round(ready * 1000, 1)))
+    barrier.wait()
+
+
+def fork_workers(mode, workers, requests, jobs):
+    """Run one master in its own process so modes do not share imports; returns per-worker averages."""
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+
+    def master():
+        application = None
+        if mode != 'no-preload':
+            import app as m
+            application = m.create_app()
+            if mode == 'preload+warm':
+                m.warm_up(application)
+        barrier = context.Barrier(workers)
+        processes = [context.Process(target=worker, args=(application, requests, user_id, jobs, barrier, results))
+                     for user_id in range(2, workers + 2)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+    process = context.Process(target=master)
+    process.start()
+    samples = [results.get() for _ in range(workers)]
+    process.join()
+    return {key: round(statistics.mean(sample[key] for sample in samples), 1) for key in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=2000)
+    parser.add_argument('--samples', type=int, default=5, help='Interpreters per cold-start measurement.')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=50, help='Requests each worker serves before measuring.')
+    parser.add_argument('--out', help='Write the results here as JSON.')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'startup.db')
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + path, TASK_WORKERS='0', UPLOAD_STORAGE_URL='memory')
+    print(f'Generating {args.jobs} jobs into {path}')
+    subprocess.run([sys.executable, os.path.join(WEBSITE, 'benchmarks', 'datagen.py'), path, str(args.jobs)],
+                   cwd=WEBSITE, env=env, check=True, capture_output=True)
+    os.environ.update(env)
+
+    results = {'cold_start': {}, 'workers': {}}
+    cache_dir = os.path.join(directory, 'jinja')
+    os.makedirs(cache_dir)
+    for label, directory_for_sample in (('empty template cache', None), ('filled template cache', cache_dir)):
+        if directory_for_sample is not None:
+            # One run fills the cache for the measured ones
+            cold_start('/about', 1, env, cache_dir)
+        timings = cold_start('/about', args.samples, env, directory_for_sample)
+        results['cold_start'][label] = timings
+        print(f"{label:22} process {timings['process_ms']:7.1f} ms  import {timings['import_ms']:6.1f} ms  "
+              f"create_app {timings['create_app_ms']:6.1f} ms  first request {timings['first_request_ms']:6.1f} ms")
+
+    os.environ['JINJA_CACHE_DIR'] = cache_dir
+    for mode in ('no-preload', 'preload', 'preload+warm'):
+        averages = fork_workers(mode, args.workers, args.requests, args.jobs)
+        results['workers'][mode] = averages
+        print(f"{mode:14} per worker: RSS {averages['rss_mib']:6.1f} MiB  PSS {averages['pss_mib']:6.1f} MiB  "
+              f"USS {averages['uss_mib']:6.1f} MiB  ready in {averages['ready_ms']:6.1f} ms")
+
+    if args.out:
+        report = {'meta': {'jobs': args.jobs, 'samples': args.samples, 'workers': args.workers,
+                           'requests': args.requests, 'python': platform.python_version()},
+                  'results': results}
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Wrote {args.out}')
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
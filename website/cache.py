@@ -0,0 +1,247 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    """Per-process LRU cache with per-entry TTL.
+
+    Counters made by incr() are kept apart from the LRU and never evicted:
+    the generation counters must not fall back to an earlier value.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+        self.counters = {}
+
+    def get(self, key):
+        with self.lock:
+            if key in self.counters:
+                return self.counters[key]
+            item = self.data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.time():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        with self.lock:
+            self.data[key] = (value, expires_at)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+            self.counters.pop(key, None)
+
+    def incr(self, key):
+        with self.lock:
+            value = self.counters.get(key, 0) + 1
+            self.counters[key] = value
+            return value
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.counters.clear()
+
+    def after_fork(self):
+        # A forked worker keeps a private copy of the entries
+        pass
+
+
+class SQLiteBackend:
+    """Cache stored in a SQLite file so every worker on a host shares it.
+
+    Values are JSON-encoded. LRU order is kept with an access timestamp and
+    the table is trimmed back to `max_entries` every `prune_every` writes.
+    """
+
+    def __init__(self, path, max_entries=10000, prune_every=100):
+        self.path = path
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self.local = threading.local()
+        self.writes = 0
+        with self._conn() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_cache_accessed_at ON cache (accessed_at)')
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def after_fork(self):
+        # A SQLite connection must not be used on both sides of a fork
+        self.local = threading.local()
+
+    def get(self, key):
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute('SELECT value, expires_at FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] is not None and row[1] < now:
+            conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+            return None
+        conn.execute('UPDATE cache SET accessed_at = ? WHERE key = ?', (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        self._conn().execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+            (key, json.dumps(value), now + ttl if ttl else None, now)
+        )
+        self.writes += 1
+        if self.writes % self.prune_every == 0:
+            self.prune()
+
+    def delete(self, key):
+        self._conn().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def incr(self, key):
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "INSERT INTO cache (key, value, expires_at, accessed_at) VALUES (?, '1', NULL, ?) "
+            'ON CONFLICT(key) DO UPDATE SET value = CAST(CAST(value AS INTEGER) + 1 AS TEXT), '
+            'accessed_at = excluded.accessed_at',
+            (key, now)
+        )
+        return int(conn.execute('SELECT value FROM cache WHERE key = ?', (key,)).fetchone()[0])
+
+    def prune(self):
+        conn = self._conn()
+        conn.execute('DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?', (time.time(),))
+        conn.execute(
+            'DELETE FROM cache WHERE key IN (SELECT key FROM cache WHERE expires_at IS NOT NULL '
+            'ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)', (self.max_entries,)
+        )
+
+    def clear(self):
+        self._conn().execute('DELETE FROM cache')
+
+
+def make_backend(url, max_entries=10000):
+    """Build a backend from a URL: 'memory' or 'sqlite:///path/to/cache.db'."""
+    if not url or url == 'memory':
+        return MemoryBackend(max_entries)
+    if url.startswith('sqlite:///'):
+        return SQLiteBackend(url[len('sqlite:///'):], max_entries)
+    raise ValueError(f'Unknown cache backend: {url}')
+
+
+class RecommendationCache:
+    """Per-user cache of recommended job ids.
+
+    Entries are dropped explicitly when the user's skills or applications
+    change. New jobs bump a shared generation counter instead, which makes
+    every older entry stale so it is recomputed lazily on the next visit.
+    """
+
+    GENERATION_KEY = 'recs:generation'
+
+    def __init__(self, backend, ttl=300):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, user_id):
+        return f'recs:user:{user_id}'
+
+    def get_or_compute(self, user_id, compute):
+        """Return the cached job ids for `user_id`, calling `compute()` on a miss."""
+        # Read the generation first so jobs posted while computing leave the
+        # new entry stale rather than hiding them until the TTL runs out
+        generation = self.backend.get(self.GENERATION_KEY) or 0
+        entry = self.backend.get(self._key(user_id))
+        if entry is not None and entry['generation'] == generation:
+            self.hits += 1
+            return entry['job_ids']
+
+        self.misses += 1
+        job_ids = list(compute())
+        self.backend.set(self._key(user_id), {'generation': generation, 'job_ids': job_ids}, self.ttl)
+        return job_ids
+
+    def invalidate_user(self, user_id):
+        self.backend.delete(self._key(user_id))
+
+    def jobs_changed(self):
+        self.backend.incr(self.GENERATION_KEY)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+class PageCache:
+    """Rendered pages for anonymous visitors, keyed by path and query string.
+
+    Like RecommendationCache, purge() bumps a generation counter that is part
+    of every key and ETag, so all older pages go stale at once and age out
+    of the backend on their own. The ETag of a page can be checked against
+    If-None-Match without rendering or even reading the page.
+    """
+
+    GENERATION_KEY = 'pages:generation'
+
+    def __init__(self, backend, ttl=60):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, name):
+        """(key, etag) of the current version of page `name`."""
+        generation = self.backend.get(self.GENERATION_KEY) or 0
+        key = f'pages:{generation}:{name}'
+        return key, hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        body = self.backend.get(key)
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return body
+
+    def set(self, key, body):
+        self.backend.set(key, body, self.ttl)
+
+    def purge(self):
+        self.backend.incr(self.GENERATION_KEY)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,176 @@
+"""`flask` commands for migrations, maintenance, imports and task workers."""
+from flask.cli import with_appcontext
+from migrations import (Migrator, explain, rebuild_company_ratings, rebuild_conversation_counters, rebuild_job_stats,
+                        rebuild_skills)
+from ingest import RowError, iter_json_array, iter_ndjson
+from extensions import db, recommendation_cache, skill_vocabulary, task_queue
+from models import CompanyReview, Conversation, Job, JobApplication, Message, SavedJob, User, UserProfile, upgrade_database
+from jobs import ingest_jobs, search_jobs
+import click
+import json
+import time
+
+@click.command('db-upgrade')
+@with_appcontext
+@click.option('--batch-size', default=1000, help='Rows per backfill transaction.')
+@click.option('--pause', default=0.05, help='Seconds to sleep between batches.')
+def db_upgrade_command(batch_size, pause):
+    """Apply pending schema migrations."""
+    ran = upgrade_database(batch_size=batch_size, pause=pause)
+    print(f'Applied {len(ran)} migrations' if ran else 'Database is up to date')
+
+@click.command('db-status')
+@with_appcontext
+def db_status_command():
+    """List migrations and when they were applied."""
+    for rev, applied_at in Migrator(db.engine, db.metadata).status():
+        print(f"{rev.version}  {applied_at or 'pending':<19}  {rev.description}")
+
+def query_shapes(user_id=1, job_id=1, company_id=1):
+    """The statements behind the hot pages, with sample ids, for EXPLAIN QUERY PLAN."""
+    search, score = search_jobs(Job.query, title='python', skills=['docker'])
+    return {
+        'jobs: newest first': Job.query.order_by(Job.created_at.desc(), Job.id.desc()).limit(20),
+        'jobs: salary overlap': Job.query.filter(Job.salary_max >= 500000, Job.salary_min <= 1500000).order_by(
+            Job.created_at.desc(), Job.id.desc()).limit(20),
+        'jobs: search': search.order_by(*([score] if score is not None else []), Job.created_at.desc()).limit(20),
+        'jobs: saved on page': SavedJob.query.filter(SavedJob.user_id == user_id, SavedJob.job_id.in_([1, 2, 3])),
+        'apply: existing application': JobApplication.query.filter_by(job_id=job_id, applicant_id=user_id),
+        'account: applications': JobApplication.query.filter_by(applicant_id=user_id).order_by(
+            JobApplication.applied_at.desc()),
+        'account: saved jobs': SavedJob.query.filter_by(user_id=user_id).order_by(SavedJob.saved_at.desc()),
+        'account: profile': UserProfile.query.filter_by(user_id=user_id),
+        'messages: inbox': Conversation.query.filter(
+            (Conversation.user1_id == user_id) | (Conversation.user2_id == user_id)
+        ).order_by(Conversation.last_message_at.desc()),
+        'messages: thread page': Message.query.filter_by(conversation_id=1).order_by(
+            Message.sent_at.desc(), Message.id.desc()).limit(50),
+        'messages: unread': Message.query.filter_by(receiver_id=user_id, is_read=False),
+        'employer: jobs': Job.query.filter_by(posted_by=user_id).order_by(Job.created_at.desc()),
+        'employer: applications': JobApplication.query.join(Job, Job.id == JobApplication.job_id).filter(
+            Job.posted_by == user_id).order_by(JobApplication.applied_at.desc(), JobApplication.id.desc()).limit(25),
+        'company: reviews': CompanyReview.query.filter_by(company_id=company_id).order_by(
+            CompanyReview.created_at.desc(), CompanyReview.id.desc()).limit(20),
+        'company: existing review': CompanyReview.query.filter_by(company_id=company_id, user_id=user_id),
+    }
+
+@click.command('db-explain')
+@with_appcontext
+@click.option('--slow-ms', default=50.0, help='Report queries slower than this.')
+def db_explain_command(slow_ms):
+    """Report full scans, temp sorts and slow queries on the hot pages."""
+    shapes = {name: query.statement for name, query in query_shapes().items()}
+    for entry in explain(db.engine, shapes, slow_ms=slow_ms):
+        print(f"{'!!' if entry['problems'] else 'ok'}  {entry['name']}  ({entry['ms']:.1f} ms)")
+        for detail in entry['plan']:
+            print(f'      {detail}')
+        for problem in entry['problems']:
+            print(f'    -> {problem}')
+
+@click.command('rebuild-job-stats')
+@with_appcontext
+def rebuild_job_stats_command():
+    """Recompute per-job application and save counters."""
+    rebuild_job_stats(db.engine)
+    print('Job stats rebuilt')
+
+@click.command('rebuild-company-ratings')
+@with_appcontext
+def rebuild_company_ratings_command():
+    """Recompute company review counts and rating histograms from reviews."""
+    rebuild_company_ratings(db.engine)
+    print('Company ratings rebuilt')
+
+@click.command('rebuild-skills')
+@with_appcontext
+@click.option('--batch-size', default=1000, help='Jobs or profiles per transaction.')
+def rebuild_skills_command(batch_size):
+    """Re-match jobs and profiles whose text or the skills vocabulary changed."""
+    jobs, profiles = rebuild_skills(db.engine, skill_vocabulary, batch_size)
+    recommendation_cache.jobs_changed()
+    print(f'Skills changed for {jobs} jobs and {profiles} profiles')
+
+@click.command('skills-add')
+@with_appcontext
+@click.argument('name')
+@click.argument('aliases', nargs=-1)
+@click.option('--exact', is_flag=True, help='Only match the aliases in skill lists, not in free text.')
+def skills_add_command(name, aliases, exact):
+    """Add a skill, or aliases of an existing one, then re-match affected jobs and profiles."""
+    with db.engine.begin() as conn:
+        skill_id = skill_vocabulary.add(conn, name, aliases, exact=exact)
+    print(f'Skill {name} has id {skill_id}')
+    jobs, profiles = rebuild_skills(db.engine, skill_vocabulary)
+    recommendation_cache.jobs_changed()
+    print(f'Skills changed for {jobs} jobs and {profiles} profiles')
+
+@click.command('ingest-jobs')
+@with_appcontext
+@click.argument('feed', type=click.File('rb'))
+@click.option('--posted-by', type=int, required=True, help='User id the jobs are posted as.')
+@click.option('--format', 'feed_format', type=click.Choice(['ndjson', 'json']), default=None,
+              help='Defaults to json for *.json files and ndjson otherwise.')
+@click.option('--chunk-size', type=int, default=None, help='Rows per transaction.')
+def ingest_jobs_command(feed, posted_by, feed_format, chunk_size):
+    """Import jobs from a JSON array or NDJSON file ('-' reads stdin)."""
+    if db.session.get(User, posted_by) is None:
+        raise click.BadParameter(f'no user with id {posted_by}', param_hint='--posted-by')
+    feed_format = feed_format or ('json' if feed.name.endswith('.json') else 'ndjson')
+    try:
+        records = iter_json_array(feed.read()) if feed_format == 'json' else iter_ndjson(feed)
+    except RowError as e:
+        raise click.ClickException(str(e))
+
+    summary = ingest_jobs(records, posted_by, chunk_size)
+    for error in summary['errors']:
+        print(f"row {error['row']}: {error['error']}")
+    print(f"{summary['received']} rows: {summary['inserted']} inserted, {summary['duplicates']} duplicates, "
+          f"{summary['error_count']} errors in {summary['seconds']}s ({summary['rows_per_sec']} rows/sec)")
+
+@click.command('worker')
+@with_appcontext
+@click.option('--threads', default=2, help='Worker threads in this process.')
+@click.option('--once', is_flag=True, help='Run the tasks that are due now, then exit.')
+def worker_command(threads, once):
+    """Run background tasks until interrupted."""
+    if once:
+        print(f'Ran {task_queue.run_pending()} tasks')
+        return
+    task_queue.start(threads)
+    print(f'Running tasks with {threads} threads, Ctrl+C to stop')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        task_queue.stop()
+
+@click.command('task-stats')
+@with_appcontext
+def task_stats_command():
+    """Show task queue depth and lag."""
+    print(json.dumps(task_queue.stats(), indent=2))
+
+@click.command('rebuild-message-counters')
+@with_appcontext
+def rebuild_message_counters_command():
+    """Recompute inbox unread counters and previews from messages."""
+    rebuild_conversation_counters(db.engine)
+    print('Message counters rebuilt')
+
+COMMANDS = (
+    db_upgrade_command,
+    db_status_command,
+    db_explain_command,
+    rebuild_job_stats_command,
+    rebuild_company_ratings_command,
+    rebuild_skills_command,
+    skills_add_command,
+    ingest_jobs_command,
+    worker_command,
+    task_stats_command,
+    rebuild_message_counters_command,
+)
+
+def init_app(app):
+    for command in COMMANDS:
+        app.cli.add_command(command)
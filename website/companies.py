@@ -0,0 +1,91 @@
+"""Company pages and reviews."""
+from flask import Blueprint, abort, current_app, render_template, request, redirect, url_for, session, flash
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from pagination import keyset_page, InvalidCursor
+from extensions import db
+from models import RATINGS, Company, CompanyReview, Job
+from httpcache import http_cache
+
+bp = Blueprint('companies', __name__)
+
+def add_company_review(company_id, user_id, rating, review_text):
+    """Insert a review and count it in the company's aggregates, in the current transaction.
+
+    Returns False, changing nothing, if the user already reviewed the company.
+    """
+    review_id = db.session.execute(sqlite_insert(CompanyReview).values(
+        company_id=company_id, user_id=user_id, rating=rating, review_text=review_text
+    ).on_conflict_do_nothing(index_elements=['company_id', 'user_id']).returning(CompanyReview.id)).scalar()
+    if review_id is None:
+        return False
+    # Incremented in SQL so concurrent reviews are not lost
+    column = f'rating_{rating}'
+    db.session.execute(db.update(Company).where(Company.id == company_id).values(
+        review_count=Company.review_count + 1,
+        rating_sum=Company.rating_sum + rating,
+        **{column: getattr(Company, column) + 1},
+    ))
+    return True
+
+# Company routes
+@bp.route('/company/<int:company_id>')
+def company_profile(company_id):
+    company = Company.query.get_or_404(company_id)
+    job_count, last_job_update = db.session.query(
+        db.func.count(Job.id), db.func.max(Job.updated_at)
+    ).filter(Job.company_id == company_id).one()
+    # A new review bumps review_count and updated_at
+    not_modified = http_cache(
+        ('company', company.id, company.updated_at, company.review_count, job_count, last_job_update),
+        last_modified=max(value for value in (company.updated_at, last_job_update) if value is not None),
+    )
+    if not_modified:
+        return not_modified
+
+    query = CompanyReview.query.options(db.joinedload(CompanyReview.user)).filter_by(company_id=company_id)
+    try:
+        page = keyset_page(query, [(CompanyReview.created_at, True), (CompanyReview.id, True)],
+                           cursor=request.args.get('cursor'), per_page=current_app.config['REVIEWS_PAGE_SIZE'])
+    except InvalidCursor:
+        abort(400)
+    next_url = url_for('companies.company_profile', company_id=company_id,
+                       cursor=page.next_cursor) if page.has_more else None
+    jobs = Job.query.filter_by(company_id=company_id, is_active=True).order_by(
+        Job.created_at.desc(), Job.id.desc()).limit(10).all()
+
+    return render_template('company.html', company=company, reviews=page.items, next_url=next_url,
+                           avg_rating=company.avg_rating, jobs=jobs, job_count=job_count)
+
+@bp.route('/review-company/<int:company_id>', methods=['GET', 'POST'])
+def review_company(company_id):
+    if 'user_id' not in session:
+        flash('Please login to leave a review', 'error')
+        return redirect(url_for('accounts.login'))
+
+    company = Company.query.get_or_404(company_id)
+    user_id = session['user_id']
+
+    if request.method == 'POST':
+        rating = request.form.get('rating', type=int)
+        review_text = request.form.get('review_text')
+
+        if rating not in RATINGS:
+            flash('Invalid rating', 'error')
+            return redirect(url_for('companies.review_company', company_id=company_id))
+
+        # The unique (company_id, user_id) index turns a second review into a no-op
+        if not add_company_review(company_id, user_id, rating, review_text):
+            db.session.rollback()
+            flash('You have already reviewed this company', 'info')
+            return redirect(url_for('companies.company_profile', company_id=company_id))
+        db.session.commit()
+
+        flash('Review submitted successfully!', 'success')
+        return redirect(url_for('companies.company_profile', company_id=company_id))
+
+    # Only to skip showing the form; the insert above is what enforces it
+    if db.session.query(CompanyReview.id).filter_by(user_id=user_id, company_id=company_id).first():
+        flash('You have already reviewed this company', 'info')
+        return redirect(url_for('companies.company_profile', company_id=company_id))
+
+    return render_template('review_company.html', company=company)
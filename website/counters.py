@@ -0,0 +1,73 @@
+"""Counters added up in memory and written to the database in batches.
+
+For counts that are bumped on reads, like job page views: writing each
+one would make every GET take SQLite's write lock. Increments are kept
+per process and written by a background thread, all of them in one
+transaction, every `interval` seconds; counts not yet written when a
+process dies are lost.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter
+
+log = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    def __init__(self):
+        self.interval = 5
+        self.write = None
+        self.app = None
+        self.db = None
+        self.after_fork()
+
+    def init_app(self, app, db, interval):
+        self.app = app
+        self.db = db
+        self.interval = interval
+
+    def writer(self, func):
+        """Register func(counts), which writes a {key: increment} dict in the current transaction."""
+        self.write = func
+        return func
+
+    def add(self, key, amount=1):
+        with self.lock:
+            self.pending[key] += amount
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='counter-flush', daemon=True)
+                self.thread.start()
+
+    def flush(self):
+        """Write everything added so far; returns how many keys were written."""
+        with self.lock:
+            counts, self.pending = self.pending, Counter()
+        if not counts:
+            return 0
+        with self.app.app_context():
+            try:
+                self.write(dict(counts))
+                self.db.session.commit()
+            except Exception:
+                self.db.session.rollback()
+                # Keep them for the next flush
+                with self.lock:
+                    self.pending.update(counts)
+                raise
+        return len(counts)
+
+    def run(self):
+        atexit.register(self.flush)
+        while not self.stopping.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                log.exception('Counter flush failed')
+
+    def after_fork(self):
+        # The parent's thread is not copied, and its counts are the parent's to write
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.stopping = threading.Event()
+        self.thread = None
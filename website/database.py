@@ -0,0 +1,110 @@
+"""SQLite connection tuning, pool sizing and read-only routing.
+
+Every new connection gets WAL journaling, synchronous=NORMAL, a memory map,
+a larger page cache and a busy timeout, so readers never block the writer
+and a briefly locked database waits instead of failing. Transactions
+opened while handling a POST (or other unsafe method) start with
+BEGIN IMMEDIATE: a deferred transaction that reads first and writes later
+cannot wait on the busy timeout when it has to upgrade its lock, and fails
+with "database is locked" straight away. GET views that only sometimes
+write (read receipts) call begin_writes() once they know they have to.
+
+Views decorated with @read_only run their queries on a separate pool of
+connections with query_only set, so long reads never hold a connection
+the writers need.
+"""
+from functools import wraps
+
+from flask import g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+READ_BIND = 'read'
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS sized for the threads of one worker."""
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if uri == 'sqlite://' or ':memory:' in uri:
+        # In-memory databases use a single shared connection, not a pool
+        return {}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+    }
+
+
+def read_bind(config):
+    """SQLALCHEMY_BINDS entry for the read-only pool, or None when it is disabled."""
+    if not config['DB_READ_POOL']:
+        return None
+    options = engine_options(config)
+    options['pool_size'] = config['DB_READ_POOL_SIZE']
+    return {'url': config['SQLALCHEMY_DATABASE_URI'], **options}
+
+
+def pragmas(config, read_only=False):
+    statements = [
+        f"PRAGMA busy_timeout = {config['SQLITE_BUSY_TIMEOUT']}",
+        f"PRAGMA cache_size = {config['SQLITE_CACHE_SIZE']}",
+        f"PRAGMA mmap_size = {config['SQLITE_MMAP_SIZE']}",
+        f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}",
+    ]
+    if read_only:
+        statements.append('PRAGMA query_only = ON')
+    else:
+        # journal_mode is persistent, but setting it needs a writable connection
+        statements.insert(0, f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}")
+    return statements
+
+
+def configure_engine(engine, config, read_only=False):
+    """Apply the pragmas and transaction handling to every connection of `engine`."""
+    if engine.dialect.name != 'sqlite':
+        return
+    statements = pragmas(config, read_only)
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        # Let SQLAlchemy issue BEGIN itself (see on_begin)
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def on_begin(conn):
+        writing = not read_only and has_request_context() and (
+            request.method not in ('GET', 'HEAD', 'OPTIONS') or g.get('db_writes'))
+        conn.exec_driver_sql('BEGIN IMMEDIATE' if writing else 'BEGIN')
+
+
+class RoutingSession(Session):
+    """Sends everything outside a flush to the read pool inside @read_only views."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_app_context() and g.get('db_read_only')
+                and READ_BIND in self._db.engines):
+            return self._db.engines[READ_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view):
+    """Run a view's queries on the read-only pool; writes in it will fail."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def begin_writes(session):
+    """Start this request's next transaction with BEGIN IMMEDIATE, even for a GET.
+
+    Ends the current (read) transaction first, since SQLite cannot upgrade it
+    safely; objects loaded so far are expired and reload on access.
+    """
+    session.commit()
+    g.db_writes = True
@@ -0,0 +1,190 @@
+"""The employer dashboard: applications to one's jobs, their status and exports."""
+from flask import Blueprint, Response, current_app, render_template, request, redirect, url_for, session, flash, jsonify, abort, stream_with_context
+from datetime import datetime, timedelta
+from pagination import keyset_page, InvalidCursor
+from database import read_only
+from extensions import db
+from models import APPLICATION_STATUSES, Job, JobApplication, JobStats, User, UserProfile
+from jobs import bump_job_stats
+import csv
+import io
+import json
+
+bp = Blueprint('employer', __name__)
+
+@bp.route('/employer-dashboard')
+@read_only
+def employer_dashboard():
+    if 'user_id' not in session:
+        flash('Please login to access dashboard', 'error')
+        return redirect(url_for('accounts.login'))
+
+    user_id = session['user_id']
+    user = User.query.get(user_id)
+
+    # Get one page of jobs posted by user with their materialized counters;
+    # the jobs list and the applications list page independently
+    jobs_query = Job.query.options(db.joinedload(Job.stats)).filter(Job.posted_by == user_id)
+    try:
+        jobs_page = keyset_page(jobs_query, [(Job.created_at, True), (Job.id, True)],
+                                cursor=request.args.get('jobs_cursor'),
+                                per_page=current_app.config['EMPLOYER_JOBS_PAGE_SIZE'])
+    except InvalidCursor:
+        abort(400)
+    more_jobs_url = url_for('employer.employer_dashboard', jobs_cursor=jobs_page.next_cursor,
+                            cursor=request.args.get('cursor')) if jobs_page.has_more else None
+
+    # Analytics, summed from per-job counters instead of counting applications
+    total_jobs, total_applications, pending_applications, accepted_applications = db.session.query(
+        db.func.count(Job.id),
+        db.func.coalesce(db.func.sum(JobStats.applications_count), 0),
+        db.func.coalesce(db.func.sum(JobStats.pending_count), 0),
+        db.func.coalesce(db.func.sum(JobStats.accepted_count), 0),
+    ).outerjoin(JobStats, JobStats.job_id == Job.id).filter(Job.posted_by == user_id).one()
+
+    # Get one page of applications for user's jobs
+    query = JobApplication.query.join(Job, Job.id == JobApplication.job_id).options(
+        db.contains_eager(JobApplication.job), db.joinedload(JobApplication.applicant)
+    ).filter(Job.posted_by == user_id)
+    try:
+        page = keyset_page(query, [(JobApplication.applied_at, True), (JobApplication.id, True)],
+                           cursor=request.args.get('cursor'), per_page=current_app.config['APPLICATIONS_PAGE_SIZE'])
+    except InvalidCursor:
+        abort(400)
+    next_url = url_for('employer.employer_dashboard', cursor=page.next_cursor,
+                       jobs_cursor=request.args.get('jobs_cursor')) if page.has_more else None
+
+    return render_template('employer_dashboard.html', user=user, jobs=jobs_page.items, more_jobs_url=more_jobs_url,
+                         applications=page.items, next_url=next_url, statuses=APPLICATION_STATUSES,
+                         total_jobs=total_jobs, total_applications=total_applications,
+                         pending_applications=pending_applications, accepted_applications=accepted_applications)
+
+@bp.route('/application/<int:application_id>/status', methods=['POST'])
+def update_application_status(application_id):
+    if 'user_id' not in session:
+        flash('Please login to access dashboard', 'error')
+        return redirect(url_for('accounts.login'))
+
+    application = JobApplication.query.get_or_404(application_id)
+    if application.job.posted_by != session['user_id']:
+        abort(403)
+
+    status = request.form.get('status')
+    if status not in APPLICATION_STATUSES:
+        flash('Invalid status', 'error')
+        return redirect(url_for('employer.employer_dashboard'))
+
+    if status != application.status:
+        deltas = {f'{status}_count': 1}
+        if application.status in APPLICATION_STATUSES:
+            deltas[f'{application.status}_count'] = -1
+        application.status = status
+        bump_job_stats(application.job_id, **deltas)
+        db.session.commit()
+
+    flash('Application status updated', 'success')
+    return redirect(url_for('employer.employer_dashboard'))
+
+def export_value(value):
+    return value.isoformat(sep=' ') if isinstance(value, datetime) else value
+
+def stream_rows(query, fmt, rows_per_chunk=500):
+    """Yield CSV or NDJSON text for `query`, a few hundred rows per chunk.
+
+    Rows come from a server-side cursor via yield_per, so memory stays flat
+    however large the export is.
+    """
+    columns = [column['name'] for column in query.column_descriptions]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == 'csv':
+        writer.writerow(columns)
+    for count, row in enumerate(query.yield_per(current_app.config['EXPORT_YIELD_PER']), 1):
+        if fmt == 'csv':
+            writer.writerow([export_value(value) for value in row])
+        else:
+            buffer.write(json.dumps(dict(zip(columns, map(export_value, row)))) + '\n')
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def export_filters(query, id_column, date_column):
+    """Apply the shared export filters: from/to dates and the after_id resume point."""
+    dates = db.type_coerce(date_column, db.String)
+    try:
+        if request.args.get('from'):
+            start = datetime.strptime(request.args['from'], '%Y-%m-%d')
+            query = query.filter(dates >= start.strftime('%Y-%m-%d'))
+        if request.args.get('to'):
+            end = datetime.strptime(request.args['to'], '%Y-%m-%d') + timedelta(days=1)
+            query = query.filter(dates < end.strftime('%Y-%m-%d'))
+    except ValueError:
+        abort(400)
+    # Exports run in id order, so a dropped download resumes from the last id it received
+    after_id = request.args.get('after_id', type=int)
+    if after_id is not None:
+        query = query.filter(id_column > after_id)
+    return query.order_by(id_column)
+
+def export_response(query, name, fmt):
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(stream_rows(query, fmt)), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={name}.{fmt}'})
+
+@bp.route('/employer-dashboard/export/applications.<any(csv, ndjson):fmt>')
+@read_only
+def export_applications(fmt):
+    """Applications to the current user's jobs, with applicant profile fields.
+
+    Filters: job_id, status, from and to (YYYY-MM-DD, on applied_at), after_id.
+    """
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Please login first'}), 401
+
+    query = db.session.query(
+        JobApplication.id, JobApplication.job_id, Job.title.label('job_title'), JobApplication.status,
+        JobApplication.applied_at, JobApplication.applicant_id, User.name.label('applicant_name'),
+        User.email.label('applicant_email'), UserProfile.phone, UserProfile.location,
+        UserProfile.current_position, UserProfile.experience_years, UserProfile.skills,
+        UserProfile.education, UserProfile.linkedin_url, UserProfile.portfolio_url,
+        JobApplication.cover_letter,
+    ).join(Job, Job.id == JobApplication.job_id).join(User, User.id == JobApplication.applicant_id).outerjoin(
+        UserProfile, UserProfile.user_id == JobApplication.applicant_id
+    ).filter(Job.posted_by == session['user_id'])
+
+    job_id = request.args.get('job_id', type=int)
+    if job_id:
+        query = query.filter(JobApplication.job_id == job_id)
+    status = request.args.get('status')
+    if status:
+        if status not in APPLICATION_STATUSES:
+            abort(400)
+        query = query.filter(JobApplication.status == status)
+    query = export_filters(query, JobApplication.id, JobApplication.applied_at)
+    return export_response(query, 'applications', fmt)
+
+@bp.route('/employer-dashboard/export/jobs.<any(csv, ndjson):fmt>')
+@read_only
+def export_jobs(fmt):
+    """The current user's jobs with their counters.
+
+    Filters: from and to (YYYY-MM-DD, on created_at), after_id.
+    """
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Please login first'}), 401
+
+    query = db.session.query(
+        Job.id, Job.title, Job.company, Job.location, Job.type, Job.salary, Job.salary_min, Job.salary_max,
+        Job.salary_currency, Job.is_active, Job.created_at,
+        db.func.coalesce(JobStats.applications_count, 0).label('applications'),
+        db.func.coalesce(JobStats.pending_count, 0).label('pending'),
+        db.func.coalesce(JobStats.reviewed_count, 0).label('reviewed'),
+        db.func.coalesce(JobStats.accepted_count, 0).label('accepted'),
+        db.func.coalesce(JobStats.rejected_count, 0).label('rejected'),
+        db.func.coalesce(JobStats.saves_count, 0).label('saves'),
+        db.func.coalesce(JobStats.views_count, 0).label('views'),
+    ).outerjoin(JobStats, JobStats.job_id == Job.id).filter(Job.posted_by == session['user_id'])
+    query = export_filters(query, Job.id, Job.created_at)
+    return export_response(query, 'jobs', fmt)
@@ -0,0 +1,69 @@
+"""Shared service objects, created unbound and configured by create_app().
+
+Blueprints, models and tasks import these at module level; nothing here
+opens a database, a file or a thread until init_extensions() runs with an
+app's config.
+"""
+from flask_sqlalchemy import SQLAlchemy
+
+from cache import PageCache, RecommendationCache, make_backend
+from counters import CounterBuffer
+from database import READ_BIND, RoutingSession, configure_engine
+from instrumentation import RequestMetrics
+from passwords import PasswordHasher
+from pubsub import make_broker
+from recommend import SkillIndex
+from search import JobSearchIndex
+from skills import SkillVocabulary
+from storage import UploadProcessor, make_storage
+from tasks import TaskQueue
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+job_search = JobSearchIndex()
+recommender = SkillIndex()
+skill_vocabulary = SkillVocabulary()
+# Backends and storage are set from the config in init_extensions()
+recommendation_cache = RecommendationCache(None)
+page_cache = PageCache(None)
+upload_processor = UploadProcessor(None)
+task_queue = TaskQueue()
+request_metrics = RequestMetrics()
+password_hasher = PasswordHasher()
+# Job page views, see jobs.write_job_views
+job_views = CounterBuffer()
+
+
+def init_extensions(app):
+    db.init_app(app)
+    with app.app_context():
+        configure_engine(db.engine, app.config)
+        if READ_BIND in db.engines:
+            configure_engine(db.engines[READ_BIND], app.config, read_only=True)
+        if app.config['METRICS_ENABLED']:
+            request_metrics.init_app(app, db.engines.values())
+    job_search.init_app(app, db)
+    task_queue.init_app(app, db)
+    job_views.init_app(app, db, app.config['VIEW_COUNT_FLUSH_INTERVAL'])
+    recommendation_cache.backend = make_backend(app.config['RECOMMENDATION_CACHE_URL'],
+                                                app.config['RECOMMENDATION_CACHE_SIZE'])
+    recommendation_cache.ttl = app.config['RECOMMENDATION_CACHE_TTL']
+    page_cache.backend = make_backend(app.config['PAGE_CACHE_URL'], app.config['PAGE_CACHE_SIZE'])
+    page_cache.ttl = app.config['PAGE_CACHE_TTL']
+    upload_processor.storage = make_storage(app.config['UPLOAD_STORAGE_URL'])
+    password_hasher.configure(app.config['PASSWORD_HASH_METHOD'], app.config['PASSWORD_HASH_WORKERS'],
+                              app.config['PASSWORD_HASH_MAX_PENDING'], app.config['PASSWORD_HASH_TIMEOUT'])
+    # One broker per app; views reach it through current_app.extensions
+    app.extensions['message_broker'] = make_broker(app.config['MESSAGE_BROKER_URL'],
+                                                   app.config['MESSAGE_MAX_SUBSCRIBERS'])
+
+
+def after_fork(app):
+    """Drop state a forked worker must not share with its parent: pooled
+    connections, per-thread SQLite handles and background threads."""
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False leaves the parent's connections alone
+            engine.dispose(close=False)
+    for service in (recommendation_cache.backend, page_cache.backend, app.extensions['message_broker'],
+                    task_queue, password_hasher, job_views):
+        service.after_fork()
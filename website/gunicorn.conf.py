@@ -0,0 +1,34 @@
+"""gunicorn settings; run `gunicorn -c gunicorn.conf.py` from the website/ directory.
+
+With preload_app the master builds the app once and warms it up (see
+app.warm_up) before forking, so workers start serving at once and share
+the loaded modules and compiled templates copy-on-write instead of each
+holding its own copy. benchmarks/startup_bench.py measures both modes.
+
+ASGI=1 serves asgi.py on uvicorn workers instead (pip install -r
+requirement-asgi.txt): each worker runs one event loop for the async
+views, ASGI_WSGI_THREADS replaces WEB_THREADS for the rest, and
+benchmarks/asgi_bench.py compares the two modes.
+"""
+import os
+
+wsgi_app = 'app:create_app()'
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+# Threads per worker; keep DB_POOL_SIZE at least this large. Each open
+# message stream or long poll holds one of them, so MESSAGE_MAX_SUBSCRIBERS
+# (default 4) must stay below this or idle streams can starve every request
+threads = int(os.environ.get('WEB_THREADS', 8))
+preload_app = os.environ.get('PRELOAD_APP', '1') == '1'
+
+if os.environ.get('ASGI') == '1':
+    wsgi_app = 'asgi:create_asgi_app()'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is built, before any worker forks
+    if server.cfg.preload_app:
+        from app import warm_up
+        application = server.app.wsgi()
+        warm_up(getattr(application, 'flask_app', application))
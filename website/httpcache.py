@@ -0,0 +1,92 @@
+"""Conditional GETs and the anonymous page cache.
+
+Views call http_cache() with whatever their page depends on before
+rendering; apply_http_cache(), registered as an after_request hook by
+create_app(), turns that into ETag, Last-Modified and Cache-Control.
+"""
+from flask import Response, current_app, g, render_template, request, session
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+import hashlib
+import os
+from extensions import page_cache
+
+def http_cache(parts=(), last_modified=None, etag=None):
+    """Set the validators and Cache-Control of this response; returns a 304 if the client's copy is current.
+
+    The ETag covers `parts` and the viewer, so anonymous and logged-in copies
+    never match each other. Call it before rendering anything. A response
+    that will show flashed messages gets no validators and is not cached.
+    """
+    if has_flashes():
+        return None
+    user_id = session.get('user_id')
+    if etag is None:
+        etag = hashlib.sha1(repr((user_id,) + tuple(parts)).encode('utf-8')).hexdigest()
+    if last_modified is not None:
+        # SQLite timestamps are naive UTC; HTTP dates have whole seconds
+        last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+    g.http_cache = (etag, last_modified, user_id is None)
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    else:
+        # Last-Modified does not cover the viewer, so it only validates anonymous copies
+        fresh = (user_id is None and last_modified is not None and request.if_modified_since is not None
+                 and last_modified <= request.if_modified_since)
+    return Response(status=304) if fresh else None
+
+def apply_http_cache(response):
+    validators = g.pop('http_cache', None)
+    if validators is None or response.status_code not in (200, 304):
+        return response
+    etag, last_modified, public = validators
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    if public:
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config['HTTP_MAX_AGE']
+        response.cache_control.s_maxage = current_app.config['HTTP_SHARED_MAX_AGE']
+    else:
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
+
+def cached_page(render):
+    """Serve an anonymous GET from page_cache, rendering it on a miss."""
+    key, cached = lookup_page()
+    if cached is not None:
+        return cached
+    body = render()
+    if key is not None:
+        page_cache.set(key, body)
+    return body
+
+def lookup_page():
+    """The lookup half of cached_page(): returns (key, response or None).
+
+    The key is None when the page must not be stored.
+    """
+    name = request.path + '?' + urlencode(sorted(request.args.items(multi=True)))
+    key, etag = page_cache.version(name)
+    not_modified = http_cache(etag=etag)
+    if not_modified:
+        return None, not_modified
+    if has_flashes():
+        # The page will show this visitor's messages, so it must not be shared
+        return None, None
+    return key, page_cache.get(key)
+
+def has_flashes():
+    """Whether the next rendered page will show flashed messages."""
+    return bool(session.get('_flashes'))
+
+def static_page(template):
+    """Render a page that only changes with its template."""
+    path = os.path.join(current_app.root_path, current_app.template_folder, template)
+    modified = datetime.utcfromtimestamp(os.path.getmtime(path))
+    not_modified = http_cache(('page', template, modified), last_modified=modified)
+    if not_modified:
+        return not_modified
+    return render_template(template)
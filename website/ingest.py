@@ -0,0 +1,90 @@
+"""Parsing and validation for bulk job feeds.
+
+Feeds arrive as a JSON array or as NDJSON (one object per line). Records
+are validated and normalized one at a time so a bad row is reported with
+its position and the rest of the feed still goes through.
+"""
+import hashlib
+import json
+import re
+from itertools import islice
+
+REQUIRED_FIELDS = ('title', 'company', 'location', 'salary', 'type', 'description')
+OPTIONAL_FIELDS = ('requirements', 'benefits')
+# Column widths on Job and Company
+MAX_LENGTHS = {'title': 100, 'company': 100, 'location': 100, 'salary': 50, 'type': 50}
+
+_SPACES = re.compile(r'\s+')
+
+
+class RowError(ValueError):
+    pass
+
+
+def iter_ndjson(lines):
+    """Yield (row number, record or RowError) from an iterable of NDJSON lines."""
+    for number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as e:
+            yield number, RowError(f'invalid JSON: {e}')
+
+
+def iter_json_array(text):
+    """Yield (row number, record) from a JSON array; a malformed document raises RowError."""
+    try:
+        records = json.loads(text)
+    except ValueError as e:
+        raise RowError(f'invalid JSON: {e}')
+    if not isinstance(records, list):
+        raise RowError('expected a JSON array of jobs')
+    return enumerate(records, 1)
+
+
+def normalize(record):
+    """Return a cleaned copy of a feed record, or raise RowError."""
+    if isinstance(record, RowError):
+        raise record
+    if not isinstance(record, dict):
+        raise RowError('expected a JSON object')
+    job = {}
+    for field in REQUIRED_FIELDS + OPTIONAL_FIELDS:
+        value = record.get(field)
+        if value is None:
+            value = ''
+        if not isinstance(value, (str, int, float)):
+            raise RowError(f'{field} must be a string')
+        value = str(value).strip()
+        if field in REQUIRED_FIELDS and not value:
+            raise RowError(f'{field} is required')
+        if len(value) > MAX_LENGTHS.get(field, len(value)):
+            raise RowError(f'{field} is longer than {MAX_LENGTHS[field]} characters')
+        job[field] = value or None
+    return job
+
+
+def content_hash(job, posted_by=None):
+    """Fingerprint of a posting's content, used to skip feed items already imported.
+
+    Case and runs of whitespace are ignored so trivially re-formatted copies
+    of the same posting collide. Jobs posted through the form pass
+    `posted_by`, so they only collide with the same employer's own posts.
+    """
+    parts = [_SPACES.sub(' ', (job.get(field) or '').strip().lower())
+             for field in ('title', 'company', 'location', 'type', 'description')]
+    if posted_by is not None:
+        parts.append(f'posted_by:{posted_by}')
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,277 @@
+import bisect
+import contextvars
+import cProfile
+import io
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from flask import Response, before_render_template, request, template_rendered
+from sqlalchemy import event
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine):
+    """Record every SQL statement run on `engine` inside the block.
+
+        with count_queries(db.engine) as queries:
+            client.get('/account')
+        assert queries.count <= 5, queries.statements
+    """
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+
+
+@contextmanager
+def assert_max_queries(engine, limit):
+    """Fail if the block runs more than `limit` SQL statements."""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        raise AssertionError(
+            f'{counter.count} queries executed, expected at most {limit}:\n' + '\n'.join(counter.statements)
+        )
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus format."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield str(bound), total
+
+
+class RequestStats:
+    __slots__ = ('started', 'sql_count', 'sql_seconds', 'sql_started', 'template_seconds', 'template_started',
+                 'profiler')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.sql_started = None
+        self.template_seconds = 0.0
+        self.template_started = None
+        self.profiler = None
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RequestMetrics:
+    """Per-endpoint latency, SQL and template time, exported for Prometheus.
+
+    Every response gets a Server-Timing header with the request's own
+    numbers. Requests for which `profile_allowed` returns True and that
+    send `X-Profile: 1` are run under cProfile and answered with the
+    report instead of the page. Recent latencies are also kept per
+    endpoint for percentiles in stats().
+
+    Nothing is hooked up unless init_app() is called, so leaving it out
+    (METRICS_ENABLED=0) costs nothing per request or query.
+    """
+
+    def __init__(self, app=None, engines=(), window=1000):
+        self.window = window
+        self.lock = threading.Lock()
+        self.current = contextvars.ContextVar('request_stats', default=None)
+        self.latency = {}    # endpoint -> Histogram of seconds
+        self.queries = {}    # endpoint -> Histogram of SQL statements per request
+        self.totals = {}     # endpoint -> [requests, SQL seconds, template seconds]
+        self.statuses = {}   # (endpoint, status) -> requests
+        self.samples = {}    # endpoint -> deque of recent seconds
+        self.collectors = []
+        self.can_profile = None
+        if app is not None:
+            self.init_app(app, engines)
+
+    def init_app(self, app, engines=()):
+        # Calling it again for the same app only watches any new engines
+        if app.extensions.get('request_metrics') is not self:
+            app.extensions['request_metrics'] = self
+            app.before_request(self._start)
+            app.after_request(self._stop)
+            app.teardown_request(self._teardown)
+            before_render_template.connect(self._before_render, app)
+            template_rendered.connect(self._after_render, app)
+        for engine in engines:
+            self.watch_engine(engine)
+
+    def watch_engine(self, engine):
+        """Count and time the SQL run on `engine` against the current request."""
+        if event.contains(engine, 'before_cursor_execute', self._before_sql):
+            return
+        event.listen(engine, 'before_cursor_execute', self._before_sql)
+        event.listen(engine, 'after_cursor_execute', self._after_sql)
+
+    def collector(self, func):
+        """Register func() yielding (name, type, help, [(labels, value), ...]) for /metrics."""
+        self.collectors.append(func)
+        return func
+
+    def profile_allowed(self, func):
+        """Register func() deciding whether the current request may ask to be profiled."""
+        self.can_profile = func
+        return func
+
+    # Hooks
+
+    def _start(self):
+        stats = RequestStats()
+        self.current.set(stats)
+        if request.headers.get('X-Profile') and self.can_profile is not None and self.can_profile():
+            stats.profiler = cProfile.Profile()
+            stats.profiler.enable()
+
+    def _stop(self, response):
+        stats = self.current.get()
+        if stats is None:
+            return response
+        if stats.profiler is not None:
+            stats.profiler.disable()
+        seconds = time.perf_counter() - stats.started
+        self.record(request.endpoint or 'unmatched', response.status_code, seconds, stats)
+        timing = (f'app;dur={seconds * 1000:.2f}, db;dur={stats.sql_seconds * 1000:.2f};desc="{stats.sql_count} queries"'
+                  f', tpl;dur={stats.template_seconds * 1000:.2f}')
+        if stats.profiler is not None:
+            response = Response(self._report(stats.profiler), mimetype='text/plain',
+                                headers={'X-Profiled-Status': str(response.status_code)})
+        response.headers['Server-Timing'] = timing
+        return response
+
+    def _teardown(self, exc):
+        self.current.set(None)
+
+    def _before_sql(self, conn, cursor, statement, parameters, context, executemany):
+        stats = self.current.get()
+        if stats is not None:
+            stats.sql_started = time.perf_counter()
+
+    def _after_sql(self, conn, cursor, statement, parameters, context, executemany):
+        stats = self.current.get()
+        if stats is not None and stats.sql_started is not None:
+            stats.sql_count += 1
+            stats.sql_seconds += time.perf_counter() - stats.sql_started
+            stats.sql_started = None
+
+    def _before_render(self, sender, template, context, **extra):
+        stats = self.current.get()
+        if stats is not None:
+            stats.template_started = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        stats = self.current.get()
+        if stats is not None and stats.template_started is not None:
+            stats.template_seconds += time.perf_counter() - stats.template_started
+            stats.template_started = None
+
+    @staticmethod
+    def _report(profiler, limit=60):
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+    # Aggregates
+
+    def record(self, endpoint, status, seconds, stats=None):
+        with self.lock:
+            latency = self.latency.get(endpoint)
+            if latency is None:
+                latency = self.latency[endpoint] = Histogram(LATENCY_BUCKETS)
+                self.queries[endpoint] = Histogram(QUERY_BUCKETS)
+                self.totals[endpoint] = [0, 0.0, 0.0]
+                self.samples[endpoint] = deque(maxlen=self.window)
+            latency.observe(seconds)
+            self.samples[endpoint].append(seconds)
+            totals = self.totals[endpoint]
+            totals[0] += 1
+            if stats is not None:
+                self.queries[endpoint].observe(stats.sql_count)
+                totals[1] += stats.sql_seconds
+                totals[2] += stats.template_seconds
+            self.statuses[endpoint, status] = self.statuses.get((endpoint, status), 0) + 1
+
+    def stats(self):
+        """Request count and latency percentiles per endpoint, in milliseconds."""
+        with self.lock:
+            snapshot = {endpoint: sorted(samples) for endpoint, samples in self.samples.items()}
+            totals = {endpoint: list(values) for endpoint, values in self.totals.items()}
+        stats = {}
+        for endpoint, samples in snapshot.items():
+            def percentile(p):
+                return round(samples[min(len(samples) - 1, int(len(samples) * p))] * 1000, 2)
+            count, sql_seconds, template_seconds = totals[endpoint]
+            stats[endpoint] = {'count': count, 'p50_ms': percentile(0.5), 'p95_ms': percentile(0.95),
+                               'p99_ms': percentile(0.99), 'max_ms': round(samples[-1] * 1000, 2),
+                               'avg_sql_ms': round(sql_seconds * 1000 / count, 2),
+                               'avg_template_ms': round(template_seconds * 1000 / count, 2)}
+        return stats
+
+    def render(self, prefix='jobhunt'):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f'# HELP {prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {prefix}_{name} {kind}')
+            for suffix, labels, value in samples:
+                label_text = ','.join(f'{key}="{_label(val)}"' for key, val in labels.items())
+                lines.append(f'{prefix}_{name}{suffix}{{{label_text}}} {value}' if label_text
+                             else f'{prefix}_{name}{suffix} {value}')
+
+        def histogram(histograms):
+            for endpoint, hist in sorted(histograms.items()):
+                for bound, count in hist.samples():
+                    yield '_bucket', {'endpoint': endpoint, 'le': bound}, count
+                yield '_sum', {'endpoint': endpoint}, round(hist.sum, 6)
+                yield '_count', {'endpoint': endpoint}, sum(hist.counts)
+
+        with self.lock:
+            family('request_duration_seconds', 'histogram', 'Request latency by endpoint.', list(histogram(self.latency)))
+            family('request_sql_queries', 'histogram', 'SQL statements per request by endpoint.',
+                   list(histogram(self.queries)))
+            family('requests_total', 'counter', 'Requests by endpoint and status.',
+                   [('', {'endpoint': endpoint, 'status': status}, count)
+                    for (endpoint, status), count in sorted(self.statuses.items())])
+            family('request_sql_seconds_total', 'counter', 'Time spent in SQL by endpoint.',
+                   [('', {'endpoint': endpoint}, round(totals[1], 6)) for endpoint, totals in sorted(self.totals.items())])
+            family('request_template_seconds_total', 'counter', 'Time spent rendering templates by endpoint.',
+                   [('', {'endpoint': endpoint}, round(totals[2], 6)) for endpoint, totals in sorted(self.totals.items())])
+        for collect in self.collectors:
+            for name, kind, help_text, samples in collect():
+                family(name, kind, help_text, [('', labels, value) for labels, value in samples])
+        return '\n'.join(lines) + '\n'
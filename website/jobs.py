@@ -0,0 +1,571 @@
+"""Job listing, search, posting, bulk import, applications and saved jobs."""
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, session, flash, jsonify, abort
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from search import build_match
+from pagination import keyset_query, page_from_rows, InvalidCursor
+from salary import parse_salary, parse_salary_bound
+from ingest import RowError, chunked, content_hash, iter_json_array, iter_ndjson, normalize
+from database import read_only
+from extensions import db, job_search, job_views, recommendation_cache, recommender, skill_vocabulary, task_queue
+from models import Company, Job, JobApplication, JobSkill, JobStats, SavedJob, User, UserSkill, enqueue_task, notify_user
+from httpcache import cached_page, http_cache, static_page
+import io
+import time
+
+bp = Blueprint('jobs', __name__)
+
+def search_jobs(query, title=None, location=None, skills=None):
+    """Filter a Job query by the search fields.
+
+    Uses the FTS5 index when available and returns the filtered query together
+    with the bm25 score column (lower is better). Without FTS it falls back to
+    ILIKE filters and the score is None. Inactive jobs are left out either way,
+    as they are not in the FTS index.
+    """
+    query = query.filter_by(is_active=True)
+    if job_search.available:
+        match = build_match(title=title, location=location, skills=skills)
+        if not match:
+            return query, None
+        hits = job_search.matches(match)
+        return query.join(hits, hits.c.job_id == Job.id), hits.c.score
+
+    if title:
+        query = query.filter(Job.title.ilike(f'%{title}%'))
+    if location:
+        query = query.filter(Job.location.ilike(f'%{location}%'))
+    for skill in skills or []:
+        query = query.filter(
+            db.or_(
+                Job.description.ilike(f'%{skill}%'),
+                Job.requirements.ilike(f'%{skill}%')
+            )
+        )
+    return query, None
+
+def job_order(score=None, sort=None):
+    """Keyset sort order for a job listing; always ends with the unique id."""
+    # Rank search hits by relevance unless the user asked for newest first
+    if score is not None and sort != 'recent':
+        return [(score, False), (Job.created_at, True), (Job.id, True)]
+    return [(Job.created_at, True), (Job.id, True)]
+
+# Query-string filters understood by the job listing and /api/jobs
+LISTING_FILTERS = ('title', 'location', 'type', 'salary_min', 'salary_max', 'experience', 'skills', 'sort')
+
+def paginate_jobs(filters):
+    """Return one keyset page of jobs matching the listing filters."""
+    query, per_page = listing_query(filters)
+    return page_from_rows(query.all(), per_page)
+
+def listing_query(filters, query=None):
+    """The query for one page of the job listing, and the page size.
+
+    `query` defaults to Job.query; asgi.py passes db.select(Job) and runs it
+    on the async engine.
+    """
+    title = filters.get('title', '')
+    location = filters.get('location', '')
+    job_type = filters.get('type', '')
+    salary_min = filters.get('salary_min', '')
+    salary_max = filters.get('salary_max', '')
+    experience_level = filters.get('experience', '')
+    skills = filters.get('skills', '')
+
+    # Build query
+    skill_list = [s.strip() for s in skills.split(',') if s.strip()]
+    query, score = search_jobs(Job.query if query is None else query,
+                               title=title, location=location, skills=skill_list)
+
+    if job_type:
+        query = query.filter(Job.type.ilike(f'%{job_type}%'))
+    # Salary bounds match jobs whose (annualized) range overlaps them
+    salary_min = parse_salary_bound(salary_min)
+    salary_max = parse_salary_bound(salary_max)
+    if salary_min is not None:
+        query = query.filter(Job.salary_max >= salary_min)
+    if salary_max is not None:
+        query = query.filter(Job.salary_min <= salary_max)
+    if experience_level:
+        # Map experience level to years
+        exp_map = {'entry': 0, 'mid': 3, 'senior': 5}
+        if experience_level in exp_map:
+            # This is simplistic; in real app, jobs might have experience requirements
+            pass  # For now, skip as Job model doesn't have experience field
+
+    per_page = request.args.get('per_page', type=int) or current_app.config['JOBS_PAGE_SIZE']
+    per_page = max(1, min(per_page, current_app.config['JOBS_MAX_PAGE_SIZE']))
+    try:
+        return keyset_query(query, job_order(score, filters.get('sort')),
+                            cursor=request.args.get('cursor'), per_page=per_page), per_page
+    except InvalidCursor:
+        abort(400)
+
+def next_page_url(filters, page):
+    if not page.has_more:
+        return None
+    args = {key: filters.get(key) for key in LISTING_FILTERS if filters.get(key)}
+    if request.args.get('per_page'):
+        args['per_page'] = request.args.get('per_page')
+    return url_for('jobs.api_jobs', cursor=page.next_cursor, **args)
+
+def bump_job_stats(job_id, **deltas):
+    """Add `deltas` to a job's counters in the current transaction.
+
+    A single INSERT ... ON CONFLICT DO UPDATE, so concurrent requests never
+    lose increments and the stats row is created on first use.
+    """
+    stmt = sqlite_insert(JobStats).values(job_id=job_id, **{name: max(delta, 0) for name, delta in deltas.items()})
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[JobStats.job_id],
+        set_={name: getattr(JobStats, name) + delta for name, delta in deltas.items()}
+    )
+    db.session.execute(stmt)
+
+def saved_job_ids(jobs):
+    """The ids among `jobs` that the logged-in user has saved, as a set."""
+    if 'user_id' not in session or not jobs:
+        return set()
+    return set(db.session.scalars(db.select(SavedJob.job_id).where(
+        SavedJob.user_id == session['user_id'], SavedJob.job_id.in_([job.id for job in jobs]))))
+
+def set_saved(user_id, job_ids, saved):
+    """Save or unsave `job_ids` for a user in the current transaction; returns the ids that changed.
+
+    Idempotent: saving a saved job or unsaving an unsaved one is a no-op.
+    Each direction is one statement against the unique (user_id, job_id)
+    index, so concurrent requests can neither duplicate a save nor count it
+    twice in saves_count. Ids of jobs that do not exist are ignored.
+    """
+    if not job_ids:
+        return set()
+    if saved:
+        stmt = sqlite_insert(SavedJob).from_select(
+            ['user_id', 'job_id'], db.select(db.literal(user_id), Job.id).where(Job.id.in_(job_ids))
+        ).on_conflict_do_nothing(index_elements=['user_id', 'job_id'])
+    else:
+        stmt = db.delete(SavedJob).where(SavedJob.user_id == user_id, SavedJob.job_id.in_(job_ids))
+    changed = set(db.session.execute(stmt.returning(SavedJob.job_id)).scalars())
+    for job_id in changed:
+        bump_job_stats(job_id, saves_count=1 if saved else -1)
+    return changed
+
+# Routes
+@bp.route('/', methods=['GET', 'POST'])
+def home():
+    if 'user_id' not in session:
+        return render_template('register.html')
+
+    if request.method == 'POST':
+        # Query jobs based on search
+        page = paginate_jobs(request.form)
+        return render_template('jobs.html', jobs=page.items, saved_job_ids=saved_job_ids(page.items),
+                               next_url=next_page_url(request.form, page))
+
+    return render_template('home.html')
+
+@bp.route('/about')
+def about():
+    return static_page('about.html')
+
+@bp.route('/jobs')
+@read_only
+def jobs():
+    if 'user_id' not in session:
+        return cached_page(render_jobs)
+    return render_jobs()
+
+def render_jobs():
+    page = paginate_jobs(request.args)
+    return render_template('jobs.html', jobs=page.items, saved_job_ids=saved_job_ids(page.items),
+                           next_url=next_page_url(request.args, page))
+
+@bp.route('/api/jobs')
+@read_only
+def api_jobs():
+    """JSON pages of the job listing, used by the "load more" button."""
+    page = paginate_jobs(request.args)
+
+    saved = saved_job_ids(page.items)
+    jobs_data = []
+    for job in page.items:
+        data = job.to_dict()
+        data['saved'] = job.id in saved
+        jobs_data.append(data)
+
+    return jsonify({
+        'jobs': jobs_data,
+        'next_cursor': page.next_cursor,
+        'next_url': next_page_url(request.args, page),
+    })
+
+@bp.route('/contact')
+def contact():
+    return static_page('contact.html')
+
+@bp.route('/job/<int:job_id>')
+@read_only
+def job_details(job_id):
+    job = Job.query.get_or_404(job_id)
+    user_id = session.get('user_id')
+    has_applied = user_id is not None and db.session.query(JobApplication.id).filter_by(
+        job_id=job_id, applicant_id=user_id).first() is not None
+    # A revalidated copy still counts as a view. Views are added up in memory
+    # and written in batches, so neither a 304 nor a full page takes the write lock
+    job_views.add(job_id)
+    not_modified = http_cache(('job', job.id, job.updated_at, has_applied), job.updated_at)
+    if not_modified:
+        return not_modified
+    return render_template('job_details.html', job=job, has_applied=has_applied)
+
+@bp.route('/post-job', methods=['GET', 'POST'])
+def post_job():
+    if 'user_id' not in session:
+        flash('Please login to post a job', 'error')
+        return redirect(url_for('accounts.login'))
+
+    user_id = session['user_id']
+
+    if request.method == 'POST':
+        title = request.form.get('title')
+        company_option = request.form.get('company_option')  # 'existing' or 'new'
+        company_id = request.form.get('company_id')
+        new_company_name = request.form.get('new_company_name')
+        location = request.form.get('location')
+        salary = request.form.get('salary')
+        type = request.form.get('type')
+        description = request.form.get('description')
+
+        # Validation
+        if not all([title, location, salary, type, description]):
+            flash('All fields are required', 'error')
+            return redirect(url_for('jobs.post_job'))
+
+        if company_option == 'existing':
+            if not company_id:
+                flash('Please select a company', 'error')
+                return redirect(url_for('jobs.post_job'))
+            company = Company.query.get_or_404(company_id)
+            company_name = company.name
+        elif company_option == 'new':
+            if not new_company_name:
+                flash('Please enter a company name', 'error')
+                return redirect(url_for('jobs.post_job'))
+            # Find or create the company, in the same transaction as the job
+            company_name = new_company_name
+            company_id = resolve_companies([company_name], user_id)[company_name]
+        else:
+            flash('Invalid company option', 'error')
+            return redirect(url_for('jobs.post_job'))
+
+        # Create new job. A duplicate from this employer, even one posted
+        # concurrently, is skipped by the unique content hash instead of raising
+        salary_min, salary_max, currency, period = parse_salary(salary)
+        job_id = db.session.execute(sqlite_insert(Job).values(
+            title=title, company=company_name, company_id=company_id, location=location, type=type,
+            description=description, posted_by=user_id, salary=salary, salary_min=salary_min, salary_max=salary_max,
+            salary_currency=currency, salary_period=period,
+            content_hash=content_hash({'title': title, 'company': company_name, 'location': location,
+                                       'type': type, 'description': description}, posted_by=user_id),
+        ).on_conflict_do_nothing(index_elements=[Job.content_hash]).returning(Job.id)).scalar()
+        if job_id is None:
+            # Also drops a company created for it
+            db.session.rollback()
+            flash('This job has already been posted', 'error')
+            return redirect(url_for('jobs.post_job'))
+        # Core inserts skip the mapper events, so index the job as ingest_jobs does
+        job_search.add_many(db.session.connection(), [job_id])
+        enqueue_task('match_job_skills', job_ids=[job_id])
+        db.session.info['pages_stale'] = True
+        db.session.commit()
+
+        flash('Job posted successfully!', 'success')
+        return redirect(url_for('jobs.jobs'))
+
+    # Get user's companies for dropdown
+    user_companies = Company.query.filter_by(created_by=user_id).all()
+
+    return render_template('post_job.html', user_companies=user_companies)
+
+def resolve_companies(names, created_by):
+    """Map company names to ids with one lookup, creating the missing companies."""
+    ids = dict(db.session.query(Company.name, Company.id).filter(Company.name.in_(names)))
+    missing = [name for name in names if name not in ids]
+    if missing:
+        db.session.execute(sqlite_insert(Company).on_conflict_do_nothing(index_elements=[Company.name]),
+                           [{'name': name, 'created_by': created_by} for name in missing])
+        ids.update(db.session.query(Company.name, Company.id).filter(Company.name.in_(missing)))
+    return ids
+
+def insert_job_rows(rows, on_error):
+    """Insert a chunk of job rows and return the new ids.
+
+    Rows whose content hash already exists are skipped. If the chunk fails
+    as a whole it is retried row by row so one bad row is reported through
+    `on_error(row number, message)` instead of failing its neighbours.
+    """
+    statement = sqlite_insert(Job).on_conflict_do_nothing(index_elements=[Job.content_hash]).returning(Job.id)
+    values = [values for _, values in rows]
+    try:
+        with db.session.begin_nested():
+            return [job_id for job_id, in db.session.execute(statement, values)]
+    except IntegrityError:
+        pass
+    job_ids = []
+    for number, row in rows:
+        try:
+            with db.session.begin_nested():
+                job_ids.extend(job_id for job_id, in db.session.execute(statement, [row]))
+        except IntegrityError as e:
+            on_error(number, str(e.orig))
+    return job_ids
+
+def ingest_jobs(records, posted_by, chunk_size=None):
+    """Import (row number, record) pairs from a feed, one transaction per chunk.
+
+    Companies are resolved with one lookup per chunk, jobs go in with a
+    single multi-row INSERT and are added to the search index in one
+    statement. Invalid rows and duplicates are counted and reported
+    without stopping the import.
+    """
+    chunk_size = chunk_size or current_app.config['INGEST_CHUNK_SIZE']
+    summary = {'received': 0, 'inserted': 0, 'duplicates': 0, 'error_count': 0, 'errors': []}
+    started = time.perf_counter()
+
+    def on_error(number, message):
+        summary['error_count'] += 1
+        if len(summary['errors']) < current_app.config['INGEST_MAX_ERRORS']:
+            summary['errors'].append({'row': number, 'error': message})
+
+    for chunk in chunked(records, chunk_size):
+        jobs = {}
+        for number, record in chunk:
+            summary['received'] += 1
+            try:
+                job = normalize(record)
+            except RowError as e:
+                on_error(number, str(e))
+                continue
+            job['content_hash'] = content_hash(job)
+            if job['content_hash'] in jobs:
+                summary['duplicates'] += 1
+                continue
+            jobs[job['content_hash']] = (number, job)
+        if not jobs:
+            continue
+
+        for existing, in db.session.query(Job.content_hash).filter(Job.content_hash.in_(list(jobs))):
+            del jobs[existing]
+            summary['duplicates'] += 1
+
+        company_ids = resolve_companies({job['company'] for _, job in jobs.values()}, posted_by)
+        rows = []
+        for number, job in jobs.values():
+            salary_min, salary_max, currency, period = parse_salary(job['salary'])
+            rows.append((number, dict(job, company_id=company_ids.get(job['company']), posted_by=posted_by,
+                                      is_active=True, salary_min=salary_min, salary_max=salary_max,
+                                      salary_currency=currency, salary_period=period)))
+
+        # Bulk inserts skip the mapper events, so index the whole chunk at once
+        errors_before = summary['error_count']
+        job_ids = insert_job_rows(rows, on_error)
+        job_search.add_many(db.session.connection(), job_ids)
+        if job_ids:
+            enqueue_task('match_job_skills', job_ids=job_ids)
+            db.session.info['pages_stale'] = True
+        db.session.commit()
+        summary['inserted'] += len(job_ids)
+        # Rows skipped by ON CONFLICT lost a race with a concurrent import
+        summary['duplicates'] += len(rows) - len(job_ids) - (summary['error_count'] - errors_before)
+
+    elapsed = time.perf_counter() - started
+    summary['seconds'] = round(elapsed, 3)
+    summary['rows_per_sec'] = round(summary['received'] / elapsed) if elapsed else None
+    return summary
+
+@bp.route('/api/jobs/bulk', methods=['POST'])
+def api_jobs_bulk():
+    """Import a feed of jobs posted as the current user.
+
+    Send NDJSON (application/x-ndjson) to stream large feeds; a JSON array
+    is read into memory first.
+    """
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Please login first'}), 401
+
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+        # request.stream is unbuffered; reading it line by line would go a byte at a time
+        records = iter_ndjson(io.BufferedReader(request.stream, 64 * 1024))
+    else:
+        try:
+            records = iter_json_array(request.get_data(as_text=True))
+        except RowError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, **ingest_jobs(records, session['user_id'])})
+
+@bp.route('/apply/<int:job_id>', methods=['GET', 'POST'])
+def apply_job(job_id):
+    if 'user_id' not in session:
+        flash('Please login to apply for jobs', 'error')
+        return redirect(url_for('accounts.login'))
+
+    job = Job.query.get_or_404(job_id)
+    user_id = session['user_id']
+
+    if request.method == 'POST':
+        cover_letter = request.form.get('cover_letter')
+
+        # The unique (job_id, applicant_id) index turns a double submit into a no-op
+        application_id = db.session.execute(sqlite_insert(JobApplication).values(
+            job_id=job_id, applicant_id=user_id, cover_letter=cover_letter
+        ).on_conflict_do_nothing(index_elements=['job_id', 'applicant_id']).returning(JobApplication.id)).scalar()
+        if application_id is None:
+            db.session.rollback()
+            flash('You have already applied for this job', 'info')
+            return redirect(url_for('jobs.job_details', job_id=job_id))
+        bump_job_stats(job_id, applications_count=1, pending_count=1)
+        enqueue_task('notify_new_application', key=f'application:{application_id}', application_id=application_id)
+        db.session.commit()
+        recommendation_cache.invalidate_user(user_id)
+
+        flash('Application submitted successfully!', 'success')
+        return redirect(url_for('accounts.account'))
+
+    # Only to skip showing the form; the insert above is what enforces it
+    if db.session.query(JobApplication.id).filter_by(job_id=job_id, applicant_id=user_id).first():
+        flash('You have already applied for this job', 'info')
+        return redirect(url_for('jobs.job_details', job_id=job_id))
+
+    return render_template('apply_job.html', job=job, user=db.session.get(User, user_id))
+
+# API for saving/unsaving jobs
+@bp.route('/api/save-job/<int:job_id>', methods=['POST'])
+def save_job(job_id):
+    """Set a job's saved state to the JSON body's "saved", or toggle it when that is missing."""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Please login first'})
+
+    user_id = session['user_id']
+    saved = (request.get_json(silent=True) or {}).get('saved')
+    if saved is None:
+        # Toggle: save the job unless unsaving it removed a save
+        saved = not set_saved(user_id, [job_id], False)
+        if saved:
+            set_saved(user_id, [job_id], True)
+    else:
+        saved = bool(saved)
+        set_saved(user_id, [job_id], saved)
+    db.session.commit()
+    if saved:
+        return jsonify({'success': True, 'saved': True, 'message': 'Job saved successfully'})
+    return jsonify({'success': True, 'saved': False, 'message': 'Job removed from saved jobs'})
+
+@bp.route('/api/saved-jobs', methods=['POST'])
+def api_saved_jobs():
+    """Save and unsave many jobs at once.
+
+    Takes {"save": [job ids], "unsave": [job ids]} and returns which of
+    those jobs are saved afterwards.
+    """
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Please login first'}), 401
+
+    data = request.get_json(silent=True) or {}
+    save, unsave = data.get('save') or [], data.get('unsave') or []
+    if not all(isinstance(ids, list) and all(type(job_id) is int for job_id in ids) for ids in (save, unsave)):
+        return jsonify({'success': False, 'message': '"save" and "unsave" must be lists of job ids'}), 400
+    if len(save) + len(unsave) > current_app.config['SAVED_JOBS_BATCH_SIZE']:
+        return jsonify({'success': False, 'message': 'Too many job ids in one request'}), 400
+    if set(save) & set(unsave):
+        return jsonify({'success': False, 'message': 'A job cannot be both saved and unsaved'}), 400
+
+    user_id = session['user_id']
+    changed = set_saved(user_id, save, True) | set_saved(user_id, unsave, False)
+    saved = set(db.session.scalars(db.select(SavedJob.job_id).where(
+        SavedJob.user_id == user_id, SavedJob.job_id.in_(save + unsave))))
+    db.session.commit()
+    return jsonify({'success': True, 'changed': len(changed), 'saved': sorted(saved),
+                    'unsaved': sorted(set(save + unsave) - saved)})
+
+# Recommendation algorithm
+def refresh_recommender():
+    """Pull jobs posted or edited since the last refresh into the skill index."""
+    created = db.type_coerce(Job.created_at, db.String)
+    updated = db.type_coerce(Job.updated_at, db.String)
+    while True:
+        now = db.session.execute(db.text('SELECT CURRENT_TIMESTAMP')).scalar()
+        skill_ids = db.func.group_concat(JobSkill.skill_id)
+        query = db.session.query(Job.id, skill_ids, created, updated, Job.is_active).outerjoin(
+            JobSkill, JobSkill.job_id == Job.id).group_by(Job.id)
+        if recommender.watermark is not None:
+            query = query.filter(updated > recommender.watermark)
+        # Each batch is fetched before update() takes the index lock, so
+        # requests reading the index never wait on a query
+        for batch in chunked(query.yield_per(5000), 5000):
+            rows = [(job_id, [int(skill_id) for skill_id in skills.split(',')] if skills else (),
+                     created_at, updated_at, is_active is not False)
+                    for job_id, skills, created_at, updated_at, is_active in batch]
+            if not recommender.update(rows, now):
+                break
+        else:
+            return
+
+def compute_recommended_job_ids(user_id, limit=5):
+    # Skill ids from the profile's skills field and resume, see skills.py
+    user_skills = [skill_id for skill_id, in db.session.query(UserSkill.skill_id).filter_by(user_id=user_id).distinct()]
+
+    if not user_skills:
+        # If no profile or skills, return recent active jobs the user has not applied to
+        applied = db.session.query(JobApplication.id).filter(JobApplication.job_id == Job.id,
+                                                             JobApplication.applicant_id == user_id)
+        return [job_id for job_id, in db.session.query(Job.id).filter(Job.is_active.isnot(False), ~applied.exists())
+                .order_by(Job.created_at.desc()).limit(limit)]
+
+    # Get jobs user has applied to
+    applied_job_ids = {job_id for job_id, in db.session.query(JobApplication.job_id).filter_by(applicant_id=user_id)}
+
+    # Score jobs based on skill match, best score first and newest first on ties
+    refresh_recommender()
+    return recommender.recommend(user_skills, exclude=applied_job_ids, limit=limit)
+
+def get_recommended_jobs(user_id, limit=5):
+    """Recommended jobs for a user, served from the recommendation cache.
+
+    Cache entries are keyed by user only, so callers should stick to one limit.
+    """
+    job_ids = recommended_job_ids(user_id, limit)
+    jobs_by_id = {job.id: job for job in Job.query.filter(Job.id.in_(job_ids))}
+    return [jobs_by_id[job_id] for job_id in job_ids if job_id in jobs_by_id]
+
+def recommended_job_ids(user_id, limit=5):
+    return recommendation_cache.get_or_compute(user_id, lambda: compute_recommended_job_ids(user_id, limit))
+
+@job_views.writer
+def write_job_views(counts):
+    # Skip jobs deleted since they were viewed
+    for job_id in db.session.scalars(db.select(Job.id).where(Job.id.in_(counts))):
+        bump_job_stats(job_id, views_count=counts[job_id])
+
+# Background tasks; each may run more than once, see tasks.py
+@task_queue.task()
+def match_job_skills(job_ids):
+    skill_vocabulary.sync_jobs(db.session.connection(), job_ids)
+    db.session.commit()
+    # New jobs become recommendable once their skills are known
+    recommendation_cache.jobs_changed()
+
+@task_queue.task()
+def notify_new_application(application_id):
+    application = db.session.get(JobApplication, application_id)
+    if application is None:
+        return
+    notify_user(application.job.posted_by, {
+        'type': 'application',
+        'application_id': application.id,
+        'job_id': application.job_id,
+        'job_title': application.job.title,
+        'applicant_name': application.applicant.name,
+    })
+    # Events are published on commit
+    db.session.commit()
@@ -0,0 +1,270 @@
+"""Conversations between users, with realtime delivery over SSE or long polling."""
+from flask import Blueprint, Response, current_app, render_template, request, redirect, url_for, session, flash, jsonify, abort
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from pagination import keyset_page, InvalidCursor
+from database import begin_writes, read_only
+from extensions import db
+from models import Conversation, Message, User, notify_user
+from pubsub import BrokerFull
+import json
+import time
+
+bp = Blueprint('messaging', __name__)
+
+# Messaging routes
+@bp.route('/messages')
+@read_only
+def messages():
+    if 'user_id' not in session:
+        flash('Please login to access messages', 'error')
+        return redirect(url_for('accounts.login'))
+
+    user_id = session['user_id']
+
+    mine = db.or_(Conversation.user1_id == user_id, Conversation.user2_id == user_id)
+
+    # Get one page of the user's conversations, most recent first
+    query = db.session.query(Conversation).options(
+        db.joinedload(Conversation.user1), db.joinedload(Conversation.user2)
+    ).filter(mine)
+    try:
+        page = keyset_page(query, [(Conversation.last_message_at, True), (Conversation.id, True)],
+                           cursor=request.args.get('cursor'), per_page=current_app.config['CONVERSATIONS_PAGE_SIZE'])
+    except InvalidCursor:
+        abort(400)
+    next_url = url_for('messaging.messages', cursor=page.next_cursor) if page.has_more else None
+
+    # Get unread message count over all conversations from the per-conversation counters
+    unread = db.case((Conversation.user1_id == user_id, Conversation.user1_unread), else_=Conversation.user2_unread)
+    unread_count = db.session.query(db.func.coalesce(db.func.sum(unread), 0)).filter(mine).scalar()
+
+    return render_template('messages.html', conversations=page.items, next_url=next_url, unread_count=unread_count)
+
+def find_conversation(user_id, other_user_id):
+    """Return the conversation between two users, or None."""
+    user1_id, user2_id = sorted((user_id, other_user_id))
+    return Conversation.query.filter_by(user1_id=user1_id, user2_id=user2_id).first()
+
+def get_or_create_conversation(user_id, other_user_id):
+    """Return the conversation between two users, creating it if needed."""
+    user1_id, user2_id = sorted((user_id, other_user_id))
+    conversation = find_conversation(user_id, other_user_id)
+    if conversation is None:
+        # Another request may create the same pair concurrently; the unique
+        # key turns that into a no-op instead of a duplicate thread
+        db.session.execute(sqlite_insert(Conversation).values(
+            user1_id=user1_id, user2_id=user2_id
+        ).on_conflict_do_nothing(index_elements=['user1_id', 'user2_id']))
+        conversation = Conversation.query.filter_by(user1_id=user1_id, user2_id=user2_id).one()
+    return conversation
+
+def post_message(conversation, sender_id, receiver_id, subject, content):
+    """Add a message to a conversation; the caller commits."""
+    message = Message(
+        conversation_id=conversation.id,
+        sender_id=sender_id,
+        receiver_id=receiver_id,
+        subject=subject or '',
+        content=content
+    )
+    db.session.add(message)
+
+    # Update conversation timestamp, preview and the receiver's unread counter.
+    # The counter is incremented in SQL so concurrent sends are not lost.
+    conversation.last_message_at = db.func.current_timestamp()
+    conversation.last_message_preview = content[:120]
+    conversation.last_sender_id = sender_id
+    if receiver_id != sender_id:
+        column = conversation.unread_column(receiver_id)
+        setattr(conversation, column.key, column + 1)
+
+    # Flush so the event carries the message id and timestamp
+    db.session.flush()
+    event = {'type': 'message', 'conversation_id': conversation.id, 'message': message.to_dict()}
+    notify_user(receiver_id, event)
+    if receiver_id != sender_id:
+        notify_user(sender_id, event)
+    return message
+
+def mark_conversation_read(conversation, user_id):
+    """Mark everything sent to `user_id` in a conversation as read; the caller commits."""
+    if not conversation.unread_for(user_id):
+        return
+    Message.query.filter_by(conversation_id=conversation.id, receiver_id=user_id, is_read=False).update({'is_read': True})
+    setattr(conversation, conversation.unread_column(user_id).key, 0)
+    notify_user(user_id, {'type': 'read', 'conversation_id': conversation.id})
+
+def paginate_messages(conversation):
+    """Latest page of a thread, newest first; the cursor walks back in time."""
+    query = Message.query.filter_by(conversation_id=conversation.id)
+    try:
+        return keyset_page(query, [(Message.sent_at, True), (Message.id, True)],
+                           cursor=request.args.get('cursor'), per_page=current_app.config['MESSAGES_PAGE_SIZE'])
+    except InvalidCursor:
+        abort(400)
+
+@bp.route('/conversation/<int:other_user_id>', methods=['GET', 'POST'])
+def conversation(other_user_id):
+    if 'user_id' not in session:
+        flash('Please login to access messages', 'error')
+        return redirect(url_for('accounts.login'))
+
+    user_id = session['user_id']
+
+    # Check if other user exists
+    other_user = User.query.get_or_404(other_user_id)
+
+    if request.method == 'POST':
+        subject = request.form.get('subject')
+        content = request.form.get('content')
+
+        if not content:
+            flash('Message content is required', 'error')
+            return redirect(url_for('messaging.conversation', other_user_id=other_user_id))
+
+        # Create message
+        conversation = get_or_create_conversation(user_id, other_user_id)
+        message = post_message(conversation, user_id, other_user_id, subject, content)
+        db.session.commit()
+
+        # script.js sends with fetch and appends the message itself
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'success': True, 'message': message.to_dict()}), 201
+
+        flash('Message sent successfully!', 'success')
+        return redirect(url_for('messaging.conversation', other_user_id=other_user_id))
+
+    # Opening a thread only takes the write lock when there is something to
+    # write: a new conversation or messages to mark as read
+    conversation = find_conversation(user_id, other_user_id)
+    if conversation is None or conversation.unread_for(user_id):
+        begin_writes(db.session)
+        conversation = get_or_create_conversation(user_id, other_user_id)
+        mark_conversation_read(conversation, user_id)
+        db.session.commit()
+
+    # Get the latest messages in this conversation; older ones load on demand
+    page = paginate_messages(conversation)
+    message_list = list(reversed(page.items))
+    older_url = url_for('messaging.api_conversation_messages', other_user_id=other_user_id,
+                        cursor=page.next_cursor) if page.has_more else None
+
+    return render_template('conversation.html', conversation=conversation, messages=message_list,
+                           other_user=other_user, older_url=older_url)
+
+@bp.route('/api/conversation/<int:other_user_id>/read', methods=['POST'])
+def api_conversation_read(other_user_id):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Please login first'}), 401
+
+    conversation = find_conversation(session['user_id'], other_user_id)
+    if conversation is None:
+        abort(404)
+    mark_conversation_read(conversation, session['user_id'])
+    db.session.commit()
+    return jsonify({'success': True})
+
+def sse_event(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+# Seconds a client refused by a full broker waits before trying again
+BUSY_RETRY_AFTER = 10
+
+def broker_busy():
+    return (jsonify({'success': False, 'message': 'Too many open message streams, try again shortly'}), 503,
+            {'Retry-After': str(BUSY_RETRY_AFTER)})
+
+@bp.route('/api/messages/stream')
+def message_stream():
+    """Server-Sent Events feed of new messages and read receipts for the current user.
+
+    No database work happens here, so an idle stream only costs its thread
+    and a queue. Streams are limited per process (MESSAGE_MAX_SUBSCRIBERS)
+    and end after MESSAGE_STREAM_LIFETIME seconds. Events missed while
+    disconnected are not replayed; the client resyncs from the conversation
+    API when it reconnects, and long polls when a stream is refused.
+    """
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Please login first'}), 401
+
+    try:
+        subscription = current_app.extensions['message_broker'].subscribe(f"user:{session['user_id']}")
+    except BrokerFull:
+        return broker_busy()
+    heartbeat = current_app.config['MESSAGE_STREAM_HEARTBEAT']
+    deadline = time.monotonic() + current_app.config['MESSAGE_STREAM_LIFETIME']
+
+    def generate():
+        with subscription:
+            yield 'retry: 3000\n\n'
+            while time.monotonic() < deadline:
+                event = subscription.get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0)))
+                # Comments keep proxies from closing an idle connection
+                yield sse_event(event) if event is not None else ': keep-alive\n\n'
+
+    response = Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # A generator closed before it started never runs its with block
+    response.call_on_close(subscription.close)
+    return response
+
+@bp.route('/api/messages/poll')
+def message_poll():
+    """Long-poll fallback for clients without EventSource."""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Please login first'}), 401
+
+    timeout = min(request.args.get('timeout', type=float) or current_app.config['MESSAGE_POLL_TIMEOUT'],
+                  current_app.config['MESSAGE_POLL_TIMEOUT'])
+    try:
+        subscription = current_app.extensions['message_broker'].subscribe(f"user:{session['user_id']}")
+    except BrokerFull:
+        return broker_busy()
+    with subscription:
+        event = subscription.get(timeout=timeout)
+        events = [event] + subscription.drain() if event is not None else []
+    return jsonify({'events': events})
+
+@bp.route('/api/conversation/<int:other_user_id>/messages')
+@read_only
+def api_conversation_messages(other_user_id):
+    """Older pages of a thread as JSON, newest first."""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Please login first'}), 401
+
+    user1_id, user2_id = sorted((session['user_id'], other_user_id))
+    conversation = Conversation.query.filter_by(user1_id=user1_id, user2_id=user2_id).first_or_404()
+    page = paginate_messages(conversation)
+    next_url = url_for('messaging.api_conversation_messages', other_user_id=other_user_id,
+                       cursor=page.next_cursor) if page.has_more else None
+    return jsonify({
+        'messages': [message.to_dict() for message in page.items],
+        'next_url': next_url,
+    })
+
+@bp.route('/send-message/<int:receiver_id>', methods=['GET', 'POST'])
+def send_message(receiver_id):
+    if 'user_id' not in session:
+        flash('Please login to send messages', 'error')
+        return redirect(url_for('accounts.login'))
+
+    sender_id = session['user_id']
+    receiver = User.query.get_or_404(receiver_id)
+
+    if request.method == 'POST':
+        subject = request.form.get('subject')
+        content = request.form.get('content')
+
+        if not content:
+            flash('Message content is required', 'error')
+            return redirect(url_for('messaging.send_message', receiver_id=receiver_id))
+
+        # Find or create conversation, then create message
+        conversation = get_or_create_conversation(sender_id, receiver_id)
+        post_message(conversation, sender_id, receiver_id, subject, content)
+        db.session.commit()
+
+        flash('Message sent successfully!', 'success')
+        return redirect(url_for('messaging.conversation', other_user_id=receiver_id))
+
+    return render_template('send_message.html', receiver=receiver)
@@ -1,48 +1,17 @@
-from app import db, app
-from sqlalchemy import text
+"""Apply pending schema migrations; same as `flask db-upgrade`.
 
-with app.app_context():
-    # Add new columns to existing Job table
-    try:
-        db.session.execute(text('ALTER TABLE job ADD COLUMN requirements TEXT'))
-        db.session.commit()
-        print("Added requirements column")
-    except Exception as e:
-        print(f"Requirements column might already exist: {e}")
-        db.session.rollback()
+    python migrate_db.py [--batch-size 1000] [--pause 0.05]
+"""
+import argparse
 
-    try:
-        db.session.execute(text('ALTER TABLE job ADD COLUMN benefits TEXT'))
-        db.session.commit()
-        print("Added benefits column")
-    except Exception as e:
-        print(f"Benefits column might already exist: {e}")
-        db.session.rollback()
+from app import app, upgrade_database
 
-    try:
-        db.session.execute(text('ALTER TABLE job ADD COLUMN is_active BOOLEAN DEFAULT 1'))
-        db.session.commit()
-        print("Added is_active column")
-    except Exception as e:
-        print(f"is_active column might already exist: {e}")
-        db.session.rollback()
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--pause', type=float, default=0.05)
+    args = parser.parse_args()
 
-    try:
-        db.session.execute(text('ALTER TABLE job ADD COLUMN updated_at DATETIME DEFAULT CURRENT_TIMESTAMP'))
-        db.session.commit()
-        print("Added updated_at column")
-    except Exception as e:
-        print(f"updated_at column might already exist: {e}")
-        db.session.rollback()
-
-    try:
-        db.session.execute(text('ALTER TABLE user ADD COLUMN user_type VARCHAR(20) DEFAULT "job_seeker"'))
-        db.session.commit()
-        print("Added user_type column")
-    except Exception as e:
-        print(f"user_type column might already exist: {e}")
-        db.session.rollback()
-
-    # Create new tables
-    db.create_all()
-    print("Database migration completed!")
+    with app.app_context():
+        ran = upgrade_database(batch_size=args.batch_size, pause=args.pause)
+    print(f'Database migration completed! {len(ran)} migrations applied')
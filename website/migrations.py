@@ -0,0 +1,445 @@
+"""Versioned schema migrations.
+
+Every revision runs once and is recorded in the schema_migrations table.
+The baseline creates any missing table from the models, so on a fresh
+database the later revisions find nothing to do; on an older database
+they add columns, backfill data and build indexes. Backfills and
+duplicate clean-ups run in short id-ordered batches with a pause in
+between so a live database is never locked for long, and they are safe to
+re-run if a revision is interrupted halfway.
+
+SQLite builds an index in a single pass, so index creation cannot itself
+be split up; each index gets its own short transaction once the batched
+clean-up has made it possible.
+
+    flask db-upgrade [--batch-size 1000] [--pause 0.05]
+    flask db-status
+    flask db-explain
+"""
+import time
+from collections import namedtuple
+
+from sqlalchemy import text
+
+from ingest import content_hash
+from salary import parse_salary
+from skills import SkillVocabulary
+
+Revision = namedtuple('Revision', 'version description apply')
+
+REVISIONS = []
+
+
+def revision(version, description):
+    def register(apply):
+        REVISIONS.append(Revision(version, description, apply))
+        return apply
+    return register
+
+
+class Migrator:
+    def __init__(self, engine, metadata, search_index=None, batch_size=1000, pause=0.05, log=print):
+        self.engine = engine
+        self.metadata = metadata
+        self.search_index = search_index
+        self.batch_size = batch_size
+        self.pause = pause
+        self.log = log
+
+    def ensure_table(self):
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                'CREATE TABLE IF NOT EXISTS schema_migrations ('
+                'version VARCHAR(32) PRIMARY KEY, description TEXT NOT NULL, '
+                'applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP)'
+            ))
+
+    def applied(self):
+        self.ensure_table()
+        with self.engine.connect() as conn:
+            return dict(conn.execute(text('SELECT version, applied_at FROM schema_migrations')).all())
+
+    def status(self):
+        """(revision, applied_at) for every known revision; applied_at is None if pending."""
+        applied = self.applied()
+        return [(rev, applied.get(rev.version)) for rev in REVISIONS]
+
+    def upgrade(self, target=None):
+        """Apply pending revisions up to and including `target`; returns their versions."""
+        done = self.applied()
+        ran = []
+        for rev in REVISIONS:
+            if target is not None and rev.version > target:
+                break
+            if rev.version in done:
+                continue
+            self.log(f'Applying {rev.version}: {rev.description}')
+            started = time.perf_counter()
+            rev.apply(self)
+            with self.engine.begin() as conn:
+                conn.execute(text('INSERT INTO schema_migrations (version, description) VALUES (:version, :description)'),
+                             {'version': rev.version, 'description': rev.description})
+            self.log(f'  done in {time.perf_counter() - started:.2f}s')
+            ran.append(rev.version)
+        return ran
+
+    # Helpers for revisions
+
+    def columns(self, table):
+        with self.engine.connect() as conn:
+            return {row[1] for row in conn.execute(text(f'PRAGMA table_info({table})'))}
+
+    def add_columns(self, table, columns):
+        existing = self.columns(table)
+        with self.engine.begin() as conn:
+            for name, type_ in columns:
+                if name not in existing:
+                    conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {name} {type_}'))
+                    self.log(f'  added {table}.{name}')
+
+    def create_tables(self, names):
+        """Create tables declared on the models, with their indexes, if they do not exist yet."""
+        with self.engine.begin() as conn:
+            for name in names:
+                self.metadata.tables[name].create(conn, checkfirst=True)
+
+    def create_index(self, name):
+        """Create an index declared on the models, if it does not exist yet."""
+        for table in self.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name == name:
+                    with self.engine.begin() as conn:
+                        index.create(conn, checkfirst=True)
+                    return
+        raise KeyError(f'No index named {name} on the models')
+
+    def batches(self, table, where='1 = 1'):
+        """Yield (first, last) id ranges covering the rows of `table` matching `where`.
+
+        The caller runs one short transaction per range; the pause between
+        ranges gives other writers a chance to take the lock.
+        """
+        last_id = 0
+        while True:
+            with self.engine.connect() as conn:
+                ids = [row[0] for row in conn.execute(text(
+                    f'SELECT id FROM {table} WHERE id > :last_id AND {where} ORDER BY id LIMIT :limit'
+                ), {'last_id': last_id, 'limit': self.batch_size})]
+            if not ids:
+                return
+            yield ids[0], ids[-1]
+            last_id = ids[-1]
+            time.sleep(self.pause)
+
+    def delete_duplicates(self, table, columns):
+        """Keep the oldest row of every `columns` group so a unique index can be built."""
+        key = ', '.join(columns)
+        with self.engine.connect() as conn:
+            duplicates = [row[0] for row in conn.execute(text(
+                f'SELECT id FROM {table} WHERE id NOT IN (SELECT min(id) FROM {table} GROUP BY {key}) ORDER BY id'
+            ))]
+        for start in range(0, len(duplicates), self.batch_size):
+            chunk = duplicates[start:start + self.batch_size]
+            with self.engine.begin() as conn:
+                conn.execute(text(f'DELETE FROM {table} WHERE id IN ({", ".join(map(str, chunk))})'))
+            time.sleep(self.pause)
+        if duplicates:
+            self.log(f'  removed {len(duplicates)} duplicate rows from {table}')
+
+
+def rebuild_conversation_counters(engine, batch_size=1000):
+    """Recompute inbox unread counters and previews from messages, in batches of conversations."""
+    unread = ('SELECT count(*) FROM message m WHERE m.conversation_id = conversation.id '
+              'AND m.receiver_id = conversation.{} AND m.is_read = 0')
+    latest = ('SELECT m.{} FROM message m WHERE m.conversation_id = conversation.id '
+              'ORDER BY m.sent_at DESC, m.id DESC LIMIT 1')
+    statement = text(
+        f'UPDATE conversation SET user1_unread = ({unread.format("user1_id")}), '
+        f'user2_unread = ({unread.format("user2_id")}), '
+        f'last_message_preview = substr(({latest.format("content")}), 1, 120), '
+        f'last_sender_id = ({latest.format("sender_id")}) '
+        'WHERE id > :first AND id <= :last'
+    )
+    with engine.connect() as conn:
+        last_id = conn.execute(text('SELECT coalesce(max(id), 0) FROM conversation')).scalar()
+    for first in range(0, last_id, batch_size):
+        with engine.begin() as conn:
+            conn.execute(statement, {'first': first, 'last': first + batch_size})
+    return last_id
+
+
+def rebuild_job_stats(engine, batch_size=1000):
+    """Recompute application and save counters in batches of jobs; view counts are kept."""
+    counts = {'applications_count': ''}
+    counts.update({f'{status}_count': f" AND a.status = '{status}'"
+                   for status in ('pending', 'reviewed', 'accepted', 'rejected')})
+    selects = ', '.join(f'(SELECT count(*) FROM job_application a WHERE a.job_id = job.id{condition})'
+                        for condition in counts.values())
+    statement = text(
+        f'INSERT INTO job_stats (job_id, {", ".join(counts)}, saves_count, views_count) '
+        f'SELECT job.id, {selects}, (SELECT count(*) FROM saved_job s WHERE s.job_id = job.id), 0 '
+        'FROM job WHERE job.id > :first AND job.id <= :last '
+        'ON CONFLICT (job_id) DO UPDATE SET '
+        + ', '.join(f'{column} = excluded.{column}' for column in list(counts) + ['saves_count'])
+    )
+    with engine.connect() as conn:
+        last_id = conn.execute(text('SELECT coalesce(max(id), 0) FROM job')).scalar()
+    for first in range(0, last_id, batch_size):
+        with engine.begin() as conn:
+            conn.execute(statement, {'first': first, 'last': first + batch_size})
+    return last_id
+
+
+def rebuild_company_ratings(engine, batch_size=1000):
+    """Recompute review counts, rating sums and star histograms in batches of companies."""
+    reviews = 'SELECT {} FROM company_review r WHERE r.company_id = company.id{}'
+    columns = {'review_count': reviews.format('count(*)', ''),
+               'rating_sum': reviews.format('coalesce(sum(r.rating), 0)', '')}
+    columns.update({f'rating_{stars}': reviews.format('count(*)', f' AND r.rating = {stars}') for stars in range(1, 6)})
+    statement = text(
+        'UPDATE company SET ' + ', '.join(f'{column} = ({select})' for column, select in columns.items())
+        + ' WHERE id > :first AND id <= :last'
+    )
+    with engine.connect() as conn:
+        last_id = conn.execute(text('SELECT coalesce(max(id), 0) FROM company')).scalar()
+    for first in range(0, last_id, batch_size):
+        with engine.begin() as conn:
+            conn.execute(statement, {'first': first, 'last': first + batch_size})
+    return last_id
+
+
+def rebuild_skills(engine, vocabulary, batch_size=1000):
+    """Match every job and profile against the current vocabulary, in batches.
+
+    Rows whose fingerprint is unchanged are skipped, so after a vocabulary
+    change only the affected jobs and profiles are rewritten. Returns
+    (jobs changed, profiles changed).
+    """
+    with engine.connect() as conn:
+        last_id = conn.execute(text('SELECT coalesce(max(id), 0) FROM job')).scalar()
+        user_ids = [user_id for user_id, in conn.execute(text('SELECT user_id FROM user_profile ORDER BY user_id'))]
+    jobs = profiles = 0
+    for first in range(0, last_id, batch_size):
+        with engine.begin() as conn:
+            changed = vocabulary.sync_jobs(conn, list(range(first + 1, first + batch_size + 1)))
+        jobs += len(changed)
+    for start in range(0, len(user_ids), batch_size):
+        with engine.begin() as conn:
+            profiles += sum(vocabulary.sync_profile(conn, user_id) for user_id in user_ids[start:start + batch_size])
+    return jobs, profiles
+
+
+def explain(engine, queries, slow_ms=50):
+    """Run EXPLAIN QUERY PLAN and a timed execution for each named statement.
+
+    Returns one dict per query with its plan and any problems found: full
+    table scans, temporary sort b-trees and executions slower than `slow_ms`.
+    """
+    report = []
+    with engine.connect() as conn:
+        for name, statement in queries.items():
+            compiled = statement.compile(dialect=engine.dialect, compile_kwargs={'render_postcompile': True})
+            params = compiled.construct_params()
+            parameters = tuple(params[key] for key in compiled.positiontup) if compiled.positiontup else params
+            plan = [row[3] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', parameters)]
+
+            started = time.perf_counter()
+            conn.execute(statement).fetchall()
+            elapsed = (time.perf_counter() - started) * 1000
+
+            problems = []
+            for detail in plan:
+                if detail.startswith('SCAN ') and ' USING ' not in detail and 'VIRTUAL TABLE' not in detail:
+                    problems.append(f'full scan: {detail}')
+                if 'USE TEMP B-TREE' in detail:
+                    problems.append(f'temp sort: {detail}')
+            if elapsed > slow_ms:
+                problems.append(f'slow: {elapsed:.1f} ms')
+            report.append({'name': name, 'plan': plan, 'ms': elapsed, 'problems': problems})
+    return report
+
+
+@revision('0001', 'baseline schema')
+def baseline(migrator):
+    # Creates tables that do not exist yet, with every index declared on them
+    migrator.metadata.create_all(migrator.engine)
+
+
+@revision('0002', 'job requirements, benefits and activity columns')
+def job_details(migrator):
+    migrator.add_columns('job', (
+        ('requirements', 'TEXT'),
+        ('benefits', 'TEXT'),
+        ('is_active', 'BOOLEAN DEFAULT 1'),
+        ('updated_at', 'DATETIME DEFAULT CURRENT_TIMESTAMP'),
+    ))
+
+
+@revision('0003', 'keyset pagination indexes')
+def pagination_indexes(migrator):
+    migrator.create_index('ix_job_created_at_id')
+    migrator.create_index('ix_job_updated_at')
+    migrator.create_index('ix_job_application_applied_at_id')
+
+
+@revision('0004', 'structured salary columns')
+def structured_salary(migrator):
+    migrator.add_columns('job', (
+        ('salary_min', 'INTEGER'),
+        ('salary_max', 'INTEGER'),
+        ('salary_currency', 'VARCHAR(3)'),
+        ('salary_period', 'VARCHAR(10)'),
+    ))
+    parsed = 0
+    for first, last in migrator.batches('job', 'salary_min IS NULL AND salary IS NOT NULL'):
+        with migrator.engine.begin() as conn:
+            rows = conn.execute(text(
+                'SELECT id, salary FROM job WHERE id BETWEEN :first AND :last AND salary_min IS NULL'
+            ), {'first': first, 'last': last}).fetchall()
+            params = []
+            for job_id, salary in rows:
+                salary_min, salary_max, currency, period = parse_salary(salary)
+                if salary_min is not None:
+                    params.append({'id': job_id, 'min': salary_min, 'max': salary_max,
+                                   'currency': currency, 'period': period})
+            if params:
+                conn.execute(text(
+                    'UPDATE job SET salary_min = :min, salary_max = :max, '
+                    'salary_currency = :currency, salary_period = :period WHERE id = :id'
+                ), params)
+        parsed += len(params)
+    migrator.log(f'  parsed {parsed} salaries')
+    migrator.create_index('ix_job_salary_range')
+
+
+@revision('0005', 'messages keyed by conversation')
+def message_conversations(migrator):
+    migrator.add_columns('message', (('conversation_id', 'INTEGER REFERENCES conversation (id)'),))
+
+    # Swap participants into (min, max) order, merging duplicate pairs
+    with migrator.engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TEMP TABLE conversation_keep AS '
+            'SELECT min(user1_id, user2_id) AS lo, max(user1_id, user2_id) AS hi, '
+            'min(id) AS id, max(last_message_at) AS last_message_at '
+            'FROM conversation GROUP BY lo, hi'
+        ))
+        conn.execute(text('DELETE FROM conversation WHERE id NOT IN (SELECT id FROM conversation_keep)'))
+        conn.execute(text(
+            'UPDATE conversation SET '
+            'user1_id = (SELECT lo FROM conversation_keep k WHERE k.id = conversation.id), '
+            'user2_id = (SELECT hi FROM conversation_keep k WHERE k.id = conversation.id), '
+            'last_message_at = (SELECT last_message_at FROM conversation_keep k WHERE k.id = conversation.id)'
+        ))
+        conn.execute(text('DROP TABLE conversation_keep'))
+        conn.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS uq_conversation_users ON conversation (user1_id, user2_id)'))
+        conn.execute(text(
+            'INSERT OR IGNORE INTO conversation (user1_id, user2_id, last_message_at, created_at) '
+            'SELECT min(sender_id, receiver_id), max(sender_id, receiver_id), max(sent_at), min(sent_at) '
+            'FROM message GROUP BY min(sender_id, receiver_id), max(sender_id, receiver_id)'
+        ))
+
+    for first, last in migrator.batches('message', 'conversation_id IS NULL'):
+        with migrator.engine.begin() as conn:
+            conn.execute(text(
+                'UPDATE message SET conversation_id = ('
+                '  SELECT c.id FROM conversation c'
+                '  WHERE c.user1_id = min(message.sender_id, message.receiver_id)'
+                '  AND c.user2_id = max(message.sender_id, message.receiver_id)'
+                ') WHERE id BETWEEN :first AND :last AND conversation_id IS NULL'
+            ), {'first': first, 'last': last})
+    migrator.create_index('ix_message_conversation_sent_at')
+
+
+@revision('0006', 'inbox unread counters and previews')
+def inbox_counters(migrator):
+    migrator.add_columns('conversation', (
+        ('user1_unread', 'INTEGER NOT NULL DEFAULT 0'),
+        ('user2_unread', 'INTEGER NOT NULL DEFAULT 0'),
+        ('last_message_preview', 'VARCHAR(120)'),
+        ('last_sender_id', 'INTEGER REFERENCES user (id)'),
+    ))
+    migrator.create_index('ix_message_receiver_is_read')
+    migrator.create_index('ix_conversation_user2_id')
+    rebuild_conversation_counters(migrator.engine, migrator.batch_size)
+
+
+@revision('0007', 'unique and composite indexes for hot lookups')
+def lookup_indexes(migrator):
+    migrator.delete_duplicates('job_application', ('job_id', 'applicant_id'))
+    migrator.create_index('uq_job_application_job_applicant')
+    migrator.delete_duplicates('saved_job', ('user_id', 'job_id'))
+    migrator.create_index('uq_saved_job_user_job')
+    migrator.delete_duplicates('company_review', ('company_id', 'user_id'))
+    migrator.create_index('uq_company_review_company_user')
+    migrator.create_index('ix_job_posted_by_created_at')
+    migrator.create_index('ix_job_application_applicant_applied_at')
+    migrator.create_index('ix_user_profile_user_id')
+
+
+@revision('0008', 'per-job counters')
+def job_counters(migrator):
+    rebuild_job_stats(migrator.engine, migrator.batch_size)
+
+
+@revision('0009', 'full-text search index')
+def search_index(migrator):
+    if migrator.search_index is not None:
+        migrator.search_index.create()
+
+
+@revision('0010', 'job content hashes for feed de-duplication')
+def job_content_hash(migrator):
+    migrator.add_columns('job', (('content_hash', 'VARCHAR(64)'),))
+    for first, last in migrator.batches('job', 'content_hash IS NULL'):
+        with migrator.engine.begin() as conn:
+            rows = conn.execute(text(
+                'SELECT id, title, company, location, type, description FROM job '
+                'WHERE id BETWEEN :first AND :last AND content_hash IS NULL'
+            ), {'first': first, 'last': last}).mappings().all()
+            conn.execute(text('UPDATE job SET content_hash = :hash WHERE id = :id'),
+                         [{'id': row['id'], 'hash': content_hash(row)} for row in rows])
+    # Later copies of the same posting keep their rows but not the hash
+    with migrator.engine.begin() as conn:
+        conn.execute(text(
+            'UPDATE job SET content_hash = NULL WHERE content_hash IS NOT NULL AND id NOT IN '
+            '(SELECT min(id) FROM job WHERE content_hash IS NOT NULL GROUP BY content_hash)'
+        ))
+    migrator.create_index('uq_job_content_hash')
+
+
+@revision('0011', 'content-addressed resume uploads')
+def resume_uploads(migrator):
+    # Files saved before this keep resume_filename only and are not reprocessed
+    migrator.add_columns('user_profile', (
+        ('resume_key', 'VARCHAR(100)'),
+        ('resume_size', 'INTEGER'),
+        ('resume_status', 'VARCHAR(20)'),
+        ('resume_text', 'TEXT'),
+    ))
+
+
+@revision('0012', 'skills vocabulary and extracted job and profile skills')
+def skills_vocabulary(migrator):
+    migrator.create_tables(('skill', 'skill_alias', 'user_skill', 'job_skill'))
+    migrator.add_columns('job', (('skills_hash', 'VARCHAR(40)'),))
+    migrator.add_columns('user_profile', (('skills_hash', 'VARCHAR(40)'),))
+    vocabulary = SkillVocabulary()
+    with migrator.engine.begin() as conn:
+        if not conn.execute(text('SELECT count(*) FROM skill')).scalar():
+            vocabulary.seed(conn)
+    jobs, profiles = rebuild_skills(migrator.engine, vocabulary, migrator.batch_size)
+    migrator.log(f'  matched skills for {jobs} jobs and {profiles} profiles')
+
+
+@revision('0013', 'background task queue')
+def task_queue(migrator):
+    migrator.create_tables(('task',))
+
+
+@revision('0014', 'company rating aggregates')
+def company_ratings(migrator):
+    migrator.add_columns('company', [(column, 'INTEGER NOT NULL DEFAULT 0') for column in (
+        'review_count', 'rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5')])
+    migrator.create_index('ix_company_review_company_created_at')
+    rebuild_company_ratings(migrator.engine, migrator.batch_size)
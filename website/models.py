@@ -0,0 +1,375 @@
+"""Database models and the events that keep derived data in sync with them.
+
+Job and profile writes update the search index and queue skill matching;
+realtime events, queued tasks and page cache purges collected during a
+transaction are only acted on once it commits.
+"""
+from flask import current_app, url_for
+from salary import parse_salary
+from migrations import Migrator
+from extensions import db, job_search, page_cache, password_hasher, skill_vocabulary, task_queue
+
+# User Model
+class User(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    # scrypt hashes are longer than 128 characters
+    password_hash = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    # Both run on password_hasher's pool and may raise PasswordHasherBusy
+    def set_password(self, password):
+        self.password_hash = password_hasher.hash(password)
+
+    def check_password(self, password):
+        return password_hasher.verify(self.password_hash, password)
+
+# User Profile Model
+class UserProfile(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    phone = db.Column(db.String(20))
+    bio = db.Column(db.Text)
+    skills = db.Column(db.Text)  # Comma-separated skills
+    experience_years = db.Column(db.Integer, default=0)
+    resume_filename = db.Column(db.String(255))  # Name shown to the user
+    # Content-addressed key in upload_storage; several profiles may share one
+    resume_key = db.Column(db.String(100))
+    resume_size = db.Column(db.Integer)
+    resume_status = db.Column(db.String(20))  # pending, processed, rejected or failed
+    resume_text = db.Column(db.Text)
+    # skills.fingerprint() of skills and resume_text when user_skill was last built
+    skills_hash = db.Column(db.String(40))
+    linkedin_url = db.Column(db.String(255))
+    portfolio_url = db.Column(db.String(255))
+    location = db.Column(db.String(100))
+    current_position = db.Column(db.String(100))
+    education = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    user = db.relationship('User', backref=db.backref('profile', uselist=False))
+
+    __table_args__ = (db.Index('ix_user_profile_user_id', 'user_id'),)
+
+# Job Model
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(100), nullable=False)
+    company = db.Column(db.String(100), nullable=False)
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=True)
+    location = db.Column(db.String(100), nullable=False)
+    salary = db.Column(db.String(50), nullable=False)
+    # Parsed from `salary` on write; amounts are annualized for range filters
+    salary_min = db.Column(db.Integer)
+    salary_max = db.Column(db.Integer)
+    salary_currency = db.Column(db.String(3))
+    salary_period = db.Column(db.String(10))  # hour, month, year
+    type = db.Column(db.String(50), nullable=False)  # full-time, part-time, etc.
+    description = db.Column(db.Text, nullable=False)
+    requirements = db.Column(db.Text)
+    benefits = db.Column(db.Text)
+    posted_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    is_active = db.Column(db.Boolean, default=True)
+    # Fingerprint of the posting, see ingest.content_hash(); feeds skip jobs already imported
+    content_hash = db.Column(db.String(64))
+    # skills.fingerprint() of the text job_skill was last built from
+    skills_hash = db.Column(db.String(40))
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    # Backs keyset pagination of the newest-first job listing and the
+    # incremental refresh of the recommendation index
+    __table_args__ = (
+        db.Index('ix_job_created_at_id', 'created_at', 'id'),
+        db.Index('ix_job_updated_at', 'updated_at'),
+        db.Index('ix_job_salary_range', 'salary_min', 'salary_max'),
+        db.Index('ix_job_posted_by_created_at', 'posted_by', 'created_at'),
+        db.Index('uq_job_content_hash', 'content_hash', unique=True),
+    )
+
+    def set_salary(self, salary):
+        self.salary = salary
+        self.salary_min, self.salary_max, self.salary_currency, self.salary_period = parse_salary(salary)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'company': self.company,
+            'location': self.location,
+            'salary': self.salary,
+            'salary_min': self.salary_min,
+            'salary_max': self.salary_max,
+            'type': self.type,
+            'created_at': self.created_at.strftime('%d %b %Y') if self.created_at else None,
+            'url': url_for('jobs.job_details', job_id=self.id),
+        }
+
+# Job Application Model
+class JobApplication(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id'), nullable=False)
+    applicant_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    status = db.Column(db.String(20), default='pending')  # pending, reviewed, accepted, rejected
+    cover_letter = db.Column(db.Text)
+    applied_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    job = db.relationship('Job', backref=db.backref('applications', lazy=True))
+    applicant = db.relationship('User', backref=db.backref('applications', lazy=True))
+
+    # Backs keyset pagination of the employer dashboard's application list
+    __table_args__ = (
+        db.Index('ix_job_application_applied_at_id', 'applied_at', 'id'),
+        db.Index('uq_job_application_job_applicant', 'job_id', 'applicant_id', unique=True),
+        db.Index('ix_job_application_applicant_applied_at', 'applicant_id', 'applied_at'),
+    )
+
+APPLICATION_STATUSES = ('pending', 'reviewed', 'accepted', 'rejected')
+
+# Per-job counters, kept up to date on apply, status change, save and view so
+# the employer dashboard never has to count application rows
+class JobStats(db.Model):
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id'), primary_key=True)
+    applications_count = db.Column(db.Integer, nullable=False, default=0)
+    pending_count = db.Column(db.Integer, nullable=False, default=0)
+    reviewed_count = db.Column(db.Integer, nullable=False, default=0)
+    accepted_count = db.Column(db.Integer, nullable=False, default=0)
+    rejected_count = db.Column(db.Integer, nullable=False, default=0)
+    saves_count = db.Column(db.Integer, nullable=False, default=0)
+    views_count = db.Column(db.Integer, nullable=False, default=0)
+
+    job = db.relationship('Job', backref=db.backref('stats', uselist=False, lazy=True))
+
+# Saved Job Model
+class SavedJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id'), nullable=False)
+    saved_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    user = db.relationship('User', backref=db.backref('saved_jobs', lazy=True))
+    job = db.relationship('Job', backref=db.backref('saved_by', lazy=True))
+
+    __table_args__ = (db.Index('uq_saved_job_user_job', 'user_id', 'job_id', unique=True),)
+
+# Message Model for communication system
+class Message(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    receiver_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'))
+    subject = db.Column(db.String(200), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    sent_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    is_read = db.Column(db.Boolean, default=False)
+
+    sender = db.relationship('User', foreign_keys=[sender_id], backref=db.backref('sent_messages', lazy=True))
+    receiver = db.relationship('User', foreign_keys=[receiver_id], backref=db.backref('received_messages', lazy=True))
+
+    # Thread reads seek the latest messages of one conversation
+    __table_args__ = (
+        db.Index('ix_message_conversation_sent_at', 'conversation_id', 'sent_at', 'id'),
+        db.Index('ix_message_receiver_is_read', 'receiver_id', 'is_read'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'sender_id': self.sender_id,
+            'subject': self.subject,
+            'content': self.content,
+            'sent_at': self.sent_at.strftime('%Y-%m-%d %H:%M') if self.sent_at else None,
+        }
+
+# Conversation Model to group messages between users. Participants are
+# stored canonically with user1_id <= user2_id, one row per pair.
+class Conversation(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user1_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user2_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    last_message_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    # Denormalized inbox state, maintained by post_message() and mark_conversation_read()
+    user1_unread = db.Column(db.Integer, nullable=False, default=0)
+    user2_unread = db.Column(db.Integer, nullable=False, default=0)
+    last_message_preview = db.Column(db.String(120))
+    last_sender_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+
+    user1 = db.relationship('User', foreign_keys=[user1_id], backref=db.backref('conversations_as_user1', lazy=True))
+    user2 = db.relationship('User', foreign_keys=[user2_id], backref=db.backref('conversations_as_user2', lazy=True))
+
+    __table_args__ = (
+        db.UniqueConstraint('user1_id', 'user2_id', name='uq_conversation_users'),
+        db.Index('ix_conversation_user2_id', 'user2_id'),
+    )
+
+    def unread_column(self, user_id):
+        return Conversation.user1_unread if user_id == self.user1_id else Conversation.user2_unread
+
+    def unread_for(self, user_id):
+        return self.user1_unread if user_id == self.user1_id else self.user2_unread
+
+# Company Model
+class Company(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+    description = db.Column(db.Text)
+    logo_filename = db.Column(db.String(255))
+    website = db.Column(db.String(255))
+    location = db.Column(db.String(100))
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    # Rating aggregates, bumped in SQL with each new review so the company
+    # page never reads all reviews; `flask rebuild-company-ratings` recomputes them
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_1 = db.Column(db.Integer, nullable=False, default=0)
+    rating_2 = db.Column(db.Integer, nullable=False, default=0)
+    rating_3 = db.Column(db.Integer, nullable=False, default=0)
+    rating_4 = db.Column(db.Integer, nullable=False, default=0)
+    rating_5 = db.Column(db.Integer, nullable=False, default=0)
+
+    creator = db.relationship('User', backref=db.backref('companies', lazy=True))
+    jobs = db.relationship('Job', backref='company_rel', lazy=True)
+    reviews = db.relationship('CompanyReview', backref='company', lazy=True)
+
+    @property
+    def avg_rating(self):
+        return self.rating_sum / self.review_count if self.review_count else 0
+
+    @property
+    def rating_histogram(self):
+        """(stars, reviews) pairs from 5 stars down to 1."""
+        return [(stars, getattr(self, f'rating_{stars}')) for stars in RATINGS[::-1]]
+
+RATINGS = (1, 2, 3, 4, 5)
+
+# Company Review Model
+class CompanyReview(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
+    rating = db.Column(db.Integer, nullable=False)  # 1-5 stars
+    review_text = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    user = db.relationship('User', backref=db.backref('company_reviews', lazy=True))
+
+    # One review per user and company; newest-first pages of a company's reviews
+    __table_args__ = (
+        db.Index('uq_company_review_company_user', 'company_id', 'user_id', unique=True),
+        db.Index('ix_company_review_company_created_at', 'company_id', 'created_at', 'id'),
+    )
+
+# Skills vocabulary, see skills.py; skill_alias maps every spelling of a
+# skill to its id
+class Skill(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+
+class SkillAlias(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    alias = db.Column(db.String(100), nullable=False, unique=True)
+    skill_id = db.Column(db.Integer, db.ForeignKey('skill.id'), nullable=False)
+    exact = db.Column(db.Boolean, nullable=False, default=False)  # only matched in skill lists
+
+    skill = db.relationship('Skill', backref=db.backref('aliases', lazy=True))
+
+# Skill ids extracted from profiles (source 'profile' or 'resume') and jobs
+class UserSkill(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    skill_id = db.Column(db.Integer, db.ForeignKey('skill.id'), primary_key=True)
+    source = db.Column(db.String(10), primary_key=True)
+
+class JobSkill(db.Model):
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id'), primary_key=True)
+    skill_id = db.Column(db.Integer, db.ForeignKey('skill.id'), primary_key=True)
+
+    __table_args__ = (db.Index('ix_job_skill_skill_id', 'skill_id', 'job_id'),)
+
+# Background task queue, see tasks.py; times are Unix timestamps
+class Task(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    args = db.Column(db.Text, nullable=False)  # JSON keyword arguments
+    idempotency_key = db.Column(db.String(200))
+    status = db.Column(db.String(10), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False)
+    run_at = db.Column(db.Float, nullable=False)
+    locked_until = db.Column(db.Float)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.Float, nullable=False)
+    started_at = db.Column(db.Float)
+    finished_at = db.Column(db.Float)
+
+    __table_args__ = (
+        db.Index('ix_task_status_run_at', 'status', 'run_at'),
+        db.Index('uq_task_idempotency_key', 'idempotency_key', unique=True),
+    )
+
+def enqueue_task(name, key=None, connection=None, **kwargs):
+    """Queue a background task in the current transaction; workers are woken on commit."""
+    task_queue.enqueue(connection or db.session.connection(), name, key=key, **kwargs)
+    db.session.info['tasks_enqueued'] = True
+
+# Keep the full-text index in sync with job inserts, edits and deactivation;
+# job skills are matched in the background when new or when the text changes
+@db.event.listens_for(Job, 'after_insert')
+@db.event.listens_for(Job, 'after_update')
+def sync_job_search(mapper, connection, target):
+    job_search.sync(connection, target)
+    db.session.info['pages_stale'] = True
+    state = db.inspect(target)
+    if state.attrs.skills_hash.value is None or any(
+            state.attrs[name].history.has_changes() for name in ('title', 'description', 'requirements')):
+        enqueue_task('match_job_skills', connection=connection, job_ids=[target.id])
+
+@db.event.listens_for(Job, 'after_delete')
+def remove_job_search(mapper, connection, target):
+    db.session.info['pages_stale'] = True
+    job_search.remove(connection, target.id)
+    connection.execute(JobSkill.__table__.delete().where(JobSkill.job_id == target.id))
+
+# Rebuilds user_skill when the skills field changes; a no-op for other edits
+@db.event.listens_for(UserProfile, 'after_insert')
+@db.event.listens_for(UserProfile, 'after_update')
+def sync_profile_skills(mapper, connection, target):
+    skill_vocabulary.sync_profile(connection, target.user_id)
+
+# Realtime events, queued tasks and stale pages are acted on only after commit
+def notify_user(user_id, event):
+    """Queue a realtime event for `user_id`; it is published once the session commits."""
+    db.session.info.setdefault('pending_events', []).append((f'user:{user_id}', event))
+
+@db.event.listens_for(db.session, 'after_commit')
+def publish_pending_events(session):
+    events = session.info.pop('pending_events', [])
+    if events:
+        broker = current_app.extensions['message_broker']
+        for channel, event in events:
+            broker.publish(channel, event)
+
+@db.event.listens_for(db.session, 'after_soft_rollback')
+def discard_pending_events(session, previous_transaction):
+    session.info.pop('pending_events', None)
+    session.info.pop('tasks_enqueued', None)
+    session.info.pop('pages_stale', None)
+
+@db.event.listens_for(db.session, 'after_commit')
+def wake_task_workers(session):
+    if session.info.pop('tasks_enqueued', False):
+        task_queue.notify()
+
+@db.event.listens_for(db.session, 'after_commit')
+def purge_page_cache(session):
+    if session.info.pop('pages_stale', False):
+        page_cache.purge()
+
+# Schema changes are applied by migrations.py, never at import time
+def upgrade_database(**options):
+    """Apply pending migrations; returns the versions that ran."""
+    return Migrator(db.engine, db.metadata, search_index=job_search, **options).upgrade()
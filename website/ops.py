@@ -0,0 +1,75 @@
+"""Operational endpoints: cache and queue stats and Prometheus metrics.
+
+They are served only to admins (ADMIN_EMAILS) and to requests carrying
+`Authorization: Bearer <OPS_TOKEN>`, such as a Prometheus scraper.
+"""
+from flask import Blueprint, Response, current_app, request, session, jsonify, abort
+from functools import wraps
+from extensions import db, page_cache, password_hasher, recommendation_cache, request_metrics, task_queue
+from models import User
+import hmac
+
+bp = Blueprint('ops', __name__)
+
+def ops_only(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not (has_ops_token() or is_admin_request()):
+            abort(404)
+        return view(*args, **kwargs)
+    return wrapper
+
+@bp.route('/api/cache-stats')
+@ops_only
+def cache_stats():
+    return jsonify({'recommendations': recommendation_cache.stats(), 'pages': page_cache.stats()})
+
+@bp.route('/api/queue-stats')
+@ops_only
+def queue_stats():
+    """Task queue depth and run times, password hashing load, and request latency per endpoint, for sizing workers."""
+    return jsonify({'tasks': task_queue.stats(), 'password_hashing': password_hasher.stats(),
+                    'requests': request_metrics.stats()})
+
+@bp.route('/metrics')
+@ops_only
+def metrics():
+    if not current_app.config['METRICS_ENABLED']:
+        abort(404)
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@request_metrics.collector
+def cache_and_queue_metrics():
+    caches = {'recommendations': recommendation_cache.stats(), 'pages': page_cache.stats()}
+    yield ('cache_hits_total', 'counter', 'Cache hits.',
+           [({'cache': name}, stats['hits']) for name, stats in caches.items()])
+    yield ('cache_misses_total', 'counter', 'Cache misses.',
+           [({'cache': name}, stats['misses']) for name, stats in caches.items()])
+    yield ('cache_hit_ratio', 'gauge', 'Cache hits over lookups.',
+           [({'cache': name}, round(stats['hit_rate'], 4)) for name, stats in caches.items()])
+    tasks = task_queue.stats()
+    yield ('tasks', 'gauge', 'Background tasks by status.',
+           [({'status': status}, count) for status, count in tasks['depth'].items()])
+    yield ('task_lag_seconds', 'gauge', 'Age of the oldest due task.', [({}, tasks['oldest_due_seconds'])])
+    yield ('task_runs_total', 'counter', 'Background task runs by outcome.',
+           [({'task': name, 'outcome': outcome}, counts[outcome])
+            for name, counts in tasks['tasks'].items() for outcome in ('done', 'retried', 'failed')])
+    hashing = password_hasher.stats()
+    yield ('password_hashes_total', 'counter', 'Password hashes computed or checked.',
+           [({'operation': operation}, hashing[operation]) for operation in ('hashed', 'verified')])
+    yield ('password_hashes_shed_total', 'counter', 'Password hashes refused with a 503.',
+           [({'reason': reason}, hashing[reason]) for reason in ('rejected', 'timed_out')])
+    yield ('password_hash_seconds_total', 'counter', 'Time spent hashing passwords.',
+           [({}, round(hashing['seconds'], 6))])
+    yield ('password_hashes_in_flight', 'gauge', 'Password hashes running now.', [({}, hashing['in_flight'])])
+
+def has_ops_token():
+    token = current_app.config['OPS_TOKEN']
+    return bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+@request_metrics.profile_allowed
+def is_admin_request():
+    if 'user_id' not in session or not current_app.config['ADMIN_EMAILS']:
+        return False
+    user = db.session.get(User, session['user_id'])
+    return user is not None and user.email.lower() in current_app.config['ADMIN_EMAILS']
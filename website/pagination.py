@@ -0,0 +1,100 @@
+import base64
+import json
+
+from sqlalchemy import and_, or_, tuple_, type_coerce, String, DateTime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row on a page as an opaque URL-safe token."""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+    if not isinstance(payload, list):
+        raise InvalidCursor('cursor must be a list')
+    return payload
+
+
+def _key(expr):
+    # SQLite stores DateTime as text, and rows written by CURRENT_TIMESTAMP
+    # have no fractional part. Compare the stored text so a cursor value
+    # round-trips exactly instead of being re-rendered with microseconds.
+    if isinstance(expr.type, DateTime):
+        return type_coerce(expr, String)
+    return expr
+
+
+def _after(keys, values):
+    """WHERE clause selecting rows strictly after `values` in `keys` order."""
+    directions = {descending for _, descending in keys}
+    if len(directions) == 1:
+        # A row-value comparison lets SQLite seek straight into the index
+        row = tuple_(*[expr for expr, _ in keys])
+        return row < tuple_(*values) if directions.pop() else row > tuple_(*values)
+    clauses = []
+    for i, (expr, descending) in enumerate(keys):
+        equal = [k == v for (k, _), v in zip(keys[:i], values[:i])]
+        step = expr < values[i] if descending else expr > values[i]
+        clauses.append(and_(*equal, step))
+    return or_(*clauses)
+
+
+class Page:
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_more(self):
+        return self.next_cursor is not None
+
+
+def keyset_page(query, order, cursor=None, per_page=20):
+    """Fetch one page of `query` using keyset (seek) pagination.
+
+    `order` is a list of (expression, descending) pairs and must end with a
+    unique column so the order is total. `cursor` is a token returned as
+    `Page.next_cursor` by the previous call. Each page costs one indexed
+    range scan of per_page + 1 rows no matter how deep it is.
+    """
+    return page_from_rows(keyset_query(query, order, cursor, per_page).all(), per_page)
+
+
+def keyset_query(query, order, cursor=None, per_page=20):
+    """The query keyset_page() runs, for callers that execute it themselves.
+
+    Works on a legacy Query or a select(); pass the rows it returns to
+    page_from_rows() with the same per_page.
+    """
+    keys = [(_key(expr), descending) for expr, descending in order]
+    values = decode_cursor(cursor)
+    if values is not None:
+        if len(values) != len(keys):
+            raise InvalidCursor('cursor does not match sort order')
+        query = query.filter(_after(keys, values))
+
+    labels = [expr.label(f'_k{i}') for i, (expr, _) in enumerate(keys)]
+    query = query.add_columns(*labels).order_by(
+        *[expr.desc() if descending else expr.asc() for expr, descending in keys]
+    )
+    return query.limit(per_page + 1)
+
+
+def page_from_rows(rows, per_page):
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(list(rows[-1][1:]))
+    return Page([row[0] for row in rows], next_cursor)
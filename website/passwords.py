@@ -0,0 +1,108 @@
+"""Password hashing on a bounded pool of threads.
+
+Hashing is deliberately slow. Run inline, a burst of logins keeps every
+request thread of a worker busy hashing and everything else on it
+waits. With PASSWORD_HASH_WORKERS set, hashes run on that many threads
+(hashlib's scrypt and pbkdf2 release the GIL, so they use other cores
+while request threads keep serving) and at most PASSWORD_HASH_MAX_PENDING
+more may wait for one. Beyond that PasswordHasherBusy is raised straight
+away, which the views turn into a 503, rather than queueing without
+limit.
+
+Hashes record the method they were made with, so needs_rehash() tells
+when a stored hash predates the configured PASSWORD_HASH_METHOD and
+should be replaced on the next successful login.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    """Every hashing thread is busy and the queue is full."""
+
+
+def normalize_method(method):
+    """Spell out werkzeug's defaults, so the method equals the prefix of the hashes it makes."""
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        return 'scrypt:32768:8:1'
+    if name == 'pbkdf2' and len(args) < 2:
+        return f"pbkdf2:{args[0] if args else 'sha256'}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+
+class PasswordHasher:
+    def __init__(self, method='scrypt', workers=0, max_pending=0, timeout=None):
+        self.lock = threading.Lock()
+        self.configure(method, workers, max_pending, timeout)
+
+    def configure(self, method, workers, max_pending, timeout=None):
+        self.method = normalize_method(method)
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        # Hashes running or waiting; acquired without blocking
+        self.slots = threading.BoundedSemaphore(workers + max_pending) if workers else None
+        self.executor = None
+        self.counters = {'hashed': 0, 'verified': 0, 'rejected': 0, 'timed_out': 0, 'in_flight': 0,
+                         'seconds': 0.0}
+
+    def hash(self, password):
+        return self.run('hashed', generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self.run('verified', check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        return pwhash.split('$', 1)[0] != self.method
+
+    def run(self, counter, func, *args):
+        if not self.workers:
+            return self.timed(counter, func, *args)
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.counters['rejected'] += 1
+            raise PasswordHasherBusy()
+        try:
+            future = self.pool().submit(self.timed, counter, func, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        # Released when the hash finishes, even if the caller stopped waiting for it
+        future.add_done_callback(lambda future: self.slots.release())
+        try:
+            return future.result(self.timeout)
+        except FutureTimeout:
+            with self.lock:
+                self.counters['timed_out'] += 1
+            raise PasswordHasherBusy() from None
+
+    def timed(self, counter, func, *args):
+        with self.lock:
+            self.counters['in_flight'] += 1
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            with self.lock:
+                self.counters['in_flight'] -= 1
+                self.counters[counter] += 1
+                self.counters['seconds'] += time.perf_counter() - started
+
+    def pool(self):
+        # Started on first use, so a preloading master forks before it has threads
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hash')
+            return self.executor
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, method=self.method, workers=self.workers, max_pending=self.max_pending)
+
+    def after_fork(self):
+        # The parent's threads do not exist in the child
+        self.configure(self.method, self.workers, self.max_pending, self.timeout)
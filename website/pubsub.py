@@ -0,0 +1,197 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+
+class BrokerFull(Exception):
+    """Raised by subscribe() when this process already has max_subscribers."""
+
+
+class Subscription:
+    """A bounded queue of events for one listener.
+
+    A client that stops reading only loses its own oldest events instead of
+    growing memory without limit.
+    """
+
+    def __init__(self, broker, channels, max_pending=100):
+        self.broker = broker
+        self.channels = channels
+        self.queue = queue.Queue(max_pending)
+        self.closed = False
+
+    def put(self, event):
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Next event, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self):
+        events = []
+        while True:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class InProcessBroker:
+    """Fan events out to subscribers in this process only.
+
+    Each subscriber holds a request thread while it waits, so at most
+    `max_subscribers` are open per process; past that subscribe() raises
+    BrokerFull instead of letting them take every thread.
+    """
+
+    def __init__(self, max_subscribers=None):
+        self.max_subscribers = max_subscribers
+        self.lock = threading.Lock()
+        self.subscribers = {}
+        self.open = 0
+
+    def subscribe(self, *channels):
+        subscription = Subscription(self, channels)
+        with self.lock:
+            if self.max_subscribers is not None and self.open >= self.max_subscribers:
+                raise BrokerFull()
+            self.open += 1
+            for channel in channels:
+                self.subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            if subscription.closed:
+                return
+            subscription.closed = True
+            self.open -= 1
+            for channel in subscription.channels:
+                listeners = self.subscribers.get(channel)
+                if listeners is not None:
+                    listeners.discard(subscription)
+                    if not listeners:
+                        del self.subscribers[channel]
+
+    def publish(self, channel, event):
+        self._deliver(channel, event)
+
+    def _deliver(self, channel, event):
+        with self.lock:
+            listeners = list(self.subscribers.get(channel, ()))
+        for subscription in listeners:
+            subscription.put(event)
+
+    def after_fork(self):
+        # Subscribers belong to the parent's requests
+        self.lock = threading.Lock()
+        self.subscribers = {}
+        self.open = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'channels': len(self.subscribers),
+                'subscriptions': self.open,
+                'max_subscriptions': self.max_subscribers,
+            }
+
+
+class SQLiteBroker(InProcessBroker):
+    """Events relayed through a SQLite file so every worker on a host sees them.
+
+    Publishing appends a row; one thread per process tails the table every
+    `poll_interval` seconds and hands new rows to local subscribers. Rows
+    older than `retention` seconds are pruned as the tail moves on.
+    """
+
+    def __init__(self, path, poll_interval=0.1, retention=60, max_subscribers=None):
+        super().__init__(max_subscribers)
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.local = threading.local()
+        self.poller = None
+        with self._conn() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS events ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, '
+                'payload TEXT NOT NULL, created_at REAL NOT NULL)'
+            )
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def after_fork(self):
+        # The tail thread and SQLite connections do not survive a fork
+        super().after_fork()
+        self.local = threading.local()
+        self.poller = None
+
+    def subscribe(self, *channels):
+        subscription = super().subscribe(*channels)
+        with self.lock:
+            if self.poller is None:
+                self.poller = threading.Thread(target=self._tail, name='sqlite-broker', daemon=True)
+                self.poller.start()
+        return subscription
+
+    def publish(self, channel, event):
+        self._conn().execute(
+            'INSERT INTO events (channel, payload, created_at) VALUES (?, ?, ?)',
+            (channel, json.dumps(event), time.time())
+        )
+
+    def _tail(self):
+        conn = self._conn()
+        last_id = conn.execute('SELECT coalesce(max(id), 0) FROM events').fetchone()[0]
+        last_prune = time.time()
+        while True:
+            rows = conn.execute(
+                'SELECT id, channel, payload FROM events WHERE id > ? ORDER BY id', (last_id,)
+            ).fetchall()
+            for event_id, channel, payload in rows:
+                if channel in self.subscribers:
+                    self._deliver(channel, json.loads(payload))
+                last_id = event_id
+            if time.time() - last_prune > self.retention:
+                conn.execute('DELETE FROM events WHERE created_at < ?', (time.time() - self.retention,))
+                last_prune = time.time()
+            time.sleep(self.poll_interval)
+
+
+def make_broker(url, max_subscribers=None):
+    """Build a broker from a URL: 'memory' or 'sqlite:///path/to/events.db'."""
+    if not url or url == 'memory':
+        return InProcessBroker(max_subscribers)
+    if url.startswith('sqlite:///'):
+        return SQLiteBroker(url[len('sqlite:///'):], max_subscribers=max_subscribers)
+    raise ValueError(f'Unknown message broker: {url}')
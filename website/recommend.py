@@ -0,0 +1,141 @@
+import re
+import threading
+
+# Keeps tokens such as c++, c#, node.js and .net intact
+TOKEN_RE = re.compile(r'[a-z0-9+#]+(?:\.[a-z0-9+#]+)*|\.[a-z0-9]+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+class SkillIndex:
+    """In-memory inverted index from skill ids to job slots.
+
+    Every indexed job gets a slot; `postings` maps a skill id (see
+    skills.py) to the slots of the jobs requiring it. Scoring a user is then
+    one bincount over the postings of their skill ids instead of a substring
+    scan of every job. Edited jobs are re-added under a new slot and the old slot is
+    marked dead, so postings stay append-only.
+
+    numpy is imported on first use, so importing this module (skills.py
+    needs tokenize) does not load it into every process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.slot_of = {}       # job id -> live slot
+        self.version = {}       # job id -> (updated_at, is_active, skill ids) last indexed
+        self.job_ids = []       # slot -> job id
+        self.created = None     # slot -> created_at in microseconds, allocated with alive
+        self.alive = None       # slot -> still current and active, allocated on first add
+        self.postings = {}      # skill id -> list of slots
+        self._arrays = {}       # skill id -> cached np.ndarray of postings
+        self._dead = 0
+        self.watermark = None   # highest updated_at seen, as stored text
+
+    def __len__(self):
+        return len(self.slot_of)
+
+    @property
+    def needs_compaction(self):
+        return self._dead > 1000 and self._dead > len(self.slot_of)
+
+    def update(self, rows, now):
+        """Index rows of (job_id, skill_ids, created_at, updated_at, is_active).
+
+        `created_at`/`updated_at` are the raw stored values and `now` is the
+        database clock in the same format. The watermark only advances to
+        timestamps before `now`, so the next refresh can fetch strictly newer
+        rows without missing edits made later in the current second.
+        Returns False, after dropping everything, once dead slots outnumber
+        live ones; the caller should then reload all jobs.
+        """
+        with self.lock:
+            if self.needs_compaction:
+                self.clear()
+                return False
+            for job_id, skill_ids, created, updated, active in rows:
+                skill_ids = tuple(sorted(skill_ids))
+                self.add(job_id, skill_ids, created, (updated, active, skill_ids), active)
+                if updated is not None and updated < now and (self.watermark is None or updated > self.watermark):
+                    self.watermark = updated
+            return True
+
+    def add(self, job_id, skill_ids, created, version, active=True):
+        """Index (or re-index) one job; a no-op if this version is already indexed."""
+        if self.version.get(job_id) == version:
+            return
+        old = self.slot_of.pop(job_id, None)
+        if old is not None:
+            self.alive[old] = False
+            self._dead += 1
+        self.version[job_id] = version
+        if not active:
+            return
+
+        slot = len(self.job_ids)
+        import numpy as np
+        if self.alive is None or slot == len(self.alive):
+            alive = np.zeros(max(1024, 2 * slot), dtype=bool)
+            created_keys = np.empty(len(alive), dtype=np.int64)
+            if self.alive is not None:
+                alive[:slot] = self.alive
+                created_keys[:slot] = self.created[:slot]
+            self.alive, self.created = alive, created_keys
+        self.slot_of[job_id] = slot
+        self.job_ids.append(job_id)
+        # Missing or unparseable timestamps become NaT, the smallest int64
+        try:
+            self.created[slot] = np.datetime64(created or None, 'us').astype(np.int64)
+        except ValueError:
+            self.created[slot] = np.iinfo(np.int64).min
+        self.alive[slot] = True
+        for skill_id in set(skill_ids):
+            self.postings.setdefault(skill_id, []).append(slot)
+            self._arrays.pop(skill_id, None)
+
+    def _slots(self, skill_id):
+        import numpy as np
+        array = self._arrays.get(skill_id)
+        if array is None:
+            array = np.asarray(self.postings.get(skill_id, ()), dtype=np.int64)
+            self._arrays[skill_id] = array
+        return array
+
+    def recommend(self, skill_ids, exclude=(), limit=5):
+        """Return up to `limit` job ids ranked by matched skills, newest first on ties."""
+        import numpy as np
+        with self.lock:
+            size = len(self.job_ids)
+            matched = [slots for slots in (self._slots(skill_id) for skill_id in set(skill_ids)) if len(slots)]
+            if not size or not matched:
+                return []
+
+            scores = np.bincount(np.concatenate(matched), minlength=size)
+            scores[~self.alive[:size]] = 0
+            excluded = [self.slot_of[job_id] for job_id in exclude if job_id in self.slot_of]
+            if excluded:
+                scores[excluded] = 0
+
+            candidates = np.flatnonzero(scores)
+            if len(candidates) > limit:
+                # Everything above the limit-th best score is in; the jobs tied
+                # with it are narrowed to the newest the same way, so heavy
+                # ties (a single matching skill) stay in numpy
+                candidate_scores = scores[candidates]
+                kth = np.partition(candidate_scores, -limit)[-limit]
+                above = candidates[candidate_scores > kth]
+                tied = candidates[candidate_scores == kth]
+                wanted = limit - len(above)
+                if len(tied) > wanted:
+                    tied_created = self.created[tied]
+                    newest = np.partition(tied_created, -wanted)[-wanted]
+                    tied = tied[tied_created >= newest]
+                candidates = np.concatenate((above, tied))
+
+            order = np.lexsort((candidates, self.created[candidates], scores[candidates]))[::-1]
+            return [self.job_ids[slot] for slot in candidates[order[:limit]]]
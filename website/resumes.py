@@ -0,0 +1,111 @@
+"""Plain-text extraction and scanning for uploaded resumes.
+
+Extraction uses only the standard library: DOCX is a zip of XML, text in
+PDF content streams is pulled out of its string operators, and legacy DOC
+files fall back to their runs of readable characters. That is enough for
+skill matching, not for display. pypdf is used for PDFs when it is
+installed.
+"""
+import html
+import io
+import re
+import zipfile
+import zlib
+
+# Extracted text is only matched against, so very long documents are cut
+MAX_TEXT = 100000
+# Most bytes inflated from one upload's compressed parts. The upload limit
+# only bounds the compressed size, and markup and PDF operators take more
+# room than the text they hold
+MAX_INFLATED = 50 * MAX_TEXT
+
+# The standard antivirus test file; the scan hook is a stand-in for a real
+# scanner (e.g. clamd) and only knows this signature
+EICAR = b'X5O!P%@AP[4\\PZX54(P^)7CC)7}$EICAR-STANDARD-ANTIVIRUS-TEST-FILE!$H+H*'
+
+_XML_TAG = re.compile(rb'<[^>]+>')
+_PARAGRAPH_END = re.compile(rb'</w:p>|<w:br/>|<w:tab/>')
+_PDF_STREAM = re.compile(rb'stream\r?\n(.*?)\r?\nendstream', re.S)
+_PDF_TEXT = re.compile(rb'\((?:[^()\\]|\\.)*\)\s*Tj|\[(?:[^\]\\]|\\.)*\]\s*TJ|T\*|Td|TD|ET', re.S)
+_PDF_STRING = re.compile(rb'\(((?:[^()\\]|\\.)*)\)', re.S)
+_PDF_ESCAPE = re.compile(rb'\\([nrtbf()\\]|[0-7]{1,3})')
+_PDF_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'', b'f': b'', b'(': b'(', b')': b')', b'\\': b'\\'}
+_READABLE = re.compile(rb'[\x20-\x7e]{4,}')
+_READABLE_UTF16 = re.compile(rb'(?:[\x20-\x7e]\x00){4,}')
+_SPACES = re.compile(r'[ \t]+')
+
+
+def looks_infected(data):
+    return EICAR in data
+
+
+def extract_text(data, kind):
+    """Best-effort plain text of a resume of `kind` ('pdf', 'docx' or 'doc')."""
+    if kind == 'docx':
+        text = _docx_text(data)
+    elif kind == 'pdf':
+        text = _pdf_text(data)
+    else:
+        text = _readable_text(data)
+    text = '\n'.join(_SPACES.sub(' ', line).strip() for line in text.splitlines())
+    return re.sub(r'\n{3,}', '\n\n', text).strip()[:MAX_TEXT]
+
+
+def _docx_text(data):
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive, archive.open('word/document.xml') as document:
+            xml = document.read(MAX_INFLATED)
+    except (zipfile.BadZipFile, KeyError, zlib.error):
+        return ''
+    xml = _PARAGRAPH_END.sub(b'\n', xml)
+    text = _XML_TAG.sub(b'', xml).decode('utf-8', errors='replace')
+    return html.unescape(text)
+
+
+def _pdf_text(data):
+    try:
+        import pypdf
+    except ImportError:
+        pypdf = None
+    if pypdf is not None:
+        try:
+            return '\n'.join(page.extract_text() or '' for page in pypdf.PdfReader(io.BytesIO(data)).pages)
+        except Exception:
+            pass
+    parts = []
+    budget = MAX_INFLATED
+    for match in _PDF_STREAM.finditer(data):
+        # A max_length of 0 would mean no limit
+        if budget <= 0:
+            break
+        stream = match.group(1)
+        try:
+            stream = zlib.decompressobj().decompress(stream, budget)
+            budget -= len(stream)
+        except zlib.error:
+            pass
+        for operator in _PDF_TEXT.finditer(stream):
+            token = operator.group(0)
+            if token in (b'T*', b'Td', b'TD', b'ET'):
+                parts.append(b'\n')
+                continue
+            for string in _PDF_STRING.findall(token):
+                parts.append(_PDF_ESCAPE.sub(_unescape, string))
+            if token.endswith(b'TJ'):
+                parts.append(b' ')
+    return b''.join(parts).decode('latin-1')
+
+
+def _unescape(match):
+    escape = match.group(1)
+    if escape in _PDF_ESCAPES:
+        return _PDF_ESCAPES[escape]
+    return bytes([int(escape, 8) & 0xff])
+
+
+def _readable_text(data):
+    # Word stores text as UTF-16 or as single-byte characters
+    runs = [run.decode('utf-16-le') for run in _READABLE_UTF16.findall(data)]
+    if not runs:
+        runs = [run.decode('ascii') for run in _READABLE.findall(data)]
+    return '\n'.join(runs)
@@ -0,0 +1,68 @@
+import re
+
+CURRENCY_SYMBOLS = {'₹': 'INR', 'rs': 'INR', 'inr': 'INR', '$': 'USD', 'usd': 'USD',
+                    '€': 'EUR', 'eur': 'EUR', '£': 'GBP', 'gbp': 'GBP'}
+DEFAULT_CURRENCY = 'INR'
+
+# Multipliers for amount suffixes, e.g. 60k, 5L, 5 lakh, 1.2 cr
+SUFFIXES = {'k': 1000, 'l': 100000, 'lac': 100000, 'lakh': 100000, 'lakhs': 100000,
+            'lpa': 100000, 'cr': 10000000, 'crore': 10000000, 'm': 1000000}
+
+PERIODS = (
+    ('hour', ('per hour', '/hour', '/hr', 'hourly', 'ph')),
+    ('month', ('per month', '/month', '/mo', 'monthly', 'pm', 'p.m')),
+    ('year', ('per year', '/year', '/yr', 'per annum', 'annually', 'yearly', 'pa', 'p.a', 'lpa', 'ctc')),
+)
+# Multiplier to annualize an amount paid per period
+PER_YEAR = {'hour': 2080, 'month': 12, 'year': 1}
+
+AMOUNT_RE = re.compile(r'(\d+(?:[.,]\d+)*)\s*(lakhs|lakh|lac|lpa|crore|cr|k|l|m)?\b', re.IGNORECASE)
+
+
+def _amount(number, suffix):
+    value = float(number.replace(',', ''))
+    if suffix:
+        value *= SUFFIXES[suffix.lower()]
+    return value
+
+
+def parse_salary(text):
+    """Parse a free-form salary string into (min, max, currency, period).
+
+    min/max are integers annualized to a yearly amount so ranges posted per
+    month or per hour can be compared directly. A single figure gives
+    min == max. Returns (None, None, None, None) when no amount is found.
+    """
+    if not text:
+        return None, None, None, None
+    lowered = text.lower()
+
+    currency = DEFAULT_CURRENCY
+    for symbol, code in CURRENCY_SYMBOLS.items():
+        if (symbol in lowered if not symbol.isalpha()
+                else re.search(r'\b' + symbol + r'\b', lowered)):
+            currency = code
+            break
+
+    period = 'year'
+    for name, markers in PERIODS:
+        if any(re.search(r'(?<![a-z])' + re.escape(marker) + r'(?![a-z])', lowered) for marker in markers):
+            period = name
+            break
+
+    matches = AMOUNT_RE.findall(lowered)
+    if not matches:
+        return None, None, None, None
+    # "5-7 LPA": a trailing suffix applies to a bare leading number as well
+    last_suffix = matches[-1][1]
+    amounts = [_amount(number, suffix or last_suffix) for number, suffix in matches[:2]]
+
+    multiplier = PER_YEAR[period]
+    low, high = min(amounts) * multiplier, max(amounts) * multiplier
+    return int(round(low)), int(round(high)), currency, period
+
+
+def parse_salary_bound(value):
+    """Parse a salary filter value such as '50000' or '5 LPA' into a yearly amount."""
+    low, _, _, _ = parse_salary(value)
+    return low
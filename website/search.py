@@ -0,0 +1,140 @@
+import re
+import sqlite3
+
+from sqlalchemy import text, Integer, Float
+
+# Columns mirrored into the FTS table, in the order bm25() weights are given
+FTS_COLUMNS = ('title', 'company', 'location', 'description', 'requirements')
+FTS_WEIGHTS = (10.0, 5.0, 4.0, 1.0, 1.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _phrase(value):
+    """Turn free text into an FTS5 prefix phrase, e.g. 'data sci' -> '"data sci" *'."""
+    tokens = TOKEN_RE.findall(value.lower())
+    if not tokens:
+        return None
+    return '"' + ' '.join(tokens) + '" *'
+
+
+def build_match(title=None, location=None, skills=None, text=None):
+    """Build an FTS5 MATCH expression from the search form fields.
+
+    Every field becomes a column-filtered prefix phrase and all of them must
+    match, which mirrors the AND-ed ILIKE filters of the fallback path.
+    Returns None when nothing searchable was given.
+    """
+    clauses = []
+    if title:
+        phrase = _phrase(title)
+        if phrase:
+            clauses.append(f'title : ({phrase})')
+    if location:
+        phrase = _phrase(location)
+        if phrase:
+            clauses.append(f'location : ({phrase})')
+    for skill in skills or []:
+        phrase = _phrase(skill)
+        if phrase:
+            clauses.append(f'{{description requirements}} : ({phrase})')
+    if text:
+        phrase = _phrase(text)
+        if phrase:
+            clauses.append(f'({phrase})')
+    return ' AND '.join(clauses) or None
+
+
+class JobSearchIndex:
+    """SQLite FTS5 index over the searchable Job columns.
+
+    The index is a standalone FTS5 table keyed by job id (rowid). Only active
+    jobs are indexed, so deactivating a job removes it from search results.
+    If the SQLite build has no FTS5, `available` is False and callers fall
+    back to ILIKE filtering.
+    """
+
+    table = 'job_fts'
+
+    def __init__(self, db=None):
+        self.db = db
+        self.available = False
+
+    def init_app(self, app, db):
+        self.db = db
+        self.available = app.config.get('SEARCH_USE_FTS', True) and self._fts5_supported()
+        app.extensions['job_search'] = self
+
+    @staticmethod
+    def _fts5_supported():
+        conn = sqlite3.connect(':memory:')
+        try:
+            conn.execute('CREATE VIRTUAL TABLE t USING fts5(a)')
+            return True
+        except sqlite3.OperationalError:
+            return False
+        finally:
+            conn.close()
+
+    def create(self):
+        """Create the FTS table if needed and rebuild it when it is out of sync."""
+        if not self.available:
+            return
+        if self.db.engine.dialect.name != 'sqlite':
+            self.available = False
+            return
+        with self.db.engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+                f"{', '.join(FTS_COLUMNS)}, tokenize='unicode61', prefix='2 3')"
+            ))
+            indexed = conn.execute(text(f'SELECT count(*) FROM {self.table}')).scalar()
+            active = conn.execute(text('SELECT count(*) FROM job WHERE is_active = 1')).scalar()
+        if indexed != active:
+            self.rebuild()
+
+    def rebuild(self):
+        if not self.available:
+            return
+        with self.db.engine.begin() as conn:
+            conn.execute(text(f'DELETE FROM {self.table}'))
+            conn.execute(text(
+                f"INSERT INTO {self.table} (rowid, {', '.join(FTS_COLUMNS)}) "
+                f"SELECT id, {', '.join(FTS_COLUMNS)} FROM job WHERE is_active = 1"
+            ))
+
+    def sync(self, connection, job):
+        """Re-index a single job; called from the Job mapper events."""
+        if not self.available:
+            return
+        connection.execute(text(f'DELETE FROM {self.table} WHERE rowid = :id'), {'id': job.id})
+        if job.is_active is not False:
+            values = {column: getattr(job, column) for column in FTS_COLUMNS}
+            values['id'] = job.id
+            connection.execute(text(
+                f"INSERT INTO {self.table} (rowid, {', '.join(FTS_COLUMNS)}) "
+                f"VALUES (:id, {', '.join(':' + c for c in FTS_COLUMNS)})"
+            ), values)
+
+    def add_many(self, connection, job_ids):
+        """Index a batch of newly inserted jobs in one statement."""
+        if not self.available or not job_ids:
+            return
+        connection.execute(text(
+            f"INSERT INTO {self.table} (rowid, {', '.join(FTS_COLUMNS)}) "
+            f"SELECT id, {', '.join(FTS_COLUMNS)} FROM job "
+            f"WHERE is_active = 1 AND id IN ({', '.join(str(int(job_id)) for job_id in job_ids)})"
+        ))
+
+    def remove(self, connection, job_id):
+        if not self.available:
+            return
+        connection.execute(text(f'DELETE FROM {self.table} WHERE rowid = :id'), {'id': job_id})
+
+    def matches(self, match):
+        """Subquery of (job_id, score) for a MATCH expression; lower score ranks higher."""
+        weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+        return text(
+            f'SELECT rowid AS job_id, bm25({self.table}, {weights}) AS score '
+            f'FROM {self.table} WHERE {self.table} MATCH :match'
+        ).bindparams(match=match).columns(job_id=Integer, score=Float).subquery('job_match')
@@ -0,0 +1,314 @@
+"""Shared skills vocabulary and skill extraction.
+
+Profile skills, resume text and job descriptions are all reduced to sets
+of integer skill ids by looking their word n-grams up in the skill_alias
+table, so "JS", "javascript" and "ECMAScript" land on the same id and
+matching a user to jobs is a set intersection instead of a substring
+search. Only skills in the vocabulary are recognised; add new ones with
+`flask skills-add`.
+
+Every job and profile stores a fingerprint of its text and of the
+vocabulary it was matched against, and is only re-processed when that
+changes.
+"""
+import hashlib
+import threading
+
+from sqlalchemy import text
+
+from recommend import tokenize
+
+# Words too common in prose to count as a skill unless listed as one, e.g.
+# in the profile's skills field; "go", "rest" and "excel" in a job
+# description are usually just English
+EXACT_ONLY = {
+    'c', 'r', 'go', 'py', 'ts', 'sh', 'cv', 'ml', 'dl', 'node', 'rest', 'swift', 'express', 'spring',
+    'excel', 'sales', 'dart', 'sap', 'containers', 'communication', 'leadership', 'security',
+    'networking', 'rails', 'ror', 'torch', 'mongo',
+}
+
+# name -> other spellings; every name is also an alias of itself
+DEFAULT_SKILLS = {
+    'python': ('python3', 'py'),
+    'java': ('java8', 'java 8', 'java 11', 'java 17'),
+    'javascript': ('js', 'ecmascript', 'es6'),
+    'typescript': ('ts',),
+    'c': ('ansi c',),
+    'c++': ('cpp', 'cplusplus'),
+    'c#': ('csharp', 'c sharp'),
+    'go': ('golang',),
+    'rust': (),
+    'ruby': (),
+    'php': (),
+    'kotlin': (),
+    'swift': (),
+    'scala': (),
+    'r': ('r language',),
+    'matlab': (),
+    'perl': (),
+    'bash': ('shell scripting', 'shell script', 'sh'),
+    'powershell': (),
+    'sql': ('t-sql', 'tsql', 'pl/sql', 'plsql'),
+    'html': ('html5',),
+    'css': ('css3',),
+    'sass': ('scss',),
+    'react': ('react.js', 'reactjs'),
+    'react native': (),
+    'angular': ('angularjs', 'angular.js'),
+    'vue': ('vue.js', 'vuejs'),
+    'svelte': (),
+    'next.js': ('nextjs',),
+    'node.js': ('node', 'nodejs'),
+    'express': ('express.js', 'expressjs'),
+    'django': (),
+    'flask': (),
+    'fastapi': (),
+    'spring': ('spring boot', 'springboot', 'spring framework'),
+    'hibernate': (),
+    '.net': ('dotnet', 'asp.net', '.net core'),
+    'ruby on rails': ('rails', 'ror'),
+    'laravel': (),
+    'graphql': (),
+    'rest': ('restful', 'rest api', 'rest apis'),
+    'grpc': (),
+    'microservices': ('microservice',),
+    'postgresql': ('postgres', 'psql'),
+    'mysql': ('mariadb',),
+    'sqlite': (),
+    'oracle': ('oracle db',),
+    'sql server': ('mssql', 'ms sql'),
+    'mongodb': ('mongo',),
+    'redis': (),
+    'cassandra': (),
+    'elasticsearch': ('elastic search', 'opensearch'),
+    'dynamodb': (),
+    'kafka': ('apache kafka',),
+    'rabbitmq': (),
+    'spark': ('apache spark', 'pyspark'),
+    'hadoop': ('hdfs',),
+    'airflow': ('apache airflow',),
+    'snowflake': (),
+    'bigquery': (),
+    'etl': (),
+    'data warehousing': ('data warehouse',),
+    'pandas': (),
+    'numpy': (),
+    'scikit-learn': ('sklearn', 'scikit learn'),
+    'tensorflow': (),
+    'pytorch': ('torch',),
+    'keras': (),
+    'machine learning': ('ml',),
+    'deep learning': ('dl',),
+    'nlp': ('natural language processing',),
+    'computer vision': ('cv',),
+    'data analysis': ('data analytics',),
+    'data science': (),
+    'statistics': ('statistical analysis',),
+    'tableau': (),
+    'power bi': ('powerbi',),
+    'excel': ('ms excel', 'microsoft excel'),
+    'aws': ('amazon web services',),
+    'azure': ('microsoft azure',),
+    'gcp': ('google cloud', 'google cloud platform'),
+    'docker': ('containers',),
+    'kubernetes': ('k8s',),
+    'terraform': (),
+    'ansible': (),
+    'jenkins': (),
+    'ci/cd': ('ci cd', 'continuous integration', 'continuous delivery'),
+    'github actions': (),
+    'git': ('github', 'gitlab'),
+    'linux': ('unix',),
+    'nginx': (),
+    'devops': (),
+    'agile': ('scrum', 'kanban'),
+    'jira': (),
+    'unit testing': ('unit tests',),
+    'selenium': (),
+    'cypress': (),
+    'jest': (),
+    'pytest': (),
+    'android': (),
+    'ios': (),
+    'flutter': ('dart',),
+    'figma': (),
+    'ui/ux': ('ui ux', 'ux design', 'ui design'),
+    'photoshop': ('adobe photoshop',),
+    'seo': ('search engine optimization',),
+    'digital marketing': (),
+    'content writing': ('copywriting',),
+    'sales': (),
+    'salesforce': (),
+    'sap': (),
+    'accounting': ('bookkeeping',),
+    'project management': ('pmp',),
+    'product management': (),
+    'communication': ('communication skills',),
+    'leadership': ('team leadership',),
+    'customer service': ('customer support',),
+    'security': ('cybersecurity', 'cyber security', 'information security'),
+    'networking': ('tcp/ip', 'computer networks'),
+    'blockchain': ('web3',),
+}
+
+
+def fingerprint(version, *texts):
+    """Hash of some text and of the vocabulary version it was matched against."""
+    data = '\x1f'.join([repr(version)] + [t or '' for t in texts])
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def alias_key(alias):
+    return ' '.join(tokenize(alias))
+
+
+class SkillVocabulary:
+    """In-memory copy of skill_alias, reloaded whenever the table changes."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.aliases = {}       # space-joined alias tokens -> skill id
+        self.text_aliases = {}  # the subset that is matched in free text
+        self.prefixes = set()   # leading words of multi-word text aliases
+        self.version = None
+
+    def load(self, connection):
+        """Refresh from the database if the alias table changed; returns the version."""
+        version = tuple(connection.execute(text('SELECT count(*), max(id) FROM skill_alias')).one())
+        with self.lock:
+            if version != self.version:
+                rows = connection.execute(text('SELECT alias, skill_id, exact FROM skill_alias')).all()
+                self.aliases = {alias: skill_id for alias, skill_id, exact in rows}
+                self.text_aliases = {alias: skill_id for alias, skill_id, exact in rows if not exact}
+                self.prefixes = {' '.join(words[:end]) for words in map(str.split, self.text_aliases)
+                                 for end in range(1, len(words))}
+                self.version = version
+            return self.version
+
+    def match(self, value):
+        """Skill ids mentioned anywhere in free text."""
+        tokens = tokenize(value)
+        found = set()
+        aliases, prefixes = self.text_aliases, self.prefixes
+        for start, key in enumerate(tokens):
+            end = start + 1
+            while True:
+                skill_id = aliases.get(key)
+                if skill_id is not None:
+                    found.add(skill_id)
+                # Only extend the phrase while it can still become an alias
+                if key not in prefixes or end == len(tokens):
+                    break
+                key = f'{key} {tokens[end]}'
+                end += 1
+        return found
+
+    def match_list(self, value):
+        """Skill ids of a comma-separated list such as UserProfile.skills."""
+        found = set()
+        for entry in (value or '').split(','):
+            skill_id = self.aliases.get(alias_key(entry))
+            if skill_id is not None:
+                found.add(skill_id)
+            else:
+                found |= self.match(entry)
+        return found
+
+    # Writers; all take the caller's connection so they share its transaction
+
+    def seed(self, connection, skills=DEFAULT_SKILLS):
+        for name, aliases in skills.items():
+            self.add(connection, name, aliases)
+
+    def add(self, connection, name, aliases=(), exact=False):
+        """Add a skill (or more aliases for an existing one); returns its id.
+
+        With `exact`, the new aliases only match in skill lists, not in free text.
+        """
+        connection.execute(text('INSERT OR IGNORE INTO skill (name) VALUES (:name)'), {'name': name.strip().lower()})
+        skill_id = connection.execute(text('SELECT id FROM skill WHERE name = :name'),
+                                      {'name': name.strip().lower()}).scalar()
+        keys = {alias_key(alias) for alias in (name,) + tuple(aliases)} - {''}
+        if keys:
+            connection.execute(text(
+                'INSERT OR IGNORE INTO skill_alias (alias, skill_id, exact) VALUES (:alias, :skill_id, :exact)'
+            ), [{'alias': key, 'skill_id': skill_id, 'exact': exact or key in EXACT_ONLY} for key in sorted(keys)])
+        return skill_id
+
+    def sync_jobs(self, connection, job_ids=None):
+        """Match jobs against the vocabulary; returns the ids whose skills changed.
+
+        Jobs whose fingerprint is unchanged are skipped, and of the others only
+        the job_skill rows that differ are written. Jobs whose skills changed
+        get a new updated_at so that skill indexes (recommend.py) re-read them.
+        """
+        version = self.load(connection)
+        query = 'SELECT id, title, description, requirements, skills_hash FROM job'
+        if job_ids is not None:
+            if not job_ids:
+                return []
+            query += f" WHERE id IN ({', '.join(str(int(job_id)) for job_id in job_ids)})"
+        wanted = {}
+        digests = []
+        for job_id, title, description, requirements, stored in connection.execute(text(query)).all():
+            digest = fingerprint(version, title, description, requirements)
+            if digest != stored:
+                wanted[job_id] = self.match(f'{title} {description} {requirements or ""}')
+                digests.append({'digest': digest, 'id': job_id})
+        if not wanted:
+            return []
+        changed = self._replace(connection, 'job_skill', 'job_id', wanted)
+        connection.execute(text('UPDATE job SET skills_hash = :digest WHERE id = :id'), digests)
+        if changed:
+            connection.execute(text(
+                f"UPDATE job SET updated_at = CURRENT_TIMESTAMP WHERE id IN ({', '.join(map(str, changed))})"
+            ))
+        return sorted(changed)
+
+    def sync_profile(self, connection, user_id):
+        """Match a user's profile skills and resume text; True if their skills changed."""
+        version = self.load(connection)
+        row = connection.execute(text(
+            'SELECT skills, resume_text, skills_hash FROM user_profile WHERE user_id = :user_id'
+        ), {'user_id': user_id}).first()
+        if row is None:
+            return False
+        skills, resume_text, stored = row
+        digest = fingerprint(version, skills, resume_text)
+        if digest == stored:
+            return False
+        changed = self._replace(connection, 'user_skill', 'user_id', {user_id: self.match_list(skills)}, 'profile')
+        changed |= self._replace(connection, 'user_skill', 'user_id', {user_id: self.match(resume_text)}, 'resume')
+        connection.execute(text('UPDATE user_profile SET skills_hash = :digest WHERE user_id = :user_id'),
+                           {'digest': digest, 'user_id': user_id})
+        return bool(changed)
+
+    @staticmethod
+    def _replace(connection, table, owner_column, wanted, source=None):
+        """Make each owner's rows in `table` equal wanted[owner], writing only the difference.
+
+        Returns the owners whose rows changed.
+        """
+        where = f'{owner_column} = :owner AND skill_id = :skill_id' + (' AND source = :source' if source else '')
+        extra = {'source': source} if source else {}
+        existing = {owner: set() for owner in wanted}
+        for owner, skill_id in connection.execute(text(
+            f"SELECT {owner_column}, skill_id FROM {table} "
+            f"WHERE {owner_column} IN ({', '.join(str(int(owner)) for owner in wanted)})"
+            + (' AND source = :source' if source else '')
+        ), extra):
+            existing[owner].add(skill_id)
+        removed, added, changed = [], [], set()
+        for owner, skill_ids in wanted.items():
+            if skill_ids == existing[owner]:
+                continue
+            changed.add(owner)
+            removed += [dict(extra, owner=owner, skill_id=skill_id) for skill_id in existing[owner] - skill_ids]
+            added += [dict(extra, owner=owner, skill_id=skill_id) for skill_id in sorted(skill_ids - existing[owner])]
+        if removed:
+            connection.execute(text(f'DELETE FROM {table} WHERE {where}'), removed)
+        if added:
+            columns = f'{owner_column}, skill_id' + (', source' if source else '')
+            values = ':owner, :skill_id' + (', :source' if source else '')
+            connection.execute(text(f'INSERT INTO {table} ({columns}) VALUES ({values})'), added)
+        return changed
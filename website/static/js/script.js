@@ -39,31 +39,32 @@ document.addEventListener('DOMContentLoaded', function() {
    const skillsFilter = document.getElementById('skills-filter');
    const applyFiltersBtn = document.getElementById('apply-filters');
    const clearFiltersBtn = document.getElementById('clear-filters');
-   const jobBoxes = document.querySelectorAll('.box-container .box');
 
-   if (!searchInput || !jobBoxes.length) return; // Only run on jobs page
+   if (!searchInput || !document.querySelector('.box-container .box')) return; // Only run on jobs page
 
    function filterJobs() {
       const searchTerm = searchInput.value.toLowerCase();
       const locationValue = locationFilter.value.toLowerCase();
       const typeValue = typeFilter.value.toLowerCase();
-      const salaryMin = salaryMinInput ? salaryMinInput.value : '';
-      const salaryMax = salaryMaxInput ? salaryMaxInput.value : '';
+      const salaryMin = salaryMinInput ? parseInt(salaryMinInput.value.replace(/[^0-9]/g, ''), 10) : NaN;
+      const salaryMax = salaryMaxInput ? parseInt(salaryMaxInput.value.replace(/[^0-9]/g, ''), 10) : NaN;
       const experienceValue = experienceFilter ? experienceFilter.value : '';
       const skillsValue = skillsFilter ? skillsFilter.value.toLowerCase() : '';
 
-      jobBoxes.forEach(box => {
+      document.querySelectorAll('.box-container .box').forEach(box => {
          const title = box.querySelector('.job-title').textContent.toLowerCase();
          const company = box.querySelector('.company h3').textContent.toLowerCase();
          const location = box.querySelector('.location span').textContent.toLowerCase();
          const type = box.querySelector('.tags p:nth-child(2) span').textContent.toLowerCase();
-         const salary = box.querySelector('.tags p:nth-child(1) span').textContent.toLowerCase();
+         const jobSalaryMin = parseInt(box.dataset.salaryMin, 10);
+         const jobSalaryMax = parseInt(box.dataset.salaryMax, 10);
 
          const matchesSearch = !searchTerm || title.includes(searchTerm) || company.includes(searchTerm) || location.includes(searchTerm);
          const matchesLocation = !locationValue || location.includes(locationValue);
          const matchesType = !typeValue || type.includes(typeValue);
-         const matchesSalaryMin = !salaryMin || salary.includes(salaryMin);
-         const matchesSalaryMax = !salaryMax || salary.includes(salaryMax);
+         // Salary ranges are parsed server-side; match when they overlap the bounds
+         const matchesSalaryMin = isNaN(salaryMin) || (!isNaN(jobSalaryMax) && jobSalaryMax >= salaryMin);
+         const matchesSalaryMax = isNaN(salaryMax) || (!isNaN(jobSalaryMin) && jobSalaryMin <= salaryMax);
          const matchesExperience = !experienceValue; // Simplified, as experience isn't in the job display
          const matchesSkills = !skillsValue; // Simplified, as skills aren't in the job display
 
@@ -98,7 +99,7 @@ document.addEventListener('DOMContentLoaded', function() {
          if (salaryMaxInput) salaryMaxInput.value = '';
          if (experienceFilter) experienceFilter.value = '';
          if (skillsFilter) skillsFilter.value = '';
-         jobBoxes.forEach(box => {
+         document.querySelectorAll('.box-container .box').forEach(box => {
             box.style.display = 'block';
             box.style.animation = 'fadeInUp 0.5s ease-out';
          });
@@ -285,40 +286,113 @@ document.addEventListener('DOMContentLoaded', function() {
 });
 
 // Job Save/Unsave System
+function bindSaveButton(button) {
+   button.addEventListener('click', function() {
+      const jobId = this.getAttribute('data-job-id');
+      const isSaved = this.textContent.trim().includes('Saved');
+
+      fetch(`/api/save-job/${jobId}`, {
+         method: 'POST',
+         headers: {
+            'Content-Type': 'application/json',
+         },
+         // The state we want, not a toggle, so a double click saves once
+         body: JSON.stringify({saved: !isSaved})
+      })
+      .then(response => response.json())
+      .then(data => {
+         if (data.success) {
+            if (data.saved) {
+               this.innerHTML = '<i class="fas fa-heart"></i> Saved';
+               this.classList.add('saved');
+               showNotification('Job saved successfully!', 'success');
+            } else {
+               this.innerHTML = '<i class="fas fa-heart"></i> Save';
+               this.classList.remove('saved');
+               showNotification('Job removed from saved jobs!', 'info');
+            }
+         } else {
+            showNotification(data.message, 'error');
+         }
+      })
+      .catch(error => {
+         console.error('Error:', error);
+         showNotification('An error occurred while saving the job.', 'error');
+      });
+   });
+}
+
 document.addEventListener('DOMContentLoaded', function() {
-   const saveButtons = document.querySelectorAll('.save-job-btn');
+   document.querySelectorAll('.save-job-btn').forEach(bindSaveButton);
+});
 
-   saveButtons.forEach(button => {
-      button.addEventListener('click', function() {
-         const jobId = this.getAttribute('data-job-id');
-         const isSaved = this.textContent.trim().includes('Saved');
+// Load More for the job listing (keyset-paginated /api/jobs)
+function escapeHtml(value) {
+   const div = document.createElement('div');
+   div.textContent = value == null ? '' : value;
+   return div.innerHTML;
+}
 
-         fetch(`/api/save-job/${jobId}`, {
-            method: 'POST',
-            headers: {
-               'Content-Type': 'application/json',
-            }
-         })
-         .then(response => response.json())
-         .then(data => {
-            if (data.success) {
-               if (data.saved) {
-                  this.innerHTML = '<i class="fas fa-heart"></i> Saved';
-                  this.classList.add('saved');
-                  showNotification('Job saved successfully!', 'success');
-               } else {
-                  this.innerHTML = '<i class="fas fa-heart"></i> Save';
-                  this.classList.remove('saved');
-                  showNotification('Job removed from saved jobs!', 'info');
-               }
-            } else {
-               showNotification(data.message, 'error');
-            }
-         })
-         .catch(error => {
-            console.error('Error:', error);
-            showNotification('An error occurred while saving the job.', 'error');
+function renderJobCard(job, canSave) {
+   const box = document.createElement('div');
+   box.className = 'box';
+   box.dataset.salaryMin = job.salary_min == null ? '' : job.salary_min;
+   box.dataset.salaryMax = job.salary_max == null ? '' : job.salary_max;
+   box.style.animation = 'fadeInUp 0.5s ease-out';
+   box.innerHTML = `
+      <div class="company">
+         <img src="https://via.placeholder.com/50" alt="Company Logo">
+         <div>
+            <h3>${escapeHtml(job.company)}</h3>
+            <p>${escapeHtml(job.created_at)}</p>
+         </div>
+      </div>
+      <h3 class="job-title">${escapeHtml(job.title)}</h3>
+      <p class="location"><i class="fas fa-map-marker-alt"></i> <span>${escapeHtml(job.location)}</span></p>
+      <div class="tags">
+         <p><i class="fas fa-indian-rupee-sign"></i> <span>${escapeHtml(job.salary)}</span></p>
+         <p><i class="fas fa-briefcase"></i> <span>${escapeHtml(job.type)}</span></p>
+         <p><i class="fas fa-clock"></i> <span>Flexible</span></p>
+      </div>
+      <div class="flex-btn">
+         <a href="${escapeHtml(job.url)}" class="btn">view details</a>
+         ${canSave ? `<button class="save-job-btn btn secondary" data-job-id="${job.id}">
+            <i class="fas fa-heart"></i> ${job.saved ? 'Saved' : 'Save'}
+         </button>` : ''}
+      </div>`;
+   return box;
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+   const loadMoreBtn = document.getElementById('load-more');
+   const container = document.querySelector('.box-container');
+   if (!loadMoreBtn || !container) return;
+
+   loadMoreBtn.addEventListener('click', function() {
+      const nextUrl = this.getAttribute('data-next-url');
+      const canSave = document.querySelector('.save-job-btn') !== null;
+      this.disabled = true;
+
+      fetch(nextUrl, { headers: { 'Accept': 'application/json' } })
+      .then(response => response.json())
+      .then(data => {
+         data.jobs.forEach(job => {
+            const box = renderJobCard(job, canSave);
+            container.appendChild(box);
+            const saveBtn = box.querySelector('.save-job-btn');
+            if (saveBtn) bindSaveButton(saveBtn);
          });
+         if (data.next_url) {
+            this.setAttribute('data-next-url', data.next_url);
+            this.disabled = false;
+         } else {
+            this.parentNode.remove();
+         }
+      })
+      .catch(error => {
+         console.error('Error:', error);
+         this.disabled = false;
+         showNotification('Could not load more jobs.', 'error');
       });
    });
 });
@@ -681,3 +755,218 @@ document.addEventListener('DOMContentLoaded', function() {
       btn.setAttribute('data-original-value', btn.value);
    });
 });
+
+// Conversation thread: load older messages (keyset-paginated, newest first)
+function renderMessage(message, currentUserId, otherName) {
+   const mine = message.sender_id === currentUserId;
+   const wrapper = document.createElement('div');
+   wrapper.className = 'message mb-3' + (mine ? ' text-end' : '');
+   wrapper.innerHTML = `
+      <div class="d-inline-block p-3 rounded ${mine ? 'bg-primary text-white' : 'bg-light'}" style="max-width: 70%;">
+         ${message.subject ? `<strong>${escapeHtml(message.subject)}</strong><br>` : ''}
+         <p class="mb-1">${escapeHtml(message.content)}</p>
+         <small class="${mine ? 'text-white-50' : 'text-muted'}">
+            ${escapeHtml(message.sent_at)} ${mine ? '(You)' : '(' + escapeHtml(otherName) + ')'}
+         </small>
+      </div>`;
+   return wrapper;
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+   const loadOlderBtn = document.getElementById('load-older');
+   const list = document.getElementById('message-list');
+   if (!loadOlderBtn || !list) return;
+
+   const card = list.closest('.card');
+   const currentUserId = parseInt(card.getAttribute('data-user-id'), 10);
+   const otherName = card.getAttribute('data-other-name');
+
+   loadOlderBtn.addEventListener('click', function() {
+      const holder = this.parentNode;
+      this.disabled = true;
+
+      fetch(this.getAttribute('data-next-url'), { headers: { 'Accept': 'application/json' } })
+      .then(response => response.json())
+      .then(data => {
+         const previousHeight = list.scrollHeight;
+         // Pages come newest first; insert each just below the button
+         data.messages.forEach(message => {
+            holder.after(renderMessage(message, currentUserId, otherName));
+         });
+         list.scrollTop += list.scrollHeight - previousHeight;
+         if (data.next_url) {
+            this.setAttribute('data-next-url', data.next_url);
+            this.disabled = false;
+         } else {
+            holder.remove();
+         }
+      })
+      .catch(error => {
+         console.error('Error:', error);
+         this.disabled = false;
+         showNotification('Could not load older messages.', 'error');
+      });
+   });
+});
+
+// Realtime messages: Server-Sent Events, falling back to long polling
+function subscribeToMessages(streamUrl, pollUrl, onEvent, onReconnect) {
+   function poll() {
+      fetch(pollUrl, { headers: { 'Accept': 'application/json' } })
+      .then(response => {
+         if (!response.ok) {
+            const error = new Error(response.statusText);
+            // Sent with a 503 when the server has no room for another waiting request
+            error.retryAfter = parseInt(response.headers.get('Retry-After'), 10);
+            throw error;
+         }
+         return response.json();
+      })
+      .then(data => {
+         data.events.forEach(onEvent);
+         poll();
+      })
+      .catch(error => {
+         setTimeout(() => {
+            if (onReconnect) onReconnect();
+            poll();
+         }, (error.retryAfter || 3) * 1000);
+      });
+   }
+
+   if (window.EventSource) {
+      const source = new EventSource(streamUrl);
+      let dropped = false;
+      ['message', 'read'].forEach(type => {
+         source.addEventListener(type, event => onEvent(JSON.parse(event.data)));
+      });
+      source.addEventListener('error', () => {
+         dropped = true;
+         // The stream was refused rather than dropped, so EventSource will not
+         // reconnect by itself; long poll instead
+         if (source.readyState === EventSource.CLOSED) {
+            setTimeout(() => {
+               if (onReconnect) onReconnect();
+               poll();
+            }, 3000);
+         }
+      });
+      source.addEventListener('open', () => {
+         // Events sent while disconnected are not replayed
+         if (dropped && onReconnect) onReconnect();
+         dropped = false;
+      });
+      return;
+   }
+   poll();
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+   const list = document.getElementById('message-list');
+   const card = list && list.closest('.card');
+   if (!card || !card.hasAttribute('data-stream-url')) return;
+
+   const currentUserId = parseInt(card.getAttribute('data-user-id'), 10);
+   const otherName = card.getAttribute('data-other-name');
+   const conversationId = parseInt(card.getAttribute('data-conversation-id'), 10);
+   const readUrl = card.getAttribute('data-read-url');
+   const form = document.getElementById('message-form');
+
+   function appendMessage(message) {
+      if (list.querySelector(`[data-message-id="${message.id}"]`)) return false;
+      const placeholder = document.getElementById('no-messages');
+      if (placeholder) placeholder.remove();
+      const element = renderMessage(message, currentUserId, otherName);
+      element.setAttribute('data-message-id', message.id);
+      list.appendChild(element);
+      list.scrollTop = list.scrollHeight;
+      return true;
+   }
+
+   function markRead() {
+      fetch(readUrl, { method: 'POST', headers: { 'Accept': 'application/json' } });
+   }
+
+   function resync() {
+      fetch(card.getAttribute('data-sync-url'), { headers: { 'Accept': 'application/json' } })
+      .then(response => response.json())
+      .then(data => {
+         // Pages come newest first
+         const added = data.messages.slice().reverse().map(appendMessage);
+         if (added.some(Boolean)) markRead();
+      });
+   }
+
+   list.scrollTop = list.scrollHeight;
+
+   subscribeToMessages(card.getAttribute('data-stream-url'), card.getAttribute('data-poll-url'), event => {
+      if (event.type !== 'message' || event.conversation_id !== conversationId) return;
+      if (appendMessage(event.message) && event.message.sender_id !== currentUserId) {
+         markRead();
+      }
+   }, resync);
+
+   if (form) {
+      form.addEventListener('submit', function(e) {
+         e.preventDefault();
+         const button = form.querySelector('button[type="submit"]');
+         button.disabled = true;
+
+         fetch(form.getAttribute('action') || window.location.href, {
+            method: 'POST',
+            headers: { 'Accept': 'application/json' },
+            body: new FormData(form)
+         })
+         .then(response => {
+            if (!response.ok) throw new Error(response.statusText);
+            return response.json();
+         })
+         .then(data => {
+            appendMessage(data.message);
+            form.reset();
+         })
+         .catch(error => {
+            console.error('Error:', error);
+            showNotification('Could not send message.', 'error');
+         })
+         .finally(() => { button.disabled = false; });
+      });
+   }
+});
+
+document.addEventListener('DOMContentLoaded', function() {
+   const inbox = document.getElementById('inbox');
+   if (!inbox) return;
+
+   const currentUserId = parseInt(inbox.getAttribute('data-user-id'), 10);
+   const total = document.getElementById('unread-total');
+
+   subscribeToMessages(inbox.getAttribute('data-stream-url'), inbox.getAttribute('data-poll-url'), event => {
+      const item = inbox.querySelector(`[data-conversation-id="${event.conversation_id}"]`);
+      if (!item) {
+         // A new conversation, or one older than this page; reloading shows it on top
+         if (event.type === 'message') window.location.reload();
+         return;
+      }
+      const badge = item.querySelector('.unread-badge');
+      const preview = item.querySelector('.conversation-preview');
+
+      if (event.type === 'read') {
+         total.textContent = Math.max(0, parseInt(total.textContent, 10) - parseInt(badge.textContent || '0', 10));
+         badge.textContent = '0';
+         badge.classList.add('d-none');
+         preview.classList.remove('fw-bold');
+         return;
+      }
+
+      const mine = event.message.sender_id === currentUserId;
+      preview.textContent = (mine ? 'You: ' : '') + event.message.content.slice(0, 120);
+      if (!mine) {
+         badge.textContent = parseInt(badge.textContent || '0', 10) + 1;
+         badge.classList.remove('d-none');
+         preview.classList.add('fw-bold');
+         total.textContent = parseInt(total.textContent, 10) + 1;
+      }
+      item.parentNode.prepend(item);
+   });
+});
@@ -0,0 +1,218 @@
+"""Content-addressed storage for uploaded files.
+
+Uploads are copied to a spool file in fixed-size chunks while they are
+hashed, so a request never holds a whole file in memory and an oversized
+upload is rejected as soon as it crosses the limit. Files are stored under
+their SHA-256, so the same resume uploaded twice, or by two accounts, is
+kept once.
+
+LocalStorage keeps files in a directory. ObjectStorage adapts any client
+with put/get/head/delete object calls (an S3 client behind a thin wrapper);
+MemoryObjectStore is an in-process stand-in for one. Post-processing such
+as virus scanning and text extraction is a chain of UploadProcessor hooks,
+run as a background task after the request has returned.
+"""
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+from collections import namedtuple
+
+log = logging.getLogger(__name__)
+
+StoredFile = namedtuple('StoredFile', 'key size digest kind')
+
+# Leading bytes of the document formats accepted as resumes
+SIGNATURES = (
+    (b'%PDF-', 'pdf'),
+    (b'PK\x03\x04', 'docx'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'doc'),
+)
+
+
+class UploadError(ValueError):
+    pass
+
+
+class UploadTooLarge(UploadError):
+    pass
+
+
+def sniff(head):
+    """File kind from its first bytes, or None; the client's filename is not trusted."""
+    for signature, kind in SIGNATURES:
+        if head.startswith(signature):
+            return kind
+    return None
+
+
+class LocalStorage:
+    def __init__(self, root):
+        self.root = root
+
+    def spool(self):
+        # Spool files live next to the store so publishing one is a rename
+        directory = os.path.join(self.root, 'tmp')
+        os.makedirs(directory, exist_ok=True)
+        return tempfile.mkstemp(dir=directory)
+
+    def path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def put_file(self, key, filename):
+        """Move a finished spool file into place; readers never see a partial file."""
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(filename, target)
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+class MemoryObjectStore:
+    """Dict-backed stand-in for an object store client."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.objects = {}
+
+    def put_object(self, bucket, key, fileobj):
+        data = fileobj.read()
+        with self.lock:
+            self.objects[bucket, key] = data
+
+    def get_object(self, bucket, key):
+        with self.lock:
+            data = self.objects.get((bucket, key))
+        if data is None:
+            raise FileNotFoundError(key)
+        return io.BytesIO(data)
+
+    def head_object(self, bucket, key):
+        """Object metadata, or None if it does not exist."""
+        with self.lock:
+            data = self.objects.get((bucket, key))
+        return None if data is None else {'size': len(data)}
+
+    def delete_object(self, bucket, key):
+        with self.lock:
+            self.objects.pop((bucket, key), None)
+
+
+class ObjectStorage:
+    def __init__(self, client, bucket):
+        self.client = client
+        self.bucket = bucket
+
+    def spool(self):
+        return tempfile.mkstemp()
+
+    def exists(self, key):
+        return self.client.head_object(self.bucket, key) is not None
+
+    def put_file(self, key, filename):
+        with open(filename, 'rb') as f:
+            self.client.put_object(self.bucket, key, f)
+        os.remove(filename)
+
+    def open(self, key):
+        return self.client.get_object(self.bucket, key)
+
+    def delete(self, key):
+        self.client.delete_object(self.bucket, key)
+
+
+def make_storage(url):
+    """Build a store from a URL: a directory path, or 'memory' for the in-process fake."""
+    if url == 'memory':
+        return ObjectStorage(MemoryObjectStore(), 'uploads')
+    if url.startswith('file://'):
+        url = url[len('file://'):]
+    return LocalStorage(url)
+
+
+def save_upload(storage, stream, max_size, prefix, kinds, chunk_size=64 * 1024):
+    """Copy `stream` into `storage` under its content hash and return a StoredFile.
+
+    Raises UploadTooLarge past `max_size` bytes and UploadError for empty
+    files or kinds not in `kinds`; nothing is stored in either case.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+    fd, spool = storage.spool()
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(f'File is larger than {max_size // (1024 * 1024)} MB')
+                if len(head) < 16:
+                    head += chunk[:16 - len(head)]
+                digest.update(chunk)
+                out.write(chunk)
+        if not size:
+            raise UploadError('File is empty')
+        kind = sniff(head)
+        if kind not in kinds:
+            raise UploadError(f"Unsupported file type; upload {', '.join(allowed.upper() for allowed in kinds)}")
+        hexdigest = digest.hexdigest()
+        key = f'{prefix}/{hexdigest[:2]}/{hexdigest}.{kind}'
+        if storage.exists(key):
+            os.remove(spool)
+        else:
+            storage.put_file(key, spool)
+        return StoredFile(key, size, hexdigest, kind)
+    except BaseException:
+        if os.path.exists(spool):
+            os.remove(spool)
+        raise
+
+
+class UploadProcessor:
+    """Post-processing hooks for stored files.
+
+    Hooks run in registration order as hook(storage, stored, **context); a
+    hook returning False stops the chain for that file, e.g. when a scan
+    rejects it.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.hooks = []
+        self.on_error = None
+
+    def hook(self, func):
+        self.hooks.append(func)
+        return func
+
+    def errorhandler(self, func):
+        """Register func(stored, error, **context), called when a hook raises."""
+        self.on_error = func
+        return func
+
+    def run(self, stored, **context):
+        for hook in self.hooks:
+            try:
+                if hook(self.storage, stored, **context) is False:
+                    return False
+            except Exception as e:
+                log.exception('Upload hook %s failed for %s', hook.__name__, stored.key)
+                if self.on_error is not None:
+                    self.on_error(stored, e, **context)
+                return False
+        return True
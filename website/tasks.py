@@ -0,0 +1,235 @@
+"""Durable background tasks stored in a database table.
+
+Views enqueue a task on their own connection, so it commits or rolls back
+together with the request's writes, and return without waiting for it.
+Worker threads, in the web process (TASK_WORKERS) or in `flask worker`,
+claim due tasks under a lease, run them in an app context and record the
+outcome. A failing task is retried with exponential backoff until it has
+used max_attempts; a task whose worker died is picked up again once its
+lease runs out, so task functions must be safe to run twice. Enqueueing
+with an idempotency key that is already in the table is a no-op.
+
+CPU-heavy tasks scale by running more `flask worker` processes; they all
+claim from the same table.
+"""
+import json
+import logging
+import random
+import threading
+import time
+import traceback
+from collections import namedtuple
+
+from sqlalchemy import text
+
+log = logging.getLogger(__name__)
+
+TaskSpec = namedtuple('TaskSpec', 'func max_attempts')
+ClaimedTask = namedtuple('ClaimedTask', 'id name args attempts max_attempts')
+
+
+class TaskQueue:
+    table = 'task'
+
+    def __init__(self, app=None, db=None):
+        self.specs = {}
+        self.wakeup = threading.Condition()
+        self.stopping = threading.Event()
+        self.threads = []
+        self.lock = threading.Lock()
+        self.counters = {}  # task name -> outcome counts and run time
+        self.last_purge = 0
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.app = app
+        self.db = db
+        app.extensions['task_queue'] = self
+
+    def task(self, name=None, max_attempts=None):
+        """Register a task function; it is called with the keyword arguments given to enqueue()."""
+        def register(func):
+            self.specs[name or func.__name__] = TaskSpec(func, max_attempts)
+            return func
+        return register
+
+    def enqueue(self, connection, name, key=None, delay=0, **kwargs):
+        """Insert a task in the caller's transaction; arguments must be JSON-serializable."""
+        spec = self.specs[name]
+        now = time.time()
+        connection.execute(text(
+            f'INSERT INTO {self.table} (name, args, idempotency_key, status, attempts, max_attempts, run_at, created_at) '
+            "VALUES (:name, :args, :key, 'queued', 0, :max_attempts, :run_at, :now) "
+            'ON CONFLICT (idempotency_key) DO NOTHING'
+        ), {'name': name, 'args': json.dumps(kwargs), 'key': key, 'now': now, 'run_at': now + delay,
+            'max_attempts': spec.max_attempts or self.app.config['TASK_MAX_ATTEMPTS']})
+
+    def notify(self):
+        """Wake idle in-process workers; call after committing new tasks."""
+        with self.wakeup:
+            self.wakeup.notify_all()
+
+    # Workers
+
+    def claim(self):
+        """Take the next due task, or one whose lease expired; None if there is nothing to do."""
+        now = time.time()
+        with self.db.engine.begin() as conn:
+            row = conn.execute(text(
+                f"UPDATE {self.table} SET status = 'running', attempts = attempts + 1, "
+                'locked_until = :lease, started_at = :now '
+                f'WHERE id = (SELECT id FROM {self.table} '
+                "WHERE (status = 'queued' AND run_at <= :now) OR (status = 'running' AND locked_until < :now) "
+                'ORDER BY run_at, id LIMIT 1) '
+                'RETURNING id, name, args, attempts, max_attempts'
+            ), {'now': now, 'lease': now + self.app.config['TASK_LEASE']}).first()
+        return ClaimedTask(*row) if row else None
+
+    def run(self, task):
+        """Run a claimed task and record whether it is done, retried or failed."""
+        with self.app.app_context():
+            return self._run(task)
+
+    def _run(self, task):
+        """Run a claimed task in the caller's app context."""
+        spec = self.specs.get(task.name)
+        started = time.perf_counter()
+        try:
+            if spec is None:
+                raise LookupError(f'No task registered as {task.name}')
+            try:
+                spec.func(**json.loads(task.args))
+            finally:
+                # Claims and outcomes use their own connections; the session is
+                # the task's alone, and the next task starts with a clean one
+                self.db.session.remove()
+        except Exception:
+            error = traceback.format_exc(limit=5)
+            log.warning('Task %s #%s failed (attempt %s of %s)', task.name, task.id, task.attempts, task.max_attempts)
+            if spec is not None and task.attempts < task.max_attempts:
+                # Exponential backoff with jitter so retries of a burst spread out
+                delay = self.app.config['TASK_RETRY_BASE'] * 2 ** (task.attempts - 1) * random.uniform(1, 1.5)
+                self._finish(task, 'queued', error, run_at=time.time() + delay)
+                outcome = 'retried'
+            else:
+                self._finish(task, 'failed', error)
+                outcome = 'failed'
+        else:
+            self._finish(task, 'done')
+            outcome = 'done'
+        self._count(task.name, outcome, time.perf_counter() - started)
+        return outcome
+
+    def _finish(self, task, status, error=None, run_at=None):
+        # Matching attempts makes a worker that lost its lease leave the row alone
+        now = time.time()
+        with self.db.engine.begin() as conn:
+            conn.execute(text(
+                f'UPDATE {self.table} SET status = :status, last_error = :error, locked_until = NULL, '
+                'run_at = coalesce(:run_at, run_at), finished_at = :finished '
+                "WHERE id = :id AND attempts = :attempts AND status = 'running'"
+            ), {'status': status, 'error': error, 'run_at': run_at, 'id': task.id, 'attempts': task.attempts,
+                'finished': None if status == 'queued' else now})
+
+    def _count(self, name, outcome, seconds):
+        with self.lock:
+            counts = self.counters.setdefault(name, {'done': 0, 'retried': 0, 'failed': 0, 'seconds': 0.0,
+                                                     'max_seconds': 0.0})
+            counts[outcome] += 1
+            counts['seconds'] += seconds
+            counts['max_seconds'] = max(counts['max_seconds'], seconds)
+
+    def run_pending(self, limit=None):
+        """Run due tasks in this thread until none are left; returns how many ran."""
+        ran = 0
+        with self.app.app_context():
+            while limit is None or ran < limit:
+                task = self.claim()
+                if task is None:
+                    break
+                self._run(task)
+                ran += 1
+        return ran
+
+    def work(self):
+        """Worker thread loop: run tasks as they come due, sleeping when idle."""
+        while not self.stopping.is_set():
+            try:
+                with self.app.app_context():
+                    task = self.claim()
+                    if task is not None:
+                        self._run(task)
+                        continue
+                    self.purge_if_due()
+            except Exception:
+                log.exception('Task worker error')
+            with self.wakeup:
+                self.wakeup.wait(self.app.config['TASK_POLL_INTERVAL'])
+
+    def start(self, threads):
+        """Start `threads` worker threads in this process; later calls are no-ops."""
+        with self.lock:
+            if self.threads or threads <= 0:
+                return
+            self.stopping.clear()
+            for i in range(threads):
+                thread = threading.Thread(target=self.work, name=f'task-worker-{i}', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def stop(self, timeout=None):
+        self.stopping.set()
+        self.notify()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    def after_fork(self):
+        # Worker threads are not copied into a forked process; it starts its own
+        self.wakeup = threading.Condition()
+        self.stopping = threading.Event()
+        self.threads = []
+        self.lock = threading.Lock()
+        self.counters = {}
+
+    def purge_if_due(self):
+        """Delete finished tasks older than TASK_RETENTION, at most once an hour."""
+        now = time.time()
+        if now - self.last_purge < 3600:
+            return
+        self.last_purge = now
+        with self.db.engine.begin() as conn:
+            conn.execute(text(
+                f"DELETE FROM {self.table} WHERE status IN ('done', 'failed') AND finished_at < :cutoff"
+            ), {'cutoff': now - self.app.config['TASK_RETENTION']})
+
+    # Metrics
+
+    def stats(self):
+        """Queue depth from the table, plus outcomes and run times seen by this process."""
+        now = time.time()
+        with self.db.engine.connect() as conn:
+            depth = {status: count for status, count in conn.execute(text(
+                f'SELECT status, count(*) FROM {self.table} GROUP BY status'))}
+            oldest_due = conn.execute(text(
+                f"SELECT min(run_at) FROM {self.table} WHERE status = 'queued' AND run_at <= :now"
+            ), {'now': now}).scalar()
+        tasks = {}
+        with self.lock:
+            for name, counts in self.counters.items():
+                runs = counts['done'] + counts['retried'] + counts['failed']
+                tasks[name] = {
+                    'done': counts['done'],
+                    'retried': counts['retried'],
+                    'failed': counts['failed'],
+                    'avg_ms': round(counts['seconds'] * 1000 / runs, 2),
+                    'max_ms': round(counts['max_seconds'] * 1000, 2),
+                }
+        return {
+            'depth': {status: depth.get(status, 0) for status in ('queued', 'running', 'done', 'failed')},
+            # How far behind the workers are; keeps growing when they are undersized
+            'oldest_due_seconds': round(now - oldest_due, 3) if oldest_due else 0,
+            'workers': len(self.threads),
+            'tasks': tasks,
+        }
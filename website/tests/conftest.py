@@ -0,0 +1,123 @@
+"""Fixtures: an app on a fresh SQLite file per test, seeded data and logins.
+
+Run from the website/ directory with `python -m pytest tests`.
+"""
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from extensions import db, job_views, password_hasher, recommender, skill_vocabulary  # noqa: E402
+from migrations import rebuild_conversation_counters, rebuild_job_stats, rebuild_skills  # noqa: E402
+from models import (Conversation, Job, JobApplication, Message, SavedJob, User, UserProfile,  # noqa: E402
+                    upgrade_database)
+
+START = datetime(2025, 1, 1)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'),
+        'TASK_WORKERS': 0,
+        'UPLOAD_STORAGE_URL': 'memory',
+        'JINJA_CACHE_DIR': '',
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'PASSWORD_HASH_WORKERS': 0,
+        # Tests flush view counts themselves
+        'VIEW_COUNT_FLUSH_INTERVAL': 3600,
+    })
+    # The skill index and counter buffers are per process, not per app
+    recommender.clear()
+    job_views.pending.clear()
+    with app.app_context():
+        upgrade_database(log=lambda message: None)
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def login(app):
+    """Return a function that logs a test client in as a user id."""
+    def login(client, user_id):
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+            session['user_name'] = f'User {user_id}'
+        return client
+    return login
+
+
+@pytest.fixture
+def concurrently():
+    """Return a function that runs `calls` on their own threads, released
+    together, and returns their results in order."""
+    def concurrently(*calls):
+        barrier = threading.Barrier(len(calls))
+
+        def run(call):
+            barrier.wait()
+            return call()
+
+        with ThreadPoolExecutor(len(calls)) as executor:
+            return list(executor.map(run, calls))
+    return concurrently
+
+
+@pytest.fixture
+def data(app):
+    """An employer (user 1) with `jobs` jobs, and `users` job seekers (2, 3, ...).
+
+    Seeker 2 has a profile, has applied to and saved every other job and has
+    a conversation with every other seeker; every seeker has applied to the
+    employer's newest jobs. Enough rows per page that a per-row query shows
+    up as dozens of extra statements.
+    """
+    jobs, users = 30, 20
+    password_hash = password_hasher.hash('password')
+    with app.app_context():
+        db.session.execute(db.insert(User), [
+            {'id': i, 'name': f'User {i}', 'email': f'user{i}@example.com', 'password_hash': password_hash}
+            for i in range(1, users + 2)
+        ])
+        db.session.add(UserProfile(user_id=2, skills='python, sql', experience_years=3))
+        db.session.execute(db.insert(Job), [
+            {'id': i, 'title': f'Job {i}', 'company': 'Acme', 'location': 'Pune', 'salary': '10-20 LPA',
+             'type': 'full-time', 'description': 'python sql', 'requirements': 'docker', 'posted_by': 1,
+             'created_at': START + timedelta(hours=i), 'updated_at': START + timedelta(hours=i)}
+            for i in range(1, jobs + 1)
+        ])
+        db.session.execute(db.insert(JobApplication), [
+            {'job_id': job_id, 'applicant_id': user_id, 'cover_letter': 'Hello',
+             'applied_at': START + timedelta(days=1, minutes=job_id * users + user_id)}
+            for user_id in range(2, users + 2) for job_id in range(1, jobs + 1)
+            if job_id > jobs // 2 or (user_id == 2 and job_id % 2)
+        ])
+        db.session.execute(db.insert(SavedJob), [
+            {'user_id': 2, 'job_id': job_id, 'saved_at': START + timedelta(days=2, minutes=job_id)}
+            for job_id in range(2, jobs + 1, 2)
+        ])
+        db.session.execute(db.insert(Conversation), [
+            {'id': other_id, 'user1_id': 2, 'user2_id': other_id, 'created_at': START,
+             'last_message_at': START + timedelta(days=3, minutes=other_id)}
+            for other_id in range(3, users + 2)
+        ])
+        db.session.execute(db.insert(Message), [
+            {'conversation_id': other_id, 'sender_id': sender, 'receiver_id': receiver, 'subject': '',
+             'content': f'Message {n}', 'sent_at': START + timedelta(days=3, minutes=other_id, seconds=n),
+             'is_read': False}
+            for other_id in range(3, users + 2) for n, (sender, receiver) in enumerate(((other_id, 2), (2, other_id)))
+        ])
+        db.session.commit()
+        rebuild_job_stats(db.engine)
+        rebuild_conversation_counters(db.engine)
+        rebuild_skills(db.engine, skill_vocabulary)
+    return {'jobs': jobs, 'users': users}
@@ -0,0 +1,37 @@
+"""create_app() can be called repeatedly without stacking hooks or listeners."""
+import os
+
+from sqlalchemy import event
+
+import app as app_module
+from extensions import db, request_metrics
+
+
+def test_fork_hook_is_registered_once(app, tmp_path, monkeypatch):
+    registered = []
+    monkeypatch.setattr(os, 'register_at_fork', lambda **hooks: registered.append(hooks))
+    monkeypatch.setattr(app_module, '_fork_hook_registered', False)
+    monkeypatch.setattr(app_module, '_fork_app', app)
+
+    first = app_module.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'first.db')})
+    second = app_module.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'second.db')})
+
+    assert len(registered) == 1
+    # The hook resets the services for the newest app
+    assert app_module._fork_app is second is not first
+    for created in (first, second):
+        with created.app_context():
+            db.engine.dispose()
+
+
+def test_request_metrics_init_app_is_idempotent(app):
+    with app.app_context():
+        engine = db.engine
+        hooks = len(app.before_request_funcs[None])
+        request_metrics.init_app(app, [engine])
+        request_metrics.watch_engine(engine)
+        assert len(app.before_request_funcs[None]) == hooks
+        assert event.contains(engine, 'before_cursor_execute', request_metrics._before_sql)
+        event.remove(engine, 'before_cursor_execute', request_metrics._before_sql)
+        # One listener was registered, so one removal leaves none
+        assert not event.contains(engine, 'before_cursor_execute', request_metrics._before_sql)
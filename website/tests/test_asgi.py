@@ -0,0 +1,143 @@
+"""ASGI mode: the async views serve the same pages as the Flask ones."""
+import asyncio
+from urllib.parse import urlsplit
+
+import pytest
+
+from asgi import AsyncApp
+from companies import add_company_review
+from extensions import db
+from instrumentation import count_queries
+from models import Company, Job, Message
+
+
+def session_cookie(app, user_id):
+    value = app.session_interface.get_signing_serializer(app).dumps({'user_id': user_id, 'user_name': f'User {user_id}'})
+    return f'session={value}'
+
+
+async def call(server, path, user_id=None, method='GET', headers=()):
+    """Send one request through the ASGI app; returns (status, headers, body)."""
+    url = urlsplit(path)
+    headers = [(name.lower().encode(), value.encode()) for name, value in headers]
+    if user_id is not None:
+        headers.append((b'cookie', session_cookie(server.flask_app, user_id).encode()))
+    scope = {'type': 'http', 'method': method, 'path': url.path, 'query_string': url.query.encode(),
+             'headers': headers, 'http_version': '1.1', 'scheme': 'http', 'server': ('localhost', 80)}
+    requested = False
+    sent = []
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b''}
+        # The client stays connected until the response is done
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    await server(scope, receive, send)
+    start = sent[0]
+    return (start['status'], {name.decode(): value.decode() for name, value in start['headers']},
+            b''.join(message.get('body', b'') for message in sent[1:]))
+
+
+def run(app, scenario):
+    async def main():
+        server = AsyncApp(app)
+        try:
+            return await scenario(server)
+        finally:
+            await server.engine.dispose()
+            server.renderers.shutdown()
+            server.threads.shutdown()
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def company(app, data):
+    with app.app_context():
+        company = Company(name='Acme', created_by=1)
+        db.session.add(company)
+        db.session.flush()
+        db.session.execute(db.update(Job).values(company_id=company.id))
+        for user_id in (2, 3, 4):
+            add_company_review(company.id, user_id, 4, f'Review by {user_id}')
+        db.session.commit()
+        return company.id
+
+
+def test_async_pages_match_sync(app, data, company, login):
+    pages = [
+        ('/jobs', None), ('/jobs', 2), ('/jobs?title=Job&per_page=5', 2), ('/jobs?sort=recent', None),
+        ('/job/3', None), ('/job/4', 2),
+        ('/messages', 2), ('/conversation/4', 3),
+        (f'/company/{company}', None), (f'/company/{company}?per_page=1', 2),
+        ('/dashboard', 2),
+    ]
+    with app.app_context():
+        engine = db.engine
+
+    async def scenario(server):
+        results = []
+        for path, user_id in pages:
+            with count_queries(engine) as sync_queries, count_queries(server.engine.sync_engine) as async_queries:
+                status, _, body = await call(server, path, user_id)
+            results.append((status, body, sync_queries.count, async_queries.count))
+        return results
+
+    # Read the conversation once so the async view need not mark it read
+    login(app.test_client(), 3).get('/conversation/4')
+    for (path, user_id), (status, body, sync_count, async_count) in zip(pages, run(app, scenario)):
+        client = app.test_client() if user_id is None else login(app.test_client(), user_id)
+        expected = client.get(path)
+        assert (status, body) == (expected.status_code, expected.data), path
+        assert status == 200
+        assert async_count > 0, path
+        # Only the recommender's index refresh uses the sync engine
+        assert sync_count == 0 or path == '/dashboard', path
+
+
+def test_thread_with_unread_messages_runs_on_wsgi(app, data):
+    with app.app_context():
+        engine = db.engine
+
+    async def scenario(server):
+        with count_queries(engine) as first:
+            status, _, body = await call(server, '/conversation/3', 2)
+        assert status == 200 and b'Message 0' in body
+        with count_queries(engine) as second:
+            status, _, body = await call(server, '/conversation/3', 2)
+        assert status == 200 and b'Message 0' in body
+        return first.count, second.count
+
+    first, second = run(app, scenario)
+    assert first > 0
+    assert second == 0
+    with app.app_context():
+        assert db.session.query(Message).filter_by(conversation_id=3, receiver_id=2, is_read=False).count() == 0
+
+
+def test_async_errors_and_validators(app, data):
+    async def scenario(server):
+        assert (await call(server, '/job/999'))[0] == 404
+        assert (await call(server, '/jobs?cursor=not-a-cursor'))[0] == 400
+        status, headers, _ = await call(server, '/messages')
+        assert status == 302 and headers['location'].endswith('/login')
+        # The flash is kept in the session cookie for the login page
+        assert 'set-cookie' in headers
+
+        status, _, body = await call(server, '/dashboard')
+        assert status == 200 and b'register' in body.lower()
+
+        status, headers, body = await call(server, '/jobs', method='HEAD')
+        assert status == 200 and body == b''
+        # after_request hooks run as in sync mode
+        status, headers, body = await call(server, '/job/3', 2)
+        assert status == 200 and 'server-timing' in headers and 'etag' in headers
+        status, _, body = await call(server, '/job/3', 2, headers=[('If-None-Match', headers['etag'])])
+        assert status == 304 and body == b''
+
+    run(app, scenario)
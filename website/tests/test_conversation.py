@@ -0,0 +1,34 @@
+"""Opening a thread only writes when it has to."""
+from extensions import db
+from instrumentation import count_queries
+from models import Conversation, Message
+
+
+def writes(statements):
+    return [statement for statement in statements
+            if statement.split()[0].upper() in ('INSERT', 'UPDATE', 'DELETE') or 'IMMEDIATE' in statement]
+
+
+def test_opening_a_read_thread_does_not_write(app, data, login):
+    client = login(app.test_client(), 2)
+    with app.app_context():
+        engine = db.engine
+    with count_queries(engine) as queries:
+        assert client.get('/conversation/3').status_code == 200
+    # The unread message is marked as read in a write transaction
+    assert writes(queries.statements)
+    with app.app_context():
+        assert db.session.query(Message).filter_by(receiver_id=2, sender_id=3, is_read=False).count() == 0
+        conversation = db.session.get(Conversation, 3)
+        assert conversation.unread_for(2) == 0
+
+    with count_queries(engine) as queries:
+        assert client.get('/conversation/3').status_code == 200
+    assert not writes(queries.statements)
+
+
+def test_opening_a_new_thread_creates_it(app, data, login):
+    client = login(app.test_client(), 3)
+    assert client.get('/conversation/4').status_code == 200
+    with app.app_context():
+        assert db.session.query(Conversation).filter_by(user1_id=3, user2_id=4).count() == 1
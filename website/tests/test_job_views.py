@@ -0,0 +1,43 @@
+"""Job page views are counted in memory and written in batches, never by the request."""
+from extensions import db, job_views
+from instrumentation import count_queries
+from models import JobStats
+
+
+def views(app, job_id):
+    with app.app_context():
+        stats = db.session.get(JobStats, job_id)
+        return stats.views_count if stats else 0
+
+
+def test_views_are_written_by_flush(app, data):
+    client = app.test_client()
+    for _ in range(3):
+        assert client.get('/job/5').status_code == 200
+    client.get('/job/6')
+    assert views(app, 5) == 0
+
+    assert job_views.flush() == 2
+    assert (views(app, 5), views(app, 6)) == (3, 1)
+    assert job_views.flush() == 0
+
+
+def test_job_page_does_not_write(app, data):
+    client = app.test_client()
+    with app.app_context():
+        engine = db.engine
+    with count_queries(engine) as queries:
+        response = client.get('/job/5')
+        assert client.get('/job/5', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert not [statement for statement in queries.statements
+                if statement.split()[0].upper() in ('INSERT', 'UPDATE', 'DELETE') or 'IMMEDIATE' in statement]
+    # Both the page and the revalidation count
+    job_views.flush()
+    assert views(app, 5) == 2
+
+
+def test_views_of_deleted_jobs_are_dropped(app, data):
+    job_views.add(5)
+    job_views.add(99999)
+    assert job_views.flush() == 2
+    assert views(app, 5) == 1
@@ -0,0 +1,42 @@
+"""Message streams and long polls are limited per process and streams end on their own."""
+
+
+def broker(app):
+    return app.extensions['message_broker']
+
+
+def test_subscribers_are_limited(app, data, login):
+    app.config['MESSAGE_POLL_TIMEOUT'] = 0
+    broker(app).max_subscribers = 2
+    clients = [login(app.test_client(), user_id) for user_id in (2, 3, 4)]
+    streams = [client.get('/api/messages/stream', buffered=False) for client in clients[:2]]
+    assert [stream.status_code for stream in streams] == [200, 200]
+
+    refused = clients[2].get('/api/messages/stream')
+    assert refused.status_code == 503
+    assert refused.headers['Retry-After']
+    assert clients[2].get('/api/messages/poll').status_code == 503
+
+    streams[0].close()
+    assert broker(app).stats()['subscriptions'] == 1
+    assert clients[2].get('/api/messages/poll').get_json() == {'events': []}
+    streams[1].close()
+    assert broker(app).stats()['subscriptions'] == 0
+
+
+def test_streams_end_after_their_lifetime(app, data, login):
+    app.config['MESSAGE_STREAM_LIFETIME'] = 0
+    response = login(app.test_client(), 2).get('/api/messages/stream')
+    assert response.get_data(as_text=True) == 'retry: 3000\n\n'
+    assert broker(app).stats()['subscriptions'] == 0
+
+
+def test_stream_delivers_events(app, data, login):
+    app.config['MESSAGE_STREAM_LIFETIME'] = 1
+    stream = login(app.test_client(), 2).get('/api/messages/stream', buffered=False)
+    chunks = stream.response
+    assert next(chunks) == b'retry: 3000\n\n'
+    login(app.test_client(), 3).post('/conversation/2', data={'content': 'ping'})
+    assert next(chunks).startswith(b'event: message\n')
+    stream.close()
+    assert broker(app).stats()['subscriptions'] == 0
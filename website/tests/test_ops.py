@@ -0,0 +1,30 @@
+"""The stats endpoints and /metrics are for admins and the metrics scraper only."""
+import pytest
+
+PATHS = ('/api/cache-stats', '/api/queue-stats', '/metrics')
+
+
+@pytest.fixture
+def ops_app(app, data):
+    app.config['ADMIN_EMAILS'] = {'user1@example.com'}
+    app.config['OPS_TOKEN'] = 'scrape-token'
+    return app
+
+
+@pytest.mark.parametrize('path', PATHS)
+def test_hidden_from_anonymous_and_other_users(ops_app, login, path):
+    assert ops_app.test_client().get(path).status_code == 404
+    assert login(ops_app.test_client(), 2).get(path).status_code == 404
+    assert ops_app.test_client().get(path, headers={'Authorization': 'Bearer wrong'}).status_code == 404
+
+
+@pytest.mark.parametrize('path', PATHS)
+def test_served_to_admins_and_token_holders(ops_app, login, path):
+    assert login(ops_app.test_client(), 1).get(path).status_code == 200
+    response = ops_app.test_client().get(path, headers={'Authorization': 'Bearer scrape-token'})
+    assert response.status_code == 200
+
+
+def test_no_token_configured_means_no_token_access(ops_app):
+    ops_app.config['OPS_TOKEN'] = ''
+    assert ops_app.test_client().get('/metrics', headers={'Authorization': 'Bearer '}).status_code == 404
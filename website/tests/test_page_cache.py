@@ -0,0 +1,38 @@
+"""The anonymous page cache must only hold pages every visitor may see."""
+import pytest
+
+from cache import MemoryBackend, PageCache, SQLiteBackend
+from extensions import page_cache
+
+
+def test_pending_flash_bypasses_page_cache(app, data):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['_flashes'] = [('info', 'Logged out successfully')]
+    key, etag = page_cache.version('/jobs?')
+
+    flashed = client.get('/jobs', headers={'If-None-Match': f'W/"{etag}"'})
+    assert flashed.status_code == 200
+    assert flashed.headers.get('ETag') is None
+    assert 'public' not in flashed.headers.get('Cache-Control', '')
+    assert page_cache.backend.get(key) is None
+
+    other = app.test_client().get('/jobs')
+    assert other.status_code == 200
+    assert other.cache_control.public
+    assert page_cache.backend.get(key) is not None
+
+
+@pytest.mark.parametrize('make_backend', [
+    lambda tmp_path: MemoryBackend(max_entries=2),
+    lambda tmp_path: SQLiteBackend(str(tmp_path / 'cache.db'), max_entries=2, prune_every=1),
+])
+def test_generation_survives_eviction(tmp_path, make_backend):
+    backend = make_backend(tmp_path)
+    cache = PageCache(backend)
+    cache.purge()
+    cache.purge()
+    for i in range(10):
+        backend.set(f'pages:2:/jobs?page={i}', 'page', 60)
+    # Falling back to generation 0 would revive pages and ETags from before the purges
+    assert cache.version('/jobs?')[0] == 'pages:2:/jobs?'
@@ -0,0 +1,41 @@
+"""Keyset-paginated lists: pages are bounded and the next link reaches the rest."""
+import re
+
+
+def next_link(response, label):
+    match = re.search(r'<a href="([^"]+)" class="[^"]*">' + label + '</a>', response.get_data(as_text=True))
+    return match and match.group(1).replace('&amp;', '&')
+
+
+def titles(response):
+    return re.findall(r'>(Job \d+)</a>', response.get_data(as_text=True))
+
+
+def test_employer_jobs_are_paginated(app, data, login):
+    app.config['EMPLOYER_JOBS_PAGE_SIZE'] = 20
+    client = login(app.test_client(), 1)
+
+    first = client.get('/employer-dashboard')
+    assert titles(first)[:20] == [f'Job {i}' for i in range(30, 10, -1)]
+    url = next_link(first, 'Older jobs')
+    assert url
+
+    second = client.get(url)
+    assert titles(second)[:10] == [f'Job {i}' for i in range(10, 0, -1)]
+    assert next_link(second, 'Older jobs') is None
+
+
+def test_conversations_are_paginated(app, data, login):
+    app.config['CONVERSATIONS_PAGE_SIZE'] = 10
+    client = login(app.test_client(), 2)
+    seen = []
+    url = '/messages'
+    while url:
+        response = client.get(url)
+        names = re.findall(r'<h5 class="mb-1">(User \d+)', response.get_data(as_text=True))
+        assert len(names) <= 10
+        # Every page counts unread messages across all conversations
+        assert re.search(r'<span id="unread-total">(\d+)</span>', response.get_data(as_text=True)).group(1) == '19'
+        seen += names
+        url = next_link(response, 'Older conversations')
+    assert seen == [f'User {i}' for i in range(21, 2, -1)]
@@ -0,0 +1,41 @@
+"""Posting a job: duplicates are refused, even when submitted at the same time."""
+import json
+
+from extensions import db
+from models import Company, Job, Task
+
+FORM = {'title': 'Data Engineer', 'company_option': 'new', 'new_company_name': 'Initech', 'location': 'Pune',
+        'salary': '10-20 LPA', 'type': 'full-time', 'description': 'python sql'}
+
+
+def test_concurrent_duplicate_posts_create_one_job(app, data, login, concurrently):
+    clients = [login(app.test_client(), 1) for _ in range(8)]
+    responses = concurrently(*[lambda client=client: client.post('/post-job', data=FORM) for client in clients])
+
+    assert [response.status_code for response in responses] == [302] * 8
+    assert sum(response.location.endswith('/jobs') for response in responses) == 1
+    with app.app_context():
+        assert db.session.query(Job).filter_by(title='Data Engineer').count() == 1
+        assert db.session.query(Company).filter_by(name='Initech').count() == 1
+
+
+def test_posted_job_is_searchable_and_queued_for_skill_matching(app, data, login):
+    client = login(app.test_client(), 1)
+    assert client.post('/post-job', data=FORM).location.endswith('/jobs')
+
+    response = client.get('/api/jobs?title=data+engineer')
+    assert [job['title'] for job in response.get_json()['jobs']] == ['Data Engineer']
+    with app.app_context():
+        job_id = db.session.query(Job.id).filter_by(title='Data Engineer').scalar()
+        tasks = db.session.query(Task.args).filter_by(name='match_job_skills').all()
+    assert any(json.loads(args)['job_ids'] == [job_id] for args, in tasks)
+
+
+def test_same_posting_from_two_employers_is_kept(app, data, login):
+    first, second = login(app.test_client(), 1), login(app.test_client(), 2)
+    assert first.post('/post-job', data=FORM).location.endswith('/jobs')
+    assert second.post('/post-job', data=FORM).location.endswith('/jobs')
+    # Posting it again is still refused
+    assert first.post('/post-job', data=FORM).location.endswith('/post-job')
+    with app.app_context():
+        assert sorted(db.session.query(Job.posted_by).filter_by(title='Data Engineer')) == [(1,), (2,)]
@@ -0,0 +1,31 @@
+"""Query budgets for the pages that list related rows.
+
+Each page renders 15-30 rows that reach a related object (a job, a user,
+a counter); a lazy load per row would add that many statements and blow
+the budget.
+"""
+import pytest
+
+from extensions import db
+from instrumentation import assert_max_queries
+
+
+@pytest.mark.parametrize('path, user_id, limit, expected', [
+    # user, profile, applications with jobs, saved jobs with jobs
+    ('/account', 2, 5, [b'Job 29', b'Job 30']),
+    # a page of conversations with both users, unread total
+    ('/messages', 2, 3, [b'User 3', b'User 21']),
+    # skills, applied ids, index refresh (clock and jobs), recommended jobs
+    ('/dashboard', 2, 6, [b'Job 14']),
+    # user, jobs with counters, totals, applications with jobs and applicants
+    ('/employer-dashboard', 1, 5, [b'Job 1', b'User 21']),
+])
+def test_page_query_budget(app, data, login, path, user_id, limit, expected):
+    client = login(app.test_client(), user_id)
+    with app.app_context():
+        engine = db.engine
+    with assert_max_queries(engine, limit):
+        response = client.get(path)
+    assert response.status_code == 200
+    for text in expected:
+        assert text in response.data
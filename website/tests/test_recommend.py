@@ -0,0 +1,34 @@
+"""SkillIndex ranking: most matched skills first, then newest, then latest indexed."""
+import random
+from datetime import datetime, timedelta
+
+from recommend import SkillIndex
+
+START = datetime(2025, 1, 1)
+
+
+def stamp(hours):
+    return str(START + timedelta(hours=hours))
+
+
+def test_ties_are_broken_by_recency():
+    index = SkillIndex()
+    # Many jobs tied on one skill, a few matching both, some sharing a timestamp
+    index.update([(job_id, [1, 2] if job_id % 500 == 0 else [1], stamp(job_id // 3), stamp(0), True)
+                  for job_id in range(1, 3001)], stamp(1))
+    assert index.recommend([1, 2], limit=8) == [3000, 2500, 2000, 1500, 1000, 500, 2999, 2998]
+    assert index.recommend([1], exclude=[2999], limit=3) == [3000, 2998, 2997]
+
+
+def test_matches_a_full_sort():
+    rng = random.Random(7)
+    index = SkillIndex()
+    jobs = [(job_id, rng.sample(range(10), rng.randint(0, 4)), stamp(rng.randint(0, 50)), stamp(0), True)
+            for job_id in range(1, 2001)]
+    index.update(jobs, stamp(1))
+    for _ in range(20):
+        skills, limit = rng.sample(range(10), 3), rng.randint(1, 30)
+        expected = sorted(((len(set(skills) & set(job_skills)), created, job_id)
+                           for job_id, job_skills, created, _, _ in jobs if set(skills) & set(job_skills)),
+                          reverse=True)
+        assert index.recommend(skills, limit=limit) == [job_id for _, _, job_id in expected[:limit]]
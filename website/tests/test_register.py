@@ -0,0 +1,24 @@
+"""Registration only spends a password hash on an email that is free."""
+from extensions import db, password_hasher
+from models import User
+
+FORM = {'name': 'New User', 'email': 'new@example.com', 'pass': 'secret123', 'c_pass': 'secret123'}
+
+
+def test_register_creates_the_user(app, data):
+    response = app.test_client().post('/register', data=FORM)
+    assert response.location.endswith('/login')
+    with app.app_context():
+        user = db.session.query(User).filter_by(email='new@example.com').one()
+        assert password_hasher.verify(user.password_hash, 'secret123')
+
+
+def test_taken_email_is_refused_without_hashing(app, data, monkeypatch):
+    def hash(password):
+        raise AssertionError('hashed a password for a taken email')
+    monkeypatch.setattr(password_hasher, 'hash', hash)
+
+    response = app.test_client().post('/register', data=dict(FORM, email='user2@example.com'))
+    assert response.location.endswith('/register')
+    with app.app_context():
+        assert db.session.query(User).filter_by(email='user2@example.com').count() == 1
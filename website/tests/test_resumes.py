@@ -0,0 +1,49 @@
+"""Resume text extraction stays bounded however far an upload inflates."""
+import io
+import tracemalloc
+import zipfile
+import zlib
+
+from resumes import MAX_INFLATED, extract_text
+
+
+def bomb(size):
+    """zlib data that inflates to `size` zero bytes, built without holding them."""
+    compressor = zlib.compressobj(9)
+    chunk = b'\0' * (1 << 20)
+    return b''.join(compressor.compress(chunk) for _ in range(size >> 20)) + compressor.flush()
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def pdf(*streams):
+    return b'%PDF-1.4\n' + b''.join(b'1 0 obj\nstream\n' + stream + b'\nendstream\nendobj\n' for stream in streams)
+
+
+def test_pdf_text_is_extracted():
+    text = zlib.compress(b'BT (Python developer) Tj ET')
+    assert extract_text(pdf(text), 'pdf') == 'Python developer'
+
+
+def test_pdf_streams_inflate_to_a_bounded_size():
+    data = pdf(*[bomb(64 << 20)] * 4)
+    assert peak_memory(lambda: extract_text(data, 'pdf')) < 4 * MAX_INFLATED
+
+
+def test_docx_document_inflates_to_a_bounded_size():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with archive.open('word/document.xml', 'w') as document:
+            document.write(b'<w:p>Python developer</w:p>')
+            for _ in range(64):
+                document.write(b'\0' * (1 << 20))
+    data = buffer.getvalue()
+    assert len(data) < MAX_INFLATED
+    assert peak_memory(lambda: extract_text(data, 'docx')) < 4 * MAX_INFLATED
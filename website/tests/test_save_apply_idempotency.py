@@ -0,0 +1,62 @@
+"""Applying and saving are idempotent: a double-click or a retried submit,
+sent many times at once, leaves one row and counts it once."""
+from extensions import db
+from models import JobApplication, JobStats, SavedJob
+
+THREADS = 8
+USER = 3
+
+
+def counts(app, job_id):
+    with app.app_context():
+        stats = db.session.get(JobStats, job_id)
+        return stats.applications_count, stats.pending_count, stats.saves_count
+
+
+def rows(app, model, **filters):
+    with app.app_context():
+        return db.session.query(model).filter_by(**filters).count()
+
+
+def fire(app, login, concurrently, path, **kwargs):
+    """POST the same request from THREADS clients at once; returns the status codes."""
+    clients = [login(app.test_client(), USER) for _ in range(THREADS)]
+    responses = concurrently(*[lambda client=client: client.post(path, **kwargs) for client in clients])
+    return [response.status_code for response in responses]
+
+
+def test_concurrent_applies_create_one_application(app, data, login, concurrently):
+    before = counts(app, 1)
+    statuses = fire(app, login, concurrently, '/apply/1', data={'cover_letter': 'Hi'})
+
+    assert statuses == [302] * THREADS
+    assert rows(app, JobApplication, job_id=1, applicant_id=USER) == 1
+    applications, pending, saves = before
+    assert counts(app, 1) == (applications + 1, pending + 1, saves)
+
+
+def test_concurrent_saves_create_one_saved_job(app, data, login, concurrently):
+    before = counts(app, 1)
+    statuses = fire(app, login, concurrently, '/api/save-job/1', json={'saved': True})
+
+    assert statuses == [200] * THREADS
+    assert rows(app, SavedJob, job_id=1, user_id=USER) == 1
+    applications, pending, saves = before
+    assert counts(app, 1) == (applications, pending, saves + 1)
+
+    statuses = fire(app, login, concurrently, '/api/save-job/1', json={'saved': False})
+    assert statuses == [200] * THREADS
+    assert rows(app, SavedJob, job_id=1, user_id=USER) == 0
+    assert counts(app, 1) == before
+
+
+def test_concurrent_batch_saves_create_one_saved_job_each(app, data, login, concurrently):
+    batch = [1, 2, 3, 4, 5]
+    before = {job_id: counts(app, job_id) for job_id in batch}
+    statuses = fire(app, login, concurrently, '/api/saved-jobs', json={'save': batch})
+
+    assert statuses == [200] * THREADS
+    for job_id in batch:
+        assert rows(app, SavedJob, job_id=job_id, user_id=USER) == 1
+        applications, pending, saves = before[job_id]
+        assert counts(app, job_id) == (applications, pending, saves + 1)
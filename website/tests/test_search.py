@@ -0,0 +1,20 @@
+"""Inactive jobs are left out of the listing whichever search path runs."""
+import pytest
+
+from extensions import db, job_search
+from models import Job
+
+
+@pytest.mark.parametrize('fts', [True, False])
+@pytest.mark.parametrize('path', ['/api/jobs?per_page=100', '/api/jobs?title=job&per_page=100'])
+def test_inactive_jobs_are_not_listed(app, data, monkeypatch, fts, path):
+    monkeypatch.setattr(job_search, 'available', fts and job_search.available)
+    with app.app_context():
+        db.session.get(Job, 5).is_active = False
+        db.session.commit()
+        # The seeded jobs were inserted in bulk, without indexing them
+        job_search.rebuild()
+
+    titles = [job['title'] for job in app.test_client().get(path).get_json()['jobs']]
+    assert len(titles) == 29
+    assert 'Job 5' not in titles
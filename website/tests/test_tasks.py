@@ -0,0 +1,27 @@
+"""Background tasks run in the caller's app context, each with a clean session."""
+from flask import g
+
+from extensions import db, task_queue
+from models import User, enqueue_task
+
+seen = []
+
+
+@task_queue.task()
+def record_context(label):
+    seen.append((label, g.get('marker'), len(db.session.identity_map)))
+    db.session.get(User, 1)
+    g.marker = label
+
+
+def test_tasks_share_the_worker_context_but_not_a_session(app, data):
+    seen.clear()
+    with app.app_context():
+        enqueue_task('record_context', label='first')
+        enqueue_task('record_context', label='second')
+        db.session.commit()
+    with app.app_context():
+        assert task_queue.run_pending() == 2
+    # The second task sees the first one's g, so both ran in one context,
+    # and an empty identity map, so the first one's session was removed
+    assert seen == [('first', None, 0), ('second', 'first', 0)]